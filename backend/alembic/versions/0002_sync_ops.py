@@ -0,0 +1,28 @@
+"""sync ops (idempotency keys for batched outbox sync)
+
+Revision ID: 0002_sync_ops
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_sync_ops"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "sync_ops",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("worker_id", sa.Integer, sa.ForeignKey("workers.id"), nullable=False),
+        sa.Column("op_key", sa.String(64), nullable=False),
+        sa.Column("op_type", sa.String(32), nullable=False),
+        sa.Column("result_json", sa.JSON),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.UniqueConstraint("worker_id", "op_key", name="uq_sync_ops_worker_key"),
+    )
+
+def downgrade():
+    op.drop_table("sync_ops")
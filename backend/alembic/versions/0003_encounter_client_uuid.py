@@ -0,0 +1,21 @@
+"""encounter client uuid (single-call offline create-and-submit)
+
+Revision ID: 0003_encounter_client_uuid
+Revises: 0002_sync_ops
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_encounter_client_uuid"
+down_revision = "0002_sync_ops"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("encounters", sa.Column("client_uuid", sa.Uuid))
+    op.create_index("ux_encounters_client_uuid", "encounters", ["client_uuid"], unique=True)
+
+def downgrade():
+    op.drop_index("ux_encounters_client_uuid", table_name="encounters")
+    op.drop_column("encounters", "client_uuid")
@@ -0,0 +1,21 @@
+"""derived results: rules version + client mismatch
+
+Revision ID: 0004_derived_rules_check
+Revises: 0003_encounter_client_uuid
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_derived_rules_check"
+down_revision = "0003_encounter_client_uuid"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("derived_results", sa.Column("rules_version", sa.String(32)))
+    op.add_column("derived_results", sa.Column("mismatch_json", sa.JSON))
+
+def downgrade():
+    op.drop_column("derived_results", "mismatch_json")
+    op.drop_column("derived_results", "rules_version")
@@ -0,0 +1,46 @@
+"""follow-up worklist (latest follow-up per person, for overdue dashboards)
+
+Revision ID: 0005_followup_worklist
+Revises: 0004_derived_rules_check
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_followup_worklist"
+down_revision = "0004_derived_rules_check"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "followup_worklist",
+        sa.Column("person_id", sa.Integer, sa.ForeignKey("people.id"), primary_key=True),
+        sa.Column("village_id", sa.Integer, sa.ForeignKey("villages.id"), nullable=False),
+        sa.Column("encounter_id", sa.Integer, sa.ForeignKey("encounters.id"), nullable=False),
+        sa.Column("followup_date", sa.Date),
+        sa.Column("rag", sa.String(8), nullable=False),
+        sa.Column("rag_rank", sa.Integer, nullable=False),
+        sa.Column("screened_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_worklist_due", "followup_worklist", ["followup_date", "rag_rank", "person_id"])
+    op.create_index("ix_worklist_village_due", "followup_worklist", ["village_id", "followup_date", "rag_rank", "person_id"])
+
+    # backfill from each person's latest screening, by device time where there is one
+    op.execute("""
+        INSERT INTO followup_worklist (person_id, village_id, encounter_id, followup_date, rag, rag_rank, screened_at)
+        SELECT DISTINCT ON (e.person_id)
+               e.person_id, p.village_id, e.id, d.followup_date, d.rag,
+               CASE d.rag WHEN 'RED' THEN 0 WHEN 'AMBER' THEN 1 ELSE 2 END,
+               LEAST(COALESCE(e.client_created_at, e.submitted_at), e.submitted_at) AS screened_at
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        ORDER BY e.person_id, screened_at DESC, e.id DESC
+    """)
+
+def downgrade():
+    op.drop_index("ix_worklist_village_due", table_name="followup_worklist")
+    op.drop_index("ix_worklist_due", table_name="followup_worklist")
+    op.drop_table("followup_worklist")
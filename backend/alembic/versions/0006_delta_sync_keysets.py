@@ -0,0 +1,28 @@
+"""delta sync: (updated_at, id) keyset indexes
+
+Revision ID: 0006_delta_sync_keysets
+Revises: 0005_followup_worklist
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006_delta_sync_keysets"
+down_revision = "0005_followup_worklist"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.drop_index("ix_people_village_updated", table_name="people")
+    op.drop_index("ix_households_village_updated", table_name="households")
+    op.create_index("ix_people_village_updated", "people", ["village_id", "updated_at", "id"])
+    op.create_index("ix_people_updated", "people", ["updated_at", "id"])
+    op.create_index("ix_households_village_updated", "households", ["village_id", "updated_at", "id"])
+    op.create_index("ix_camps_village_updated", "camps", ["village_id", "updated_at", "id"])
+
+def downgrade():
+    op.drop_index("ix_camps_village_updated", table_name="camps")
+    op.drop_index("ix_households_village_updated", table_name="households")
+    op.drop_index("ix_people_updated", table_name="people")
+    op.drop_index("ix_people_village_updated", table_name="people")
+    op.create_index("ix_households_village_updated", "households", ["village_id", "updated_at"])
+    op.create_index("ix_people_village_updated", "people", ["village_id", "updated_at"])
@@ -0,0 +1,73 @@
+"""people search: phonetic name key, trigram and phone-suffix indexes
+
+Revision ID: 0007_people_search
+Revises: 0006_delta_sync_keysets
+Create Date: 2026-10-18
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_people_search"
+down_revision = "0006_delta_sync_keysets"
+branch_labels = None
+depends_on = None
+
+BATCH = 5000
+
+# app.phonetic.name_key as of this revision, frozen so later edits to it can't change
+# what this migration writes
+_RULES = [
+    (re.compile(r"ksh|x"), "ks"),
+    (re.compile(r"chh|ch"), "c"),
+    (re.compile(r"([tdbkgjs])h"), r"\1"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck|q"), "k"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"ee|ii|ie"), "i"),
+    (re.compile(r"oo|uu|ou"), "u"),
+    (re.compile(r"ai|ay|ei"), "e"),
+    (re.compile(r"aa"), "a"),
+    (re.compile(r"(.)\1+"), r"\1"),
+    (re.compile(r"(?<=...)[ah]$"), ""),
+]
+
+def _word_key(word: str) -> str:
+    for pattern, repl in _RULES:
+        word = pattern.sub(repl, word)
+    return word
+
+def name_key(name: str | None) -> str | None:
+    if not name:
+        return None
+    words = re.findall(r"[^\W\d_]+", name.lower())
+    return " ".join(_word_key(w) for w in words) or None
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.add_column("people", sa.Column("name_key", sa.String(160)))
+
+    conn = op.get_bind()
+    people = sa.table("people", sa.column("id", sa.Integer), sa.column("full_name", sa.String), sa.column("name_key", sa.String))
+    after = 0
+    while True:
+        rows = conn.execute(
+            sa.select(people.c.id, people.c.full_name).where(people.c.id > after).order_by(people.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            people.update().where(people.c.id == sa.bindparam("pid")).values(name_key=sa.bindparam("key")),
+            [{"pid": r.id, "key": name_key(r.full_name)} for r in rows],
+        )
+        after = rows[-1].id
+
+    op.execute("CREATE INDEX ix_people_village_name_trgm ON people USING gin (village_id, name_key gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_people_phone_rev ON people (reverse(phone) text_pattern_ops)")
+
+def downgrade():
+    op.drop_index("ix_people_phone_rev", table_name="people")
+    op.drop_index("ix_people_village_name_trgm", table_name="people")
+    op.drop_column("people", "name_key")
@@ -0,0 +1,28 @@
+"""clinician queue: partial keyset indexes on encounters, rag index on derived_results
+
+Revision ID: 0008_clinician_queue
+Revises: 0007_people_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008_clinician_queue"
+down_revision = "0007_people_search"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX ix_encounters_queue ON encounters (submitted_at DESC, id DESC) "
+        "WHERE status IN ('VERIFIED', 'UNVERIFIED')"
+    )
+    op.execute(
+        "CREATE INDEX ix_encounters_unverified ON encounters (submitted_at DESC, id DESC) "
+        "WHERE status = 'UNVERIFIED'"
+    )
+    op.create_index("ix_derived_results_rag", "derived_results", ["rag", "encounter_id"])
+
+def downgrade():
+    op.drop_index("ix_derived_results_rag", table_name="derived_results")
+    op.drop_index("ix_encounters_unverified", table_name="encounters")
+    op.drop_index("ix_encounters_queue", table_name="encounters")
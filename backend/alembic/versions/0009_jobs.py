@@ -0,0 +1,44 @@
+"""background jobs table, cleanup indexes
+
+Revision ID: 0009_jobs
+Revises: 0008_clinician_queue
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_jobs"
+down_revision = "0008_clinician_queue"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("kind", sa.String(64), nullable=False),
+        sa.Column("payload_json", sa.JSON),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("dedupe_key", sa.String(128), unique=True),
+        sa.Column("run_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("max_attempts", sa.Integer, nullable=False),
+        sa.Column("last_error", sa.Text),
+        sa.Column("result_json", sa.JSON),
+        sa.Column("locked_by", sa.String(128)),
+        sa.Column("locked_at", sa.DateTime(timezone=True)),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        sa.Column("duration_ms", sa.Integer),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_jobs_due", "jobs", ["run_at", "id"], postgresql_where=sa.text("status = 'QUEUED'"))
+    op.create_index("ix_jobs_running", "jobs", ["locked_at"], postgresql_where=sa.text("status = 'RUNNING'"))
+    op.create_index("ix_jobs_kind_finished", "jobs", ["kind", "finished_at"])
+    op.create_index("ix_verification_tokens_expires", "verification_tokens", ["expires_at"])
+    op.create_index("ix_sync_ops_created", "sync_ops", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_sync_ops_created", table_name="sync_ops")
+    op.drop_index("ix_verification_tokens_expires", table_name="verification_tokens")
+    op.drop_table("jobs")
@@ -0,0 +1,79 @@
+"""audit_logs: monthly range partitions on created_at
+
+Revision ID: 0010_audit_partitions
+Revises: 0009_jobs
+Create Date: 2026-10-18
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_audit_partitions"
+down_revision = "0009_jobs"
+branch_labels = None
+depends_on = None
+
+AHEAD = 3
+COLUMNS = "id, actor_worker_id, actor_person_id, action, entity, entity_id, meta_json, created_at"
+
+# frozen copies of the app.audit helpers, so this revision keeps creating the same partitions
+def month_start(d: date, add: int = 0) -> date:
+    m = d.year * 12 + d.month - 1 + add
+    return date(m // 12, m % 12 + 1, 1)
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS audit_logs_y{month.year}m{month.month:02d} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{month_start(month, 1).isoformat()} 00:00+00')"
+    )
+
+def upgrade():
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned")
+    op.execute("ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq RENAME TO audit_logs_unpartitioned_id_seq")
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id bigserial,
+            actor_worker_id integer,
+            actor_person_id integer,
+            action varchar(64) NOT NULL,
+            entity varchar(64) NOT NULL,
+            entity_id varchar(64),
+            meta_json json,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    conn = op.get_bind()
+    first = conn.execute(sa.text("SELECT min(created_at) FROM audit_logs_unpartitioned")).scalar()
+    month = month_start(first.date() if first else date.today())
+    last = month_start(date.today(), AHEAD)
+    while month <= last:
+        op.execute(create_partition_sql(month))
+        month = month_start(month, 1)
+
+    op.execute("CREATE INDEX ix_audit_entity ON audit_logs (entity, entity_id, created_at)")
+    op.execute("CREATE INDEX ix_audit_actor ON audit_logs (actor_worker_id, created_at)")
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_unpartitioned")
+    op.execute("SELECT setval(pg_get_serial_sequence('audit_logs', 'id'), COALESCE((SELECT max(id) FROM audit_logs), 0) + 1, false)")
+    op.execute("DROP TABLE audit_logs_unpartitioned")
+
+def downgrade():
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq RENAME TO audit_logs_partitioned_id_seq")
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("actor_worker_id", sa.Integer, sa.ForeignKey("workers.id")),
+        sa.Column("actor_person_id", sa.Integer, sa.ForeignKey("people.id")),
+        sa.Column("action", sa.String(64), nullable=False),
+        sa.Column("entity", sa.String(64), nullable=False),
+        sa.Column("entity_id", sa.String(64)),
+        sa.Column("meta_json", sa.JSON),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned")
+    op.execute("SELECT setval(pg_get_serial_sequence('audit_logs', 'id'), COALESCE((SELECT max(id) FROM audit_logs), 0) + 1, false)")
+    op.execute("DROP TABLE audit_logs_partitioned")
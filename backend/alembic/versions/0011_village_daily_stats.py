@@ -0,0 +1,50 @@
+"""village_daily_stats: per-village, per-day dashboard rollups
+
+Revision ID: 0011_village_daily_stats
+Revises: 0010_audit_partitions
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_village_daily_stats"
+down_revision = "0010_audit_partitions"
+branch_labels = None
+depends_on = None
+
+# all-history backfill, frozen here rather than calling app.rollups.recompute
+BACKFILL = """
+    INSERT INTO village_daily_stats (village_id, day, people_registered, encounters_submitted, verified, red, amber, green)
+    SELECT village_id, day, sum(people), sum(submitted), sum(verified), sum(red), sum(amber), sum(green)
+    FROM (
+        SELECT p.village_id, (p.created_at AT TIME ZONE 'UTC')::date AS day,
+               1 AS people, 0 AS submitted, 0 AS verified, 0 AS red, 0 AS amber, 0 AS green
+        FROM people p
+        UNION ALL
+        SELECT p.village_id, (e.submitted_at AT TIME ZONE 'UTC')::date,
+               0, 1, (e.status = 'VERIFIED')::int,
+               (d.rag = 'RED')::int, (d.rag = 'AMBER')::int, (COALESCE(d.rag, 'GREEN') NOT IN ('RED', 'AMBER'))::int
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        LEFT JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+    ) x
+    GROUP BY village_id, day
+"""
+
+def _counter(name):
+    return sa.Column(name, sa.Integer, nullable=False, server_default="0")
+
+def upgrade():
+    op.create_table(
+        "village_daily_stats",
+        sa.Column("village_id", sa.Integer, sa.ForeignKey("villages.id"), primary_key=True),
+        sa.Column("day", sa.Date, primary_key=True),
+        *[_counter(c) for c in ("people_registered", "encounters_submitted", "verified", "red", "amber", "green")],
+    )
+    op.create_index("ix_village_daily_stats_day", "village_daily_stats", ["day"])
+    op.execute(BACKFILL)
+
+def downgrade():
+    op.drop_index("ix_village_daily_stats_day", table_name="village_daily_stats")
+    op.drop_table("village_daily_stats")
@@ -0,0 +1,27 @@
+"""households/people: external keys for census import upserts
+
+Revision ID: 0012_census_keys
+Revises: 0011_village_daily_stats
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_census_keys"
+down_revision = "0011_village_daily_stats"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("households", sa.Column("external_key", sa.String(64)))
+    op.add_column("people", sa.Column("external_key", sa.String(64)))
+    op.create_index("ux_households_village_key", "households", ["village_id", "external_key"], unique=True,
+                    postgresql_where=sa.text("external_key IS NOT NULL"))
+    op.create_index("ux_people_village_key", "people", ["village_id", "external_key"], unique=True,
+                    postgresql_where=sa.text("external_key IS NOT NULL"))
+
+def downgrade():
+    op.drop_index("ux_people_village_key", table_name="people")
+    op.drop_index("ux_households_village_key", table_name="households")
+    op.drop_column("people", "external_key")
+    op.drop_column("households", "external_key")
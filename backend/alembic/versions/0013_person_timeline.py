@@ -0,0 +1,79 @@
+"""person_latest / person_history: per-person timeline, encounters(person_id) index
+
+Revision ID: 0013_person_timeline
+Revises: 0012_census_keys
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_person_timeline"
+down_revision = "0012_census_keys"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_encounters_person_submitted", "encounters", ["person_id", "submitted_at"])
+    op.create_table(
+        "person_latest",
+        sa.Column("person_id", sa.Integer, sa.ForeignKey("people.id"), primary_key=True),
+        sa.Column("village_id", sa.Integer, sa.ForeignKey("villages.id"), nullable=False),
+        sa.Column("encounter_id", sa.Integer, sa.ForeignKey("encounters.id"), nullable=False),
+        sa.Column("screened_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("rag", sa.String(8), nullable=False),
+        sa.Column("overall_score", sa.Integer, nullable=True),
+        sa.Column("sbp_avg", sa.Integer, nullable=True),
+        sa.Column("dbp_avg", sa.Integer, nullable=True),
+        sa.Column("glucose_value", sa.Integer, nullable=True),
+        sa.Column("bmi", sa.Numeric(5, 2), nullable=True),
+        sa.Column("spo2", sa.Integer, nullable=True),
+    )
+    op.create_index("ix_person_latest_village", "person_latest", ["village_id"])
+    op.create_table(
+        "person_history",
+        sa.Column("person_id", sa.Integer, sa.ForeignKey("people.id"), primary_key=True),
+        sa.Column("t", sa.ARRAY(sa.DateTime(timezone=True)), nullable=False),
+        sa.Column("encounter_id", sa.ARRAY(sa.Integer), nullable=False),
+        sa.Column("sbp_avg", sa.ARRAY(sa.Integer), nullable=False),
+        sa.Column("dbp_avg", sa.ARRAY(sa.Integer), nullable=False),
+        sa.Column("glucose_value", sa.ARRAY(sa.Integer), nullable=False),
+        sa.Column("bmi", sa.ARRAY(sa.Float), nullable=False),
+        sa.Column("spo2", sa.ARRAY(sa.Integer), nullable=False),
+        sa.Column("rag", sa.ARRAY(sa.String(8)), nullable=False),
+        sa.Column("overall_score", sa.ARRAY(sa.Integer), nullable=False),
+    )
+    # backfill all history
+    op.execute("""
+        INSERT INTO person_latest (person_id, village_id, encounter_id, screened_at, rag, overall_score,
+                                   sbp_avg, dbp_avg, glucose_value, bmi, spo2)
+        SELECT DISTINCT ON (e.person_id)
+               e.person_id, p.village_id, e.id, e.submitted_at, d.rag, d.overall_score,
+               v.sbp_avg, v.dbp_avg, t.glucose_value, v.bmi, v.spo2
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        JOIN derived_results d ON d.encounter_id = e.id
+        LEFT JOIN vitals v ON v.encounter_id = e.id
+        LEFT JOIN tests t ON t.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        ORDER BY e.person_id, e.submitted_at DESC, e.id DESC
+    """)
+    op.execute("""
+        INSERT INTO person_history (person_id, t, encounter_id, sbp_avg, dbp_avg, glucose_value, bmi, spo2, rag, overall_score)
+        SELECT e.person_id,
+               array_agg(e.submitted_at ORDER BY e.submitted_at, e.id), array_agg(e.id ORDER BY e.submitted_at, e.id),
+               array_agg(v.sbp_avg ORDER BY e.submitted_at, e.id), array_agg(v.dbp_avg ORDER BY e.submitted_at, e.id), array_agg(t.glucose_value ORDER BY e.submitted_at, e.id),
+               array_agg(v.bmi::float8 ORDER BY e.submitted_at, e.id), array_agg(v.spo2 ORDER BY e.submitted_at, e.id),
+               array_agg(d.rag ORDER BY e.submitted_at, e.id), array_agg(d.overall_score ORDER BY e.submitted_at, e.id)
+        FROM encounters e
+        LEFT JOIN vitals v ON v.encounter_id = e.id
+        LEFT JOIN tests t ON t.encounter_id = e.id
+        LEFT JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        GROUP BY e.person_id
+    """)
+
+def downgrade():
+    op.drop_table("person_history")
+    op.drop_index("ix_person_latest_village", table_name="person_latest")
+    op.drop_table("person_latest")
+    op.drop_index("ix_encounters_person_submitted", table_name="encounters")
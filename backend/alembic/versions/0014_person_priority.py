@@ -0,0 +1,70 @@
+"""person_priority: per-person priority for the village top-K list
+
+Revision ID: 0014_person_priority
+Revises: 0013_person_timeline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014_person_priority"
+down_revision = "0013_person_timeline"
+branch_labels = None
+depends_on = None
+
+# app.priority's village refresh as of this revision, frozen; the table starts empty
+BACKFILL = """
+    INSERT INTO person_priority (person_id, village_id, household_id, hamlet, rag, overall_score,
+                                  followup_date, missed_reminders, household_flagged, priority, computed_at)
+    SELECT p.id, p.village_id, p.household_id, h.hamlet, l.rag, l.overall_score,
+           w.followup_date, m.n, f.n,
+           CASE l.rag WHEN 'RED' THEN 1000 WHEN 'AMBER' THEN 400 ELSE 0 END
+           + 2 * COALESCE(l.overall_score, 0)
+           + 3 * LEAST(GREATEST(CURRENT_DATE - w.followup_date, 0), 180)
+           + 50 * LEAST(m.n, 5)
+           + 100 * LEAST(f.n, 3),
+           now()
+    FROM people p
+    JOIN households h ON h.id = p.household_id
+    LEFT JOIN person_latest l ON l.person_id = p.id
+    LEFT JOIN followup_worklist w ON w.person_id = p.id
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS n FROM reminder_logs r
+        WHERE r.person_id = p.id AND r.outcome IN ('not_reached', 'declined')
+          AND r.created_at >= COALESCE(l.screened_at, '-infinity')
+    ) m
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS n FROM people q JOIN person_latest ql ON ql.person_id = q.id
+        WHERE q.household_id = p.household_id AND q.id <> p.id AND ql.rag IN ('RED', 'AMBER')
+    ) f
+"""
+
+def upgrade():
+    op.create_index("ix_people_household", "people", ["household_id"])
+    op.create_index("ix_reminder_logs_person", "reminder_logs", ["person_id", "created_at"])
+    op.create_table(
+        "person_priority",
+        sa.Column("person_id", sa.Integer, sa.ForeignKey("people.id"), primary_key=True),
+        sa.Column("village_id", sa.Integer, sa.ForeignKey("villages.id"), nullable=False),
+        sa.Column("household_id", sa.Integer, sa.ForeignKey("households.id"), nullable=False),
+        sa.Column("hamlet", sa.String(120), nullable=True),
+        sa.Column("rag", sa.String(8), nullable=True),
+        sa.Column("overall_score", sa.Integer, nullable=True),
+        sa.Column("followup_date", sa.Date, nullable=True),
+        sa.Column("missed_reminders", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("household_flagged", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("priority", sa.Integer, nullable=False),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_person_priority_village", "person_priority",
+                    ["village_id", sa.text("priority DESC"), "person_id"])
+    op.create_index("ix_person_priority_hamlet", "person_priority",
+                    ["village_id", "hamlet", sa.text("priority DESC"), "person_id"])
+    op.execute(BACKFILL)
+
+def downgrade():
+    op.drop_index("ix_person_priority_hamlet", table_name="person_priority")
+    op.drop_index("ix_person_priority_village", table_name="person_priority")
+    op.drop_table("person_priority")
+    op.drop_index("ix_reminder_logs_person", table_name="reminder_logs")
+    op.drop_index("ix_people_household", table_name="people")
@@ -0,0 +1,18 @@
+"""camps(date, updated_at): version check for the nearby-camp index
+
+Revision ID: 0015_camps_date_index
+Revises: 0014_person_priority
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0015_camps_date_index"
+down_revision = "0014_person_priority"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_camps_date_updated", "camps", ["date", "updated_at"])
+
+def downgrade():
+    op.drop_index("ix_camps_date_updated", table_name="camps")
@@ -0,0 +1,41 @@
+"""encounters.screened_at: when a screening happened, for the follow-up worklist
+
+Revision ID: 0016_encounter_screened_at
+Revises: 0015_camps_date_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0016_encounter_screened_at"
+down_revision = "0015_camps_date_index"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("encounters", sa.Column("screened_at", sa.DateTime(timezone=True)))
+    # client_submitted_at was never stored: the device's create time is the best record left
+    op.execute("""
+        UPDATE encounters SET screened_at = LEAST(COALESCE(client_created_at, submitted_at), submitted_at)
+        WHERE submitted_at IS NOT NULL
+    """)
+    # re-pick each person's latest screening by that time
+    op.execute("""
+        INSERT INTO followup_worklist (person_id, village_id, encounter_id, followup_date, rag, rag_rank, screened_at)
+        SELECT DISTINCT ON (e.person_id)
+               e.person_id, p.village_id, e.id, d.followup_date, d.rag,
+               CASE d.rag WHEN 'RED' THEN 0 WHEN 'AMBER' THEN 1 ELSE 2 END,
+               e.screened_at
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        ORDER BY e.person_id, e.screened_at DESC, e.id DESC
+        ON CONFLICT (person_id) DO UPDATE SET
+            village_id = excluded.village_id, encounter_id = excluded.encounter_id,
+            followup_date = excluded.followup_date, rag = excluded.rag,
+            rag_rank = excluded.rag_rank, screened_at = excluded.screened_at
+    """)
+
+def downgrade():
+    op.drop_column("encounters", "screened_at")
@@ -0,0 +1,48 @@
+"""person_latest / person_history: re-place every point at its screening time
+
+Revision ID: 0017_timeline_screened_at
+Revises: 0016_encounter_screened_at
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0017_timeline_screened_at"
+down_revision = "0016_encounter_screened_at"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # rebuilt whole: both tables were keyed on upload time (submitted_at)
+    op.execute("DELETE FROM person_latest")
+    op.execute("DELETE FROM person_history")
+    op.execute("""
+        INSERT INTO person_latest (person_id, village_id, encounter_id, screened_at, rag, overall_score,
+                                   sbp_avg, dbp_avg, glucose_value, bmi, spo2)
+        SELECT DISTINCT ON (e.person_id)
+               e.person_id, p.village_id, e.id, e.screened_at, d.rag, d.overall_score,
+               v.sbp_avg, v.dbp_avg, t.glucose_value, v.bmi, v.spo2
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        JOIN derived_results d ON d.encounter_id = e.id
+        LEFT JOIN vitals v ON v.encounter_id = e.id
+        LEFT JOIN tests t ON t.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        ORDER BY e.person_id, e.screened_at DESC, e.id DESC
+    """)
+    op.execute("""
+        INSERT INTO person_history (person_id, t, encounter_id, sbp_avg, dbp_avg, glucose_value, bmi, spo2, rag, overall_score)
+        SELECT e.person_id,
+               array_agg(e.screened_at ORDER BY e.screened_at, e.id), array_agg(e.id ORDER BY e.screened_at, e.id),
+               array_agg(v.sbp_avg ORDER BY e.screened_at, e.id), array_agg(v.dbp_avg ORDER BY e.screened_at, e.id), array_agg(t.glucose_value ORDER BY e.screened_at, e.id),
+               array_agg(v.bmi::float8 ORDER BY e.screened_at, e.id), array_agg(v.spo2 ORDER BY e.screened_at, e.id),
+               array_agg(d.rag ORDER BY e.screened_at, e.id), array_agg(d.overall_score ORDER BY e.screened_at, e.id)
+        FROM encounters e
+        LEFT JOIN vitals v ON v.encounter_id = e.id
+        LEFT JOIN tests t ON t.encounter_id = e.id
+        LEFT JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at IS NOT NULL
+        GROUP BY e.person_id
+    """)
+
+def downgrade():
+    pass  # points keep their screening times; nothing to restore
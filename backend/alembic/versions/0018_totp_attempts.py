@@ -0,0 +1,31 @@
+"""TOTP failed-attempt lockout; per-encounter verifying timestep for offline anti-replay
+
+Revision ID: 0018_totp_attempts
+Revises: 0017_timeline_screened_at
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0018_totp_attempts"
+down_revision = "0017_timeline_screened_at"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("totp_secrets", sa.Column("replay_floor", sa.Integer, nullable=False, server_default="0"))
+    op.add_column("totp_secrets", sa.Column("failed_attempts", sa.Integer, nullable=False, server_default="0"))
+    op.add_column("totp_secrets", sa.Column("failed_at", sa.DateTime(timezone=True)))
+    # timesteps verified so far weren't recorded per encounter: everything up to the
+    # current watermark stays a replay
+    op.execute("UPDATE totp_secrets SET replay_floor = last_verified_timestep")
+    op.add_column("encounters", sa.Column("totp_timestep", sa.Integer))
+    op.create_index("ux_encounters_person_timestep", "encounters", ["person_id", "totp_timestep"], unique=True,
+                    postgresql_where=sa.text("totp_timestep IS NOT NULL"))
+
+def downgrade():
+    op.drop_index("ux_encounters_person_timestep", table_name="encounters")
+    op.drop_column("encounters", "totp_timestep")
+    op.drop_column("totp_secrets", "failed_at")
+    op.drop_column("totp_secrets", "failed_attempts")
+    op.drop_column("totp_secrets", "replay_floor")
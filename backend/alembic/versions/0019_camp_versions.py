@@ -0,0 +1,45 @@
+"""camp_versions: per-village camps version bumped by trigger, for ETags that move at commit
+
+Revision ID: 0019_camp_versions
+Revises: 0018_totp_attempts
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0019_camp_versions"
+down_revision = "0018_totp_attempts"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "camp_versions",
+        sa.Column("village_id", sa.Integer, sa.ForeignKey("villages.id"), primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+    )
+    # the row lock orders concurrent writers in a village, so each commit leaves a new value
+    op.execute("""
+        CREATE FUNCTION bump_camp_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                INSERT INTO camp_versions AS v (village_id, version) VALUES (OLD.village_id, 1)
+                ON CONFLICT (village_id) DO UPDATE SET version = v.version + 1;
+            END IF;
+            IF TG_OP = 'INSERT' OR NEW.village_id IS DISTINCT FROM OLD.village_id THEN
+                INSERT INTO camp_versions AS v (village_id, version) VALUES (NEW.village_id, 1)
+                ON CONFLICT (village_id) DO UPDATE SET version = v.version + 1;
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    op.execute("""
+        CREATE TRIGGER camps_version AFTER INSERT OR UPDATE OR DELETE ON camps
+        FOR EACH ROW EXECUTE FUNCTION bump_camp_version()
+    """)
+    op.execute("INSERT INTO camp_versions (village_id, version) SELECT DISTINCT village_id, 1 FROM camps")
+
+def downgrade():
+    op.execute("DROP TRIGGER camps_version ON camps")
+    op.execute("DROP FUNCTION bump_camp_version()")
+    op.drop_table("camp_versions")
@@ -0,0 +1,20 @@
+"""people: phone-suffix index on the number's digits only
+
+Revision ID: 0020_people_phone_digits
+Revises: 0019_camp_versions
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0020_people_phone_digits"
+down_revision = "0019_camp_versions"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute(r"CREATE INDEX ix_people_phone_digits_rev ON people (reverse(regexp_replace(phone, '\D', '', 'g')) text_pattern_ops)")
+    op.drop_index("ix_people_phone_rev", table_name="people")
+
+def downgrade():
+    op.execute("CREATE INDEX ix_people_phone_rev ON people (reverse(phone) text_pattern_ops)")
+    op.drop_index("ix_people_phone_digits_rev", table_name="people")
@@ -0,0 +1,222 @@
+# Write-behind audit log. Handlers call record() (or use the audit_read() dependency);
+# events go into a bounded in-process queue and a background thread writes them to
+# audit_logs with one COPY per flush, when AUDIT_FLUSH_SIZE events are waiting or every
+# AUDIT_FLUSH_S seconds. When the queue is full or the database refuses a flush, events
+# are written to NDJSON spool files instead (one complete file per batch) and replayed by
+# the next successful flush, so nothing is dropped. Events are not part of the request's transaction: record them
+# after the commit they describe.
+import atexit, csv, io, json, logging, os, queue, threading, time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from fastapi import Depends, Request
+from sqlalchemy import insert
+from .config import settings
+from .db import engine
+from .models import AuditLog
+from .security import get_principal, Principal
+
+log = logging.getLogger(__name__)
+
+REPLAY_EVERY_S = 30
+COLUMNS = ("actor_worker_id", "actor_person_id", "action", "entity", "entity_id", "meta_json", "created_at")
+
+def _event(action, entity, entity_id, actor_worker_id, actor_person_id, meta) -> dict:
+    return {
+        "actor_worker_id": actor_worker_id, "actor_person_id": actor_person_id,
+        "action": action, "entity": entity,
+        "entity_id": None if entity_id is None else str(entity_id),
+        "meta_json": meta, "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+class AuditWriter:
+    def __init__(self, max_queue: int, flush_size: int, flush_s: float, spool_dir: str):
+        self._q: queue.Queue = queue.Queue(max_queue)
+        self.flush_size = flush_size
+        self.flush_s = flush_s
+        self.spool_dir = Path(spool_dir)
+        self._spool_lock = threading.Lock()
+        self._overflow: list[dict] = []  # put() when the queue is full; spooled by the writer thread
+        self._overflow_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._next_replay = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if overflow := self._take_overflow():
+            self._spool(overflow)
+        self._flush(self._drain())  # anything recorded after the thread's last pass
+
+    def put(self, event: dict):
+        if self._thread is None:
+            self.start()
+        try:
+            self._q.put_nowait(event)
+        except queue.Full:
+            # no file I/O here: put() runs on the event loop (audit_read)
+            with self._overflow_lock:
+                self._overflow.append(event)
+            self._wake.set()
+            return
+        if self._q.qsize() >= self.flush_size:
+            self._wake.set()
+
+    def _drain(self) -> list[dict]:
+        out = []
+        while True:
+            try:
+                out.append(self._q.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _take_overflow(self) -> list[dict]:
+        with self._overflow_lock:
+            out, self._overflow = self._overflow, []
+        return out
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_s)
+            self._wake.clear()
+            if overflow := self._take_overflow():
+                self._spool(overflow)  # the database is already behind: straight to disk
+            self._flush(self._drain())
+
+    def _flush(self, events: list[dict]):
+        if events:
+            try:
+                self._write(events)
+            except Exception:
+                log.exception("audit flush failed; spooling %d events", len(events))
+                self._spool(events)
+                return
+        if time.monotonic() >= self._next_replay:
+            self._next_replay = time.monotonic() + REPLAY_EVERY_S
+            self._replay_spool()
+
+    def _write(self, events: list[dict]):
+        if engine.dialect.name != "postgresql":
+            with engine.begin() as conn:
+                conn.execute(insert(AuditLog.__table__), [
+                    {**e, "created_at": datetime.fromisoformat(e["created_at"])} for e in events
+                ])
+            return
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for e in events:
+            meta = e["meta_json"]
+            w.writerow([e[c] if c != "meta_json" else (None if meta is None else json.dumps(meta)) for c in COLUMNS])
+        buf.seek(0)
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.copy_expert(f"COPY audit_logs ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.close()
+            raw.commit()
+        finally:
+            raw.close()
+
+    def _spool(self, events: list[dict]):
+        # one complete file per batch, renamed into place only once it is on disk: replay never
+        # sees a file that is still being written, by this process or another worker
+        with self._spool_lock:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{os.getpid()}-{time.time_ns()}"
+            tmp = self.spool_dir / f".spool-{name}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in events:
+                    f.write(json.dumps(e) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.spool_dir / f"audit-{name}.ndjson")
+
+    def _adopt_orphans(self):
+        # files claimed, or half-written, by a process that has since died
+        for path in self.spool_dir.glob("replay-*.ndjson"):
+            if not _alive(int(path.name.split("-")[1])):
+                try:
+                    path.rename(path.with_name(f"audit-adopted-{time.time_ns()}.ndjson"))
+                except OSError:
+                    continue  # another process adopted it first
+                log.warning("adopted audit spool %s from a dead process", path.name)
+        for path in self.spool_dir.glob(".spool-*.tmp"):
+            if not _alive(int(path.name.split("-")[1])):
+                path.unlink(missing_ok=True)  # never renamed into place: its writer died mid-write
+
+    def _replay_spool(self):
+        if not self.spool_dir.is_dir():
+            return
+        self._adopt_orphans()
+        for path in sorted(self.spool_dir.glob("audit-*.ndjson")):
+            # claim by rename, so two processes sharing the directory never replay one file twice
+            claimed = path.with_name(f"replay-{os.getpid()}-{time.time_ns()}-{path.name}")
+            try:
+                path.rename(claimed)
+            except OSError:
+                continue
+            events = [json.loads(line) for line in claimed.read_text(encoding="utf-8").splitlines() if line.strip()]
+            try:
+                self._write(events)  # the whole file in one transaction, so a retry can't duplicate rows
+            except Exception:
+                claimed.rename(path.with_name(f"audit-retry-{os.getpid()}-{time.time_ns()}.ndjson"))
+                log.warning("audit spool replay failed; kept %s", path.name)
+                return
+            claimed.unlink()
+            log.info("replayed %d spooled audit events", len(events))
+
+def _alive(pid: int) -> bool:
+    # the spool directory is per host, so a pid names the same process for every reader
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+writer = AuditWriter(settings.AUDIT_QUEUE_MAX, settings.AUDIT_FLUSH_SIZE, settings.AUDIT_FLUSH_S, settings.AUDIT_SPOOL_DIR)
+
+def month_start(d: date, add: int = 0) -> date:
+    m = d.year * 12 + d.month - 1 + add
+    return date(m // 12, m % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_y{month.year}m{month.month:02d}"
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{month_start(month, 1).isoformat()} 00:00+00')"
+    )
+
+def record(action: str, entity: str, entity_id=None, *, actor_worker_id: int | None = None,
+           actor_person_id: int | None = None, meta: dict | None = None):
+    writer.put(_event(action, entity, entity_id, actor_worker_id, actor_person_id, meta))
+
+def record_by(pr: Principal, action: str, entity: str, entity_id=None, meta: dict | None = None):
+    record(
+        action, entity, entity_id, meta=meta,
+        actor_worker_id=pr.worker.id if pr.worker else None,
+        actor_person_id=pr.person.id if pr.person else None,
+    )
+
+def audit_read(entity: str):
+    """Route dependency: one `read` event per request for endpoints that return patient data."""
+    async def dep(request: Request, pr: Principal = Depends(get_principal)):
+        record_by(pr, "read", entity, request.path_params.get(f"{entity}_id"),
+                  meta={"path": request.url.path, "query": str(request.url.query) or None})
+    return dep
@@ -0,0 +1,39 @@
+# Small in-process TTL cache. Per worker process: invalidation only reaches the process
+# it runs in, so the TTL is the bound on staleness everywhere else.
+import threading, time
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: dict = {}  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            if hit[0] < time.monotonic():
+                del self._data[key]
+                return default
+            return hit[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                del self._data[next(iter(self._data))]
+
+    def pop(self, key):
+        with self._lock:
+            hit = self._data.pop(key, None)
+        return hit[1] if hit else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
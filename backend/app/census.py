@@ -0,0 +1,261 @@
+# Census import: households and people from CSV or NDJSON, shared by POST /api/import/census/{kind}
+# and python -m app.scripts.import_census. Rows are handled CHUNK at a time: validated with
+# HouseholdImportIn/PersonImportIn, COPY'd into a temp staging table and applied with set-based
+# upserts keyed by (village_id, external_key), one transaction per chunk. A row that fails
+# validation, names an unknown village or household, or is outside the caller's villages is
+# reported by row number and skipped; the rest of the file still loads.
+import csv, io, json
+from collections import Counter
+from datetime import date
+from typing import Iterable, Iterator, TextIO
+import psycopg2
+from pydantic import ValidationError
+from sqlalchemy import Integer, String, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from .models import Household, Person
+from .phonetic import name_key
+from .schemas import HouseholdImportIn, PersonImportIn, ImportReport, ImportRowError
+from . import rollups
+
+CHUNK = 5000
+KINDS = {"households": HouseholdImportIn, "people": PersonImportIn}
+FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson", "application/json": "ndjson"}
+JSON_FIELDS = ("demographics_json", "risk_survey_json")
+
+def format_for(content_type: str | None) -> str | None:
+    return FORMATS.get((content_type or "").split(";")[0].strip().lower())
+
+def read_rows(f: TextIO, fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """(row number, record) for each data row; a str record is that row's parse error."""
+    if fmt == "csv":
+        for i, rec in enumerate(csv.DictReader(f), 1):
+            row = {k.strip(): v for k, v in rec.items() if k and v not in (None, "")}
+            for k in JSON_FIELDS:
+                if k in row:
+                    try:
+                        row[k] = json.loads(row[k])
+                    except ValueError:
+                        pass  # left as text, so validation names the field
+            yield i, row
+        return
+    for i, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            yield i, "invalid JSON"
+            continue
+        yield i, rec if isinstance(rec, dict) else "expected a JSON object"
+
+def _messages(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors())
+
+def _too_long(model, values: dict) -> str | None:
+    # the staging tables are text; catch what the real columns would reject before the upsert
+    for k, v in values.items():
+        col = model.__table__.c.get("external_key" if k == "key" else k)
+        if isinstance(v, str) and col is not None and isinstance(col.type, String) and col.type.length and len(v) > col.type.length:
+            return f"{k}: longer than {col.type.length} characters"
+    return None
+
+INT4 = (-2**31, 2**31 - 1)
+
+def _out_of_range(model, values: dict) -> str | None:
+    # ids are int4 columns, but the schemas accept any Python int; a huge one would fail the whole COPY
+    for k, v in values.items():
+        col = model.__table__.c.get(k)
+        if isinstance(v, int) and col is not None and type(col.type) is Integer and not INT4[0] <= v <= INT4[1]:
+            return f"{k}: out of range"
+    return None
+
+def _has_nul(v) -> bool:
+    # Postgres text and jsonb can't hold U+0000; caught here it fails one row, not the COPY of its chunk
+    if isinstance(v, str):
+        return "\x00" in v
+    if isinstance(v, dict):
+        return any(_has_nul(k) or _has_nul(x) for k, x in v.items())
+    if isinstance(v, list):
+        return any(_has_nul(x) for x in v)
+    return False
+
+STAGE = {
+    "households": ("census_households_stage", """
+        CREATE TEMP TABLE IF NOT EXISTS census_households_stage (
+            row_no int, village_id int, key text, hamlet text, address text, head_name text, phone text
+        ) ON COMMIT DELETE ROWS
+    """, ("village_id", "key", "hamlet", "address", "head_name", "phone")),
+    "people": ("census_people_stage", """
+        CREATE TEMP TABLE IF NOT EXISTS census_people_stage (
+            row_no int, village_id int, household_id int, household_key text, key text, full_name text,
+            name_key text, sex text, dob date, phone text, demographics_json jsonb, risk_survey_json jsonb
+        ) ON COMMIT DELETE ROWS
+    """, ("village_id", "household_id", "household_key", "key", "full_name", "name_key", "sex", "dob", "phone",
+          "demographics_json", "risk_survey_json")),
+}
+
+UNKNOWN_VILLAGE = text("""
+    DELETE FROM census_households_stage s
+    WHERE NOT EXISTS (SELECT 1 FROM villages v WHERE v.id = s.village_id)
+    RETURNING row_no
+""")
+
+# later rows win when a key repeats within a chunk; unchanged rows are left alone (and not returned)
+UPSERT_HOUSEHOLDS = text("""
+    INSERT INTO households AS h (village_id, external_key, hamlet, address, head_name, phone)
+    SELECT DISTINCT ON (village_id, key) village_id, key, hamlet, address, head_name, phone
+    FROM census_households_stage
+    ORDER BY village_id, key, row_no DESC
+    ON CONFLICT (village_id, external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+        hamlet = excluded.hamlet, address = excluded.address, head_name = excluded.head_name,
+        phone = excluded.phone, updated_at = now()
+    WHERE (h.hamlet, h.address, h.head_name, h.phone)
+          IS DISTINCT FROM (excluded.hamlet, excluded.address, excluded.head_name, excluded.phone)
+    RETURNING h.village_id, h.xmax = 0 AS inserted
+""")
+
+RESOLVE_HOUSEHOLDS = text("""
+    UPDATE census_people_stage s SET household_id = h.id
+    FROM households h
+    WHERE s.household_id IS NULL AND h.village_id = s.village_id AND h.external_key = s.household_key
+""")
+
+UNKNOWN_HOUSEHOLD = text("""
+    DELETE FROM census_people_stage s
+    WHERE NOT EXISTS (SELECT 1 FROM households h WHERE h.id = s.household_id AND h.village_id = s.village_id)
+    RETURNING row_no
+""")
+
+_PEOPLE_COLS = "household_id, village_id, external_key, full_name, name_key, sex, dob, phone, demographics_json, risk_survey_json"
+_PEOPLE_SRC = "household_id, village_id, key, full_name, name_key, sex, dob, phone, demographics_json, risk_survey_json"
+
+UPSERT_PEOPLE = text(f"""
+    INSERT INTO people AS p ({_PEOPLE_COLS})
+    SELECT DISTINCT ON (village_id, key) {_PEOPLE_SRC}
+    FROM census_people_stage
+    WHERE key IS NOT NULL
+    ORDER BY village_id, key, row_no DESC
+    ON CONFLICT (village_id, external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+        household_id = excluded.household_id, full_name = excluded.full_name, name_key = excluded.name_key,
+        sex = excluded.sex, dob = excluded.dob, phone = excluded.phone,
+        demographics_json = excluded.demographics_json, risk_survey_json = excluded.risk_survey_json,
+        updated_at = now()
+    WHERE (p.household_id, p.full_name, p.sex, p.dob, p.phone, p.demographics_json::jsonb, p.risk_survey_json::jsonb)
+          IS DISTINCT FROM (excluded.household_id, excluded.full_name, excluded.sex, excluded.dob, excluded.phone,
+                            excluded.demographics_json::jsonb, excluded.risk_survey_json::jsonb)
+    RETURNING p.village_id, p.xmax = 0 AS inserted
+""")
+
+# rows without a key can't be matched again later: always new people
+INSERT_PEOPLE = text(f"""
+    INSERT INTO people ({_PEOPLE_COLS})
+    SELECT {_PEOPLE_SRC} FROM census_people_stage WHERE key IS NULL ORDER BY row_no
+    RETURNING village_id, true AS inserted
+""")
+
+def _cell(v):
+    if isinstance(v, (dict, list)):
+        return json.dumps(v)
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+class _Report:
+    def __init__(self, kind: str, max_errors: int | None):
+        self.kind, self.max_errors = kind, max_errors
+        self.rows = self.inserted = self.updated = self.failed = 0
+        self.errors: list[ImportRowError] = []
+        self.truncated = False
+
+    def fail(self, row: int, error: str):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append(ImportRowError(row=row, error=error))
+        else:
+            self.truncated = True
+
+    def out(self) -> ImportReport:
+        return ImportReport(
+            kind=self.kind, rows=self.rows, inserted=self.inserted, updated=self.updated,
+            unchanged=self.rows - self.failed - self.inserted - self.updated, failed=self.failed,
+            errors=self.errors, errors_truncated=self.truncated,
+        )
+
+def _apply(db: Session, kind: str, staged: list[tuple[int, dict]], report: _Report):
+    table, ddl, cols = STAGE[kind]
+    buf = io.StringIO()
+    csv.writer(buf).writerows([row_no, *(_cell(values.get(c)) for c in cols)] for row_no, values in staged)
+    buf.seek(0)
+    db.execute(text(ddl))
+    cur = db.connection().connection.cursor()
+    cur.copy_expert(f"COPY {table} (row_no, {', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.close()
+
+    if kind == "households":
+        missing = db.scalars(UNKNOWN_VILLAGE).all()
+        for r in missing:
+            report.fail(r, "village_id: unknown village")
+        changed = db.execute(UPSERT_HOUSEHOLDS).all()
+    else:
+        db.execute(RESOLVE_HOUSEHOLDS)
+        for r in db.scalars(UNKNOWN_HOUSEHOLD).all():
+            report.fail(r, "household: no such household in this village")
+        changed = db.execute(UPSERT_PEOPLE).all() + db.execute(INSERT_PEOPLE).all()
+        new_people = Counter(v for v, inserted in changed if inserted)
+        for village_id, n in new_people.items():
+            db.execute(rollups.bump(village_id, rollups.utc_day(), people_registered=n))
+    inserted = sum(1 for _, ins in changed if ins)
+    report.inserted += inserted
+    report.updated += len(changed) - inserted
+
+def import_rows(db: Session, kind: str, rows: Iterable[tuple[int, dict | str]], villages: set[int] | None = None,
+                max_errors: int | None = 1000, on_chunk=None) -> ImportReport:
+    """Load `rows` (from read_rows) CHUNK at a time; villages, when given, limits which may be written."""
+    schema = KINDS[kind]
+    model = Household if kind == "households" else Person
+    report = _Report(kind, max_errors)
+    staged: list[tuple[int, dict]] = []
+
+    def flush():
+        if not staged:
+            return
+        try:
+            _apply(db, kind, staged, report)
+            db.commit()
+        except (SQLAlchemyError, psycopg2.Error) as e:
+            # the COPY runs on the raw DBAPI cursor, so its errors aren't wrapped by SQLAlchemy
+            db.rollback()
+            reason = str(getattr(e, "orig", e)).splitlines()[0]
+            for row_no, _ in staged:
+                report.fail(row_no, f"chunk not loaded: {reason}")
+        staged.clear()
+        if on_chunk:
+            on_chunk(report)
+
+    for row_no, rec in rows:
+        report.rows += 1
+        if isinstance(rec, str):
+            report.fail(row_no, rec)
+            continue
+        try:
+            values = schema.model_validate(rec).model_dump()
+        except ValidationError as e:
+            report.fail(row_no, _messages(e))
+            continue
+        if villages is not None and values["village_id"] not in villages:
+            report.fail(row_no, "village_id: not one of your villages")
+            continue
+        if problem := _too_long(model, values) or _out_of_range(model, values):
+            report.fail(row_no, problem)
+            continue
+        if bad := next((k for k, v in values.items() if _has_nul(v)), None):
+            report.fail(row_no, f"{bad}: contains a NUL character")
+            continue
+        if kind == "people":
+            values["name_key"] = name_key(values["full_name"])
+        staged.append((row_no, values))
+        if len(staged) >= CHUNK:
+            flush()
+    flush()
+    return report.out()
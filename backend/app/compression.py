@@ -0,0 +1,150 @@
+# Single content-encoding layer: negotiates br/gzip and compresses the body chunk by
+# chunk as the app sends it, so nothing is buffered beyond the first chunk and the app
+# runs exactly once.
+import zlib
+from time import perf_counter
+import brotli
+
+# Types that are already compressed (or meant to be read as they arrive) pass through.
+SKIP_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip", "application/x-gzip")
+
+# Per-route levels: {"br": quality 0-11, "gzip": level 1-9}. First matching prefix wins.
+ROUTE_LEVELS = [
+    ("/api/export", {"br": 4, "gzip": 5}),     # long streams: throughput over ratio
+    ("/api/sync/batch", {"br": 5, "gzip": 6}),
+]
+SMALL_BODY = 64 * 1024
+SMALL_LEVELS = {"br": 6, "gzip": 6}  # cheap enough below SMALL_BODY, noticeably smaller than q4
+LARGE_LEVELS = {"br": 4, "gzip": 5}  # large or unknown-length bodies
+
+ENCODINGS = ("br", "gzip")  # server preference, only breaks ties between equal q-values
+
+# A handler that must not be compressed (e.g. a stream the client reads as it arrives)
+# sets this response header; the middleware passes the body through and drops the header.
+NO_COMPRESSION = "X-No-Compression"
+
+def _offered(accept_encoding: str) -> dict[str, float]:
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.strip()] = q
+    return offered
+
+def accepts(accept_encoding: str, encoding: str) -> bool:
+    offered = _offered(accept_encoding)
+    return offered.get(encoding, offered.get("*", 0.0)) > 0
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """The offered encoding with the highest q; q=0 means "not acceptable"."""
+    offered = _offered(accept_encoding)
+    q = {enc: offered.get(enc, offered.get("*", 0.0)) for enc in ENCODINGS}
+    best = max(ENCODINGS, key=lambda enc: q[enc])  # max keeps the first of equal q-values
+    return best if q[best] > 0 else None
+
+def choose_level(path: str, size: int | None, encoding: str) -> int:
+    for prefix, levels in ROUTE_LEVELS:
+        if path.startswith(prefix):
+            return levels[encoding]
+    if size is not None and size <= SMALL_BODY:
+        return SMALL_LEVELS[encoding]
+    return LARGE_LEVELS[encoding]
+
+class _Brotli:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+def compressor(encoding: str, level: int):
+    return _Brotli(level) if encoding == "br" else _Gzip(level)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        sample = scope.get("metrics")  # app.metrics, when enabled: raw size and compress time
+        start = None      # held until the first body chunk decides whether to compress
+        comp = None
+        passthrough = False
+
+        async def _send(message):
+            nonlocal start, comp, passthrough
+            if message["type"] == "http.response.start":
+                opt_out = NO_COMPRESSION.lower().encode()
+                start = {**message, "headers": [(k, v) for k, v in message.get("headers", []) if k.lower() != opt_out]}
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                ctype = headers.get(b"content-type", b"").decode("latin-1").lower()
+                passthrough = (
+                    opt_out in headers
+                    or b"content-encoding" in headers
+                    or b"no-transform" in headers.get(b"cache-control", b"")
+                    or any(ctype.startswith(t) for t in SKIP_TYPES)
+                )
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if comp is None:
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+                length = next((int(v) for k, v in start.get("headers", []) if k.lower() == b"content-length"), None)
+                size = length if length is not None else (None if more else len(body))
+                comp = compressor(encoding, choose_level(scope["path"], size, encoding))
+                vary = b", ".join(v for k, v in headers if k.lower() == b"vary")
+                if b"accept-encoding" not in vary.lower():
+                    headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+                    headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                headers.append((b"content-encoding", encoding.encode()))
+                await send({**start, "headers": headers})
+
+            t0 = perf_counter()
+            out = comp.compress(body)
+            if not more:
+                out += comp.finish()
+            if sample is not None:
+                sample.add("compress", perf_counter() - t0)
+                sample.raw_bytes = (sample.raw_bytes or 0) + len(body)
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, _send)
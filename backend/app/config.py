@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl
 from typing import List
+from pathlib import Path
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -9,15 +10,66 @@ class Settings(BaseSettings):
     APP_ENV: str = "dev"
 
     DATABASE_URL: str
+    # Serve the hot routers (enumeration, camps, encounters, clinician, tasks) from
+    # AsyncSession over asyncpg instead of threadpooled psycopg2 sessions.
+    DB_ASYNC: bool = False
+    ASYNC_POOL_SIZE: int = 20
+    ASYNC_MAX_OVERFLOW: int = 20
 
     JWT_SECRET: str
     JWT_ALG: str = "HS256"
     JWT_EXPIRES_MIN: int = 720
+    # Resolved workers/patients are cached per process; admin changes invalidate locally,
+    # other processes pick them up within the TTL.
+    PRINCIPAL_CACHE_TTL: int = 60
 
     FERNET_KEY: str
 
+    # Write-behind audit log (app/audit.py)
+    AUDIT_QUEUE_MAX: int = 50_000
+    AUDIT_FLUSH_SIZE: int = 1000
+    AUDIT_FLUSH_S: float = 2.0
+    AUDIT_SPOOL_DIR: str = str(Path(__file__).resolve().parents[1] / "audit_spool")
+    AUDIT_PARTITIONS_AHEAD: int = 3     # monthly partitions kept ready
+    AUDIT_RETENTION_MONTHS: int = 0     # 0 keeps every partition
+
+    # Background jobs (python -m app.worker); see app/jobs.py
+    JOB_CONCURRENCY: int = 4
+    JOB_POLL_S: float = 1.0        # idle sleep between claim attempts
+    JOB_LEASE_S: int = 900         # a RUNNING job older than this is presumed orphaned and retried
+    JOB_RETENTION_DAYS: int = 14   # finished jobs kept this long for timing stats
+    SYNC_OP_RETENTION_DAYS: int = 30  # replay window for retried sync uploads
+    # Offline-captured TOTP codes are accepted this long after they were read
+    TOTP_OFFLINE_MAX_AGE_HOURS: int = 72
+    # After this many wrong codes in a row a person's TOTP is locked for TOTP_LOCKOUT_MINUTES
+    TOTP_MAX_FAILED: int = 10
+    TOTP_LOCKOUT_MINUTES: int = 15
+    # Census uploads larger than this are refused with 413 before anything is imported
+    CENSUS_MAX_BYTES: int = 200 * 1024 * 1024
+
     CORS_ORIGINS: str = ""
 
+    # Nearby-camp index (app/nearby.py): how often a process re-checks the camps' version
+    CAMP_INDEX_CHECK_S: float = 5.0
+
+    # Prometheus metrics at GET /metrics (app/metrics.py); nothing is installed when off
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str = ""  # if set, scrapes must send Authorization: Bearer <token>
+
+    # Per-request statement profiling (app/querylog.py): slow queries, N+1 shapes, budgets
+    QUERY_PROFILE: bool = False
+    SLOW_QUERY_MS: float = 200.0
+    N_PLUS_ONE_MIN: int = 5       # same statement shape this many times in one request
+    QUERY_BUDGET: int = 0         # default statements per request; 0 for no limit
+    QUERY_BUDGETS: str = ""       # per endpoint, overriding QUERY_BUDGET: "GET /api/people=3,GET /api/me=0"
+
+    # Same rules.json the PWA ships; the server recomputes triage against it on submit
+    RULES_PATH: str = str(Path(__file__).resolve().parents[2] / "frontend" / "assets" / "rules.json")
+
+    def async_database_url(self) -> str:
+        scheme, rest = self.DATABASE_URL.split("://", 1)
+        return "postgresql+asyncpg://" + rest if scheme.startswith("postgres") else self.DATABASE_URL
+
     def cors_list(self) -> List[str]:
         if not self.CORS_ORIGINS.strip():
             return []
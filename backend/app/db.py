@@ -1,10 +1,20 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .config import settings
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
 
+# Only built when DB_ASYNC is on, so asyncpg is needed only by deployments that use it.
+async_engine = create_async_engine(
+    settings.async_database_url(),
+    pool_pre_ping=True,
+    pool_size=settings.ASYNC_POOL_SIZE,
+    max_overflow=settings.ASYNC_MAX_OVERFLOW,
+) if settings.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine else None
+
 class Base(DeclarativeBase):
     pass
 
@@ -14,3 +24,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
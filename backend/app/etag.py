@@ -0,0 +1,63 @@
+# Conditional GET for rarely-changing reads. Handlers derive a strong ETag from a cheap
+# version query, answer If-None-Match with 304, and keep the serialized (and compressed)
+# body per ETag so a repeat read costs no rebuild either. The version is part of the key,
+# so a write simply moves readers to a new entry. It must move at commit (a trigger-bumped
+# counter, xmin): max(updated_at) is each writer's transaction start, so a transaction that
+# started earlier but committed later wouldn't move it. The validator sent is per content
+# coding ("<tag>-br", "<tag>-gzip"), as strong validators must be; any of them matches.
+import hashlib
+from fastapi import Request, Response
+from pydantic import BaseModel
+from .cache import TTLCache
+from .compression import ENCODINGS, choose_encoding, choose_level, compressor
+
+BODY_CACHE_TTL = 300
+_bodies = TTLCache(BODY_CACHE_TTL, maxsize=2000)  # etag -> {encoding: bytes}
+MIN_COMPRESS = 500
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:32] + '"'
+
+def _tagged(etag: str, enc: str | None) -> str:
+    return f'{etag[:-1]}-{enc}"' if enc else etag
+
+def _headers(etag: str) -> dict:
+    # private: behind auth; no-cache: clients may keep it but must revalidate (cheaply, via 304)
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+def _match(request: Request, etag: str) -> str | None:
+    """The If-None-Match entry naming any coding of this version, if there is one."""
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return None
+    if inm.strip() == "*":
+        return etag
+    for t in inm.split(","):
+        t = t.strip().removeprefix("W/")
+        if t in (etag, *(_tagged(etag, enc) for enc in ENCODINGS)):
+            return t
+    return None
+
+def _respond(request: Request, etag: str, variants: dict) -> Response:
+    body = variants["identity"]
+    enc = choose_encoding(request.headers.get("accept-encoding") or "") if len(body) >= MIN_COMPRESS else None
+    headers = _headers(_tagged(etag, enc))
+    if enc:
+        if enc not in variants:
+            c = compressor(enc, choose_level(request.url.path, len(body), enc))
+            variants[enc] = c.compress(body) + c.finish()
+        body = variants[enc]
+        headers["Content-Encoding"] = enc  # already encoded: the compression middleware passes it through
+    return Response(body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, etag: str) -> Response | None:
+    """304 if the client has this version, the cached body if we do, else None."""
+    if (tag := _match(request, etag)) is not None:
+        return Response(status_code=304, headers=_headers(tag))  # the representation the client holds
+    variants = _bodies.get(etag)
+    return _respond(request, etag, variants) if variants else None
+
+def store_response(request: Request, etag: str, payload: BaseModel) -> Response:
+    variants = {"identity": payload.model_dump_json().encode()}
+    _bodies.set(etag, variants)
+    return _respond(request, etag, variants)
@@ -0,0 +1,178 @@
+# Background jobs: rows in `jobs`, claimed with FOR UPDATE SKIP LOCKED so any number of
+# worker processes (python -m app.worker), on any number of nodes, share one queue
+# without double-running a job. Handlers register with @handler("kind"); periodic ones
+# also get a SCHEDULES entry, which every worker enqueues idempotently (one row per slot).
+import logging, random, threading, time, traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, func, case, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from .config import settings
+from .db import SessionLocal
+from .models import Job
+
+log = logging.getLogger(__name__)
+
+BACKOFF_BASE_S = 30
+BACKOFF_MAX_S = 3600
+
+@dataclass(frozen=True)
+class Handler:
+    fn: object          # fn(db, payload) -> dict | None; may commit in batches, the worker commits the rest
+    timeout_s: int      # statement_timeout for every statement the job runs
+    max_attempts: int
+
+@dataclass(frozen=True)
+class Schedule:
+    kind: str
+    every_s: int
+
+HANDLERS: dict[str, Handler] = {}
+SCHEDULES: list[Schedule] = []
+
+def handler(kind: str, timeout_s: int = 300, max_attempts: int = 5, every_s: int | None = None):
+    def register(fn):
+        HANDLERS[kind] = Handler(fn, timeout_s, max_attempts)
+        if every_s:
+            SCHEDULES.append(Schedule(kind, every_s))
+        return fn
+    return register
+
+def enqueue(db: Session, kind: str, payload: dict | None = None, run_at: datetime | None = None,
+            dedupe_key: str | None = None, max_attempts: int | None = None):
+    """Queue a job in the caller's transaction. With a dedupe_key, a second enqueue is a no-op."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind}")
+    values = dict(
+        kind=kind, payload_json=payload, status="QUEUED", dedupe_key=dedupe_key,
+        max_attempts=max_attempts or HANDLERS[kind].max_attempts,
+    )
+    if run_at:
+        values["run_at"] = run_at
+    db.execute(pg_insert(Job).values(**values).on_conflict_do_nothing(index_elements=[Job.dedupe_key]))
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+def schedule_due(now: datetime | None = None):
+    # Every worker runs this; the per-slot dedupe key makes the enqueue happen once cluster-wide.
+    now = now or datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        for s in SCHEDULES:
+            slot = int(now.timestamp()) // s.every_s
+            run_at = datetime.fromtimestamp(slot * s.every_s, timezone.utc)
+            enqueue(db, s.kind, run_at=run_at, dedupe_key=f"{s.kind}@{slot}")
+        db.commit()
+
+def renew_leases(worker: str):
+    # heartbeat from the worker's main loop: its RUNNING jobs stay leased however long they take
+    with SessionLocal() as db:
+        db.execute(update(Job).where(Job.status == "RUNNING", Job.locked_by == worker).values(locked_at=func.now()))
+        db.commit()
+
+def reap_expired():
+    """Requeue (or fail, if out of attempts) RUNNING jobs whose worker stopped heartbeating."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_LEASE_S)
+    exhausted = Job.attempts >= Job.max_attempts
+    with SessionLocal() as db:
+        n = db.execute(
+            update(Job)
+            .where(Job.status == "RUNNING", Job.locked_at < cutoff)
+            .values(
+                status=case((exhausted, "FAILED"), else_="QUEUED"),
+                finished_at=case((exhausted, func.now()), else_=None),
+                run_at=func.now(),
+                last_error="lease expired (worker lost)",
+                locked_by=None, locked_at=None,
+            )
+        ).rowcount
+        db.commit()
+    if n:
+        log.warning("reaped %d orphaned jobs", n)
+
+def _claim(worker: str):
+    due = (
+        select(Job.id)
+        .where(Job.status == "QUEUED", Job.run_at <= func.now())
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    with SessionLocal() as db:
+        job = db.execute(
+            update(Job)
+            .where(Job.id == due)
+            .values(status="RUNNING", locked_by=worker, locked_at=func.now(), started_at=func.now(), attempts=Job.attempts + 1)
+            .returning(Job.id, Job.kind, Job.payload_json, Job.attempts, Job.max_attempts)
+        ).first()
+        db.commit()
+    return job
+
+class Stats:
+    """Per-kind run counts and timings for this process, logged periodically by the worker."""
+
+    def __init__(self):
+        self.by_kind: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, ms: int, ok: bool):
+        with self._lock:
+            s = self.by_kind.setdefault(kind, {"runs": 0, "failures": 0, "total_ms": 0, "max_ms": 0})
+            s["runs"] += 1
+            s["failures"] += 0 if ok else 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+
+    def drain(self) -> dict:
+        with self._lock:
+            out, self.by_kind = self.by_kind, {}
+        return out
+
+def run_one(worker: str, stats: Stats | None = None) -> bool:
+    """Claim and run one due job; False when the queue had nothing due."""
+    job = _claim(worker)
+    if job is None:
+        return False
+    h = HANDLERS.get(job.kind)
+    t0 = time.perf_counter()
+    error = None
+    with SessionLocal() as db:
+        pg = db.bind.dialect.name == "postgresql"
+        try:
+            if h is None:
+                raise LookupError(f"no handler for {job.kind}")
+            if pg:  # session-level, so it survives the handler's own commits; reset below
+                db.execute(text(f"SET statement_timeout = {int(h.timeout_s * 1000)}"))
+            result = h.fn(db, job.payload_json or {})
+            ms = int((time.perf_counter() - t0) * 1000)
+            db.execute(update(Job).where(Job.id == job.id).values(
+                status="DONE", result_json=result, finished_at=func.now(), duration_ms=ms, last_error=None,
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            error = traceback.format_exc(limit=5)
+        finally:
+            if pg:
+                db.execute(text("SET statement_timeout TO DEFAULT"))
+                db.commit()
+    if error is not None:
+        ms = int((time.perf_counter() - t0) * 1000)
+        failed = job.attempts >= job.max_attempts or h is None
+        with SessionLocal() as db:
+            db.execute(update(Job).where(Job.id == job.id).values(
+                status="FAILED" if failed else "QUEUED",
+                run_at=func.now() + backoff(job.attempts),
+                last_error=error[-4000:],
+                locked_by=None, locked_at=None,
+                finished_at=func.now() if failed else None,
+                duration_ms=ms,
+            ))
+            db.commit()
+        log.warning("job %s (%s) attempt %d %s", job.id, job.kind, job.attempts, "failed for good" if failed else "will retry")
+    if stats:
+        stats.record(job.kind, ms, error is None)
+    return True
@@ -0,0 +1,125 @@
+# Built-in background jobs (see app/jobs.py). Deletes run in bounded batches, each its own
+# transaction, so no single statement holds locks on a large range of rows.
+import re
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import select, delete, text
+from sqlalchemy.orm import Session
+from .audit import month_start, partition_name, create_partition_sql
+from .config import settings
+from .jobs import handler
+from .rollups import recompute
+from . import timeline, priority
+from .models import Job, SyncOp, VerificationToken, Village
+
+BATCH = 5000
+TOKEN_GRACE = timedelta(hours=1)
+
+def _delete_batches(db: Session, model, *where) -> int:
+    total = 0
+    while True:
+        ids = select(model.id).where(*where).limit(BATCH).scalar_subquery()
+        n = db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)).rowcount
+        db.commit()
+        total += n
+        if n < BATCH:
+            return total
+
+@handler("tokens.cleanup", every_s=600)
+def cleanup_tokens(db: Session, payload: dict):
+    # verification tokens live two minutes; used or not, they're dead once expired
+    cutoff = datetime.now(timezone.utc) - TOKEN_GRACE
+    return {"deleted": _delete_batches(db, VerificationToken, VerificationToken.expires_at < cutoff)}
+
+@handler("maintenance.prune", every_s=3600)
+def prune(db: Session, payload: dict):
+    now = datetime.now(timezone.utc)
+    jobs_cutoff = now - timedelta(days=settings.JOB_RETENTION_DAYS)
+    ops_cutoff = now - timedelta(days=settings.SYNC_OP_RETENTION_DAYS)
+    return {
+        "jobs": _delete_batches(db, Job, Job.status.in_(["DONE", "FAILED"]), Job.finished_at < jobs_cutoff),
+        "sync_ops": _delete_batches(db, SyncOp, SyncOp.created_at < ops_cutoff),
+    }
+
+@handler("maintenance.worklist", every_s=86400, timeout_s=1800)
+def reconcile_worklist(db: Session, payload: dict):
+    # Re-derive followup_worklist from recent submissions: heals rows that missed the
+    # submit-time upsert (manual fixes, partial restores) without rescanning all history.
+    since = datetime.now(timezone.utc) - timedelta(days=int(payload.get("days", 2)))
+    n = db.execute(text("""
+        INSERT INTO followup_worklist (person_id, village_id, encounter_id, followup_date, rag, rag_rank, screened_at)
+        SELECT DISTINCT ON (e.person_id)
+               e.person_id, p.village_id, e.id, d.followup_date, d.rag,
+               CASE d.rag WHEN 'RED' THEN 0 WHEN 'AMBER' THEN 1 ELSE 2 END,
+               COALESCE(e.screened_at, e.submitted_at)
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at >= :since
+        ORDER BY e.person_id, COALESCE(e.screened_at, e.submitted_at) DESC, e.id DESC
+        ON CONFLICT (person_id) DO UPDATE SET
+            village_id = excluded.village_id, encounter_id = excluded.encounter_id,
+            followup_date = excluded.followup_date, rag = excluded.rag,
+            rag_rank = excluded.rag_rank, screened_at = excluded.screened_at
+        WHERE followup_worklist.screened_at <= excluded.screened_at
+    """), {"since": since}).rowcount
+    return {"upserted": n}
+
+@handler("timeline.reconcile", every_s=86400, timeout_s=3600)
+def reconcile_timeline(db: Session, payload: dict):
+    # Rebuild person_latest/person_history for people screened in the last `days`;
+    # {"all": true} rebuilds everyone (after app.scripts.retriage rewrites old results).
+    if payload.get("all"):
+        since = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    else:
+        since = datetime.now(timezone.utc) - timedelta(days=int(payload.get("days", 2)))
+    return {"people": timeline.rebuild(db, since)}
+
+@handler("priority.refresh", every_s=86400, timeout_s=3600)
+def refresh_priority(db: Session, payload: dict):
+    # days overdue move with the calendar, not with writes: rescore each village, one
+    # transaction per village
+    villages = payload.get("villages") or db.scalars(select(Village.id).order_by(Village.id)).all()
+    people = 0
+    for village_id in villages:
+        people += db.execute(priority.refresh_village(village_id)).rowcount
+        db.commit()
+    return {"villages": len(villages), "people": people}
+
+@handler("audit.partitions", every_s=86400)
+def audit_partitions(db: Session, payload: dict):
+    # keep next months' partitions ready (a missing one sends audit flushes to the spool)
+    # and drop whole months past retention, which costs nothing like a DELETE would
+    this_month = month_start(date.today())
+    created = []
+    for k in range(settings.AUDIT_PARTITIONS_AHEAD + 1):
+        month = month_start(this_month, k)
+        db.execute(text(create_partition_sql(month)))
+        created.append(partition_name(month))
+    dropped = []
+    if settings.AUDIT_RETENTION_MONTHS:
+        oldest = partition_name(month_start(this_month, -settings.AUDIT_RETENTION_MONTHS))
+        names = db.scalars(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_logs'::regclass"
+        )).all()
+        for name in sorted(n for n in names if re.fullmatch(r"audit_logs_y\d{4}m\d{2}", n) and n < oldest):
+            db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    db.commit()
+    return {"ensured": created, "dropped": dropped}
+
+@handler("rollups.compact", every_s=3600)
+def compact_rollups(db: Session, payload: dict):
+    # recount the last few days of village_daily_stats exactly; older days only change
+    # through approvals, which bump them
+    since = date.today() - timedelta(days=int(payload.get("days", 2)))
+    n = recompute(db, since)
+    db.commit()
+    return {"since": since.isoformat(), "rows": n}
+
+@handler("rules.retriage", timeout_s=6 * 3600, max_attempts=1)
+def retriage(db: Session, payload: dict):
+    # on demand (POST /api/admin/jobs/rules.retriage), instead of from a request handler
+    from .scripts.retriage import run
+    return run(db, int(payload.get("chunk", 50_000)), bool(payload.get("all", False)))
@@ -0,0 +1,179 @@
+# Request metrics in Prometheus text format (GET /metrics). Off unless METRICS_ENABLED:
+# then nothing is installed (no middleware, no engine listeners) and /metrics is a 404.
+# When on, each request costs a few perf_counter() calls, a dict update under a lock, and
+# two perf_counter() calls per SQL statement. Series are kept per process; with several
+# uvicorn workers, scrape each one.
+#
+# Per route template (not raw path, so ids don't explode cardinality):
+#   latency, status counts, body bytes before and after compression, SQL statement count
+#   and time, and time spent in named sections (bcrypt, fernet, compress) via timed().
+import hmac, threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+PREFIX = "ruralreach_"
+LATENCY = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNTS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# name -> (type, help, buckets)
+SERIES = {
+    "http_requests_total": ("counter", "Requests by route, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Time from request to the last body byte.", LATENCY),
+    "http_response_body_bytes": ("histogram", "Response body size before compression.", SIZES),
+    "http_response_sent_bytes": ("histogram", "Response body size as sent, after compression.", SIZES),
+    "http_request_db_queries": ("histogram", "SQL statements executed per request.", COUNTS),
+    "http_request_db_seconds": ("histogram", "Time spent in SQL statements per request.", LATENCY),
+    "http_request_section_seconds": ("histogram", "Time per request in instrumented sections.", LATENCY),
+}
+
+class _Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[str, dict[tuple, object]] = {name: {} for name in SERIES}
+
+    def _inc(self, name: str, labels: tuple):
+        series = self._values[name]
+        series[labels] = series.get(labels, 0) + 1
+
+    def _observe(self, name: str, labels: tuple, value: float):
+        buckets = SERIES[name][2]
+        h = self._values[name].get(labels)
+        if h is None:
+            h = self._values[name][labels] = _Histogram(buckets)
+        h.counts[bisect_left(buckets, value)] += 1
+        h.sum += value
+
+    def request(self, method: str, route: str, status: int, seconds: float, sample: "Sample", sent: int):
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self._inc("http_requests_total", labels + (("status", str(status)),))
+            self._observe("http_request_duration_seconds", labels, seconds)
+            self._observe("http_response_body_bytes", labels, sent if sample.raw_bytes is None else sample.raw_bytes)
+            self._observe("http_response_sent_bytes", labels, sent)
+            self._observe("http_request_db_queries", labels, sample.queries)
+            self._observe("http_request_db_seconds", labels, sample.db_s)
+            for section, s in sample.sections.items():
+                self._observe("http_request_section_seconds", labels + (("section", section),), s)
+
+    def render(self) -> str:
+        out = []
+        with self._lock:
+            for name, (kind, help_, buckets) in SERIES.items():
+                out.append(f"# HELP {PREFIX}{name} {help_}")
+                out.append(f"# TYPE {PREFIX}{name} {kind}")
+                for labels, v in self._values[name].items():
+                    if kind == "counter":
+                        out.append(f"{PREFIX}{name}{_labels(labels)} {v}")
+                        continue
+                    total = 0
+                    for le, n in zip((*buckets, "+Inf"), v.counts):
+                        total += n
+                        out.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', str(le)),))} {total}")
+                    out.append(f"{PREFIX}{name}_sum{_labels(labels)} {v.sum}")
+                    out.append(f"{PREFIX}{name}_count{_labels(labels)} {total}")
+        return "\n".join(out) + "\n"
+
+def _labels(labels: tuple) -> str:
+    def esc(v: str) -> str:
+        return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+registry = Registry()
+
+class Sample:
+    """What one request accumulates; reachable from the handler's context and as scope["metrics"]."""
+    __slots__ = ("queries", "db_s", "raw_bytes", "sections")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_s = 0.0
+        self.raw_bytes = None  # set by CompressionMiddleware when it compresses the body
+        self.sections: dict[str, float] = {}
+
+    def add(self, section: str, seconds: float):
+        self.sections[section] = self.sections.get(section, 0.0) + seconds
+
+# One mutable Sample per request; the threadpool copies the context, so sync handlers and
+# their queries add to the same object.
+_current: ContextVar[Sample | None] = ContextVar("metrics_sample", default=None)
+
+@contextmanager
+def timed(section: str):
+    sample = _current.get()
+    if sample is None:
+        yield
+        return
+    t0 = perf_counter()
+    try:
+        yield
+    finally:
+        sample.add(section, perf_counter() - t0)
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["metrics_t0"] = perf_counter()
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    sample = _current.get()
+    t0 = conn.info.pop("metrics_t0", None)
+    if sample is not None and t0 is not None:
+        sample.queries += 1
+        sample.db_s += perf_counter() - t0
+
+class MetricsMiddleware:
+    """Outermost layer, so latency and sent bytes are what the client sees."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+        sample = Sample()
+        scope["metrics"] = sample
+        token = _current.set(sample)
+        status, sent = 500, 0
+        t0 = perf_counter()
+
+        async def _send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            # the router leaves the matched route in the scope; anything else shares one series
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            registry.request(scope["method"], route, status, perf_counter() - t0, sample, sent)
+
+def install(app, token: str = ""):
+    """Add the middleware, the engine listeners and GET /metrics (bearer `token` if set)."""
+    from .db import engine, async_engine
+    for e in filter(None, [engine, async_engine.sync_engine if async_engine else None]):
+        event.listen(e, "before_cursor_execute", _before_cursor)
+        event.listen(e, "after_cursor_execute", _after_cursor)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        if token and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
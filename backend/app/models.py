@@ -1,10 +1,11 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Text,
-    Numeric, JSON, LargeBinary, UniqueConstraint, Index
+    Column, Integer, BigInteger, String, Date, DateTime, Boolean, ForeignKey, Text,
+    Numeric, Float, JSON, LargeBinary, UniqueConstraint, Index, Uuid, ARRAY
 )
-from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, Mapped, mapped_column, validates
+from sqlalchemy.sql import func, literal_column
 from .db import Base
+from .phonetic import name_key
 
 class Village(Base):
     __tablename__ = "villages"
@@ -23,6 +24,7 @@ class Household(Base):
     address: Mapped[str] = mapped_column(Text, nullable=True)
     head_name: Mapped[str] = mapped_column(String(120), nullable=True)
     phone: Mapped[str] = mapped_column(String(32), nullable=True)
+    external_key = Column(String(64), nullable=True)  # census import key, unique within the village
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -39,11 +41,18 @@ class Person(Base):
     phone: Mapped[str] = mapped_column(String(32), nullable=True)
     demographics_json = Column(JSON, nullable=True)  # extra fields (occupation, etc)
     risk_survey_json = Column(JSON, nullable=True)
+    name_key = Column(String(160), nullable=True)  # phonetic key of full_name, for search
+    external_key = Column(String(64), nullable=True)  # census import key, unique within the village
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     household = relationship("Household")
 
+    @validates("full_name")
+    def _set_name_key(self, key, value):
+        self.name_key = name_key(value)
+        return value
+
 class Worker(Base):
     __tablename__ = "workers"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -77,12 +86,23 @@ class Camp(Base):
 
     village = relationship("Village")
 
+class CampVersion(Base):
+    # Bumped by a trigger on every camps insert/update/delete (migration 0019): unlike
+    # max(updated_at), which is the writer's transaction start, it moves with each commit.
+    __tablename__ = "camp_versions"
+    village_id: Mapped[int] = mapped_column(ForeignKey("villages.id"), primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
+
 class TotpSecret(Base):
     __tablename__ = "totp_secrets"
     person_id: Mapped[int] = mapped_column(ForeignKey("people.id"), primary_key=True)
     secret_encrypted = Column(LargeBinary, nullable=False)
     provisioning_done: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     last_verified_timestep: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # offline codes at or below this timestep predate per-encounter timesteps: always replays
+    replay_floor: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    failed_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -96,6 +116,10 @@ class Encounter(Base):
     verified_at = Column(DateTime(timezone=True), nullable=True)
     submitted_at = Column(DateTime(timezone=True), nullable=True)
     client_created_at = Column(DateTime(timezone=True), nullable=True)
+    # when the screening happened: the device's clock, which can be days before an offline sync
+    screened_at = Column(DateTime(timezone=True), nullable=True)
+    totp_timestep = Column(Integer, nullable=True)  # the TOTP step that verified it; one use per person
+    client_uuid = Column(Uuid, nullable=True)  # set by devices that create encounters offline
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -139,6 +163,8 @@ class DerivedResult(Base):
     followup_date = Column(Date, nullable=True)
     domain_scores_json = Column(JSON, nullable=True)
     overall_score = Column(Integer, nullable=True)
+    rules_version = Column(String(32), nullable=True)
+    mismatch_json = Column(JSON, nullable=True)  # {field: {client, server}} when the device disagreed
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -183,16 +209,161 @@ class VerificationToken(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 class AuditLog(Base):
+    # Range-partitioned by month on created_at (the key must be part of the primary key);
+    # rows arrive in batches through app/audit.py, partitions are managed by a job.
+    # Actor ids carry no foreign keys: audit rows outlive what they describe.
     __tablename__ = "audit_logs"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    actor_worker_id = Column(Integer, ForeignKey("workers.id"), nullable=True)
-    actor_person_id = Column(Integer, ForeignKey("people.id"), nullable=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    actor_worker_id = Column(Integer, nullable=True)
+    actor_person_id = Column(Integer, nullable=True)
     action = Column(String(64), nullable=False)
     entity = Column(String(64), nullable=False)
     entity_id = Column(String(64), nullable=True)
     meta_json = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True)
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+class SyncOp(Base):
+    __tablename__ = "sync_ops"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    worker_id: Mapped[int] = mapped_column(ForeignKey("workers.id"), nullable=False)
+    op_key: Mapped[str] = mapped_column(String(64), nullable=False)  # client idempotency key
+    op_type = Column(String(32), nullable=False)
+    result_json = Column(JSON, nullable=True)  # replayed verbatim on retried uploads
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (UniqueConstraint("worker_id", "op_key", name="uq_sync_ops_worker_key"),)
+
+class FollowupWorklist(Base):
+    # One row per person: their latest screening's follow-up, maintained on submit.
+    __tablename__ = "followup_worklist"
+    person_id: Mapped[int] = mapped_column(ForeignKey("people.id"), primary_key=True)
+    village_id: Mapped[int] = mapped_column(ForeignKey("villages.id"), nullable=False)
+    encounter_id: Mapped[int] = mapped_column(ForeignKey("encounters.id"), nullable=False)
+    followup_date = Column(Date, nullable=True)
+    rag = Column(String(8), nullable=False)
+    rag_rank = Column(Integer, nullable=False)  # RED=0, AMBER=1, GREEN=2: sorts most urgent first
+    screened_at = Column(DateTime(timezone=True), nullable=False)
+
+class PersonLatest(Base):
+    # One row per person: values from their latest submitted screening; see app/timeline.py.
+    __tablename__ = "person_latest"
+    person_id: Mapped[int] = mapped_column(ForeignKey("people.id"), primary_key=True)
+    village_id: Mapped[int] = mapped_column(ForeignKey("villages.id"), nullable=False)
+    encounter_id: Mapped[int] = mapped_column(ForeignKey("encounters.id"), nullable=False)
+    screened_at = Column(DateTime(timezone=True), nullable=False)
+    rag = Column(String(8), nullable=False)
+    overall_score = Column(Integer, nullable=True)
+    sbp_avg = Column(Integer, nullable=True)
+    dbp_avg = Column(Integer, nullable=True)
+    glucose_value = Column(Integer, nullable=True)
+    bmi = Column(Numeric(5, 2), nullable=True)
+    spo2 = Column(Integer, nullable=True)
+
+class PersonHistory(Base):
+    # Every submitted screening of a person, one array per measure, index-aligned.
+    # Appended on submit (possibly out of order when offline uploads arrive late);
+    # readers sort by t.
+    __tablename__ = "person_history"
+    person_id: Mapped[int] = mapped_column(ForeignKey("people.id"), primary_key=True)
+    t = Column(ARRAY(DateTime(timezone=True)), nullable=False)
+    encounter_id = Column(ARRAY(Integer), nullable=False)
+    sbp_avg = Column(ARRAY(Integer), nullable=False)
+    dbp_avg = Column(ARRAY(Integer), nullable=False)
+    glucose_value = Column(ARRAY(Integer), nullable=False)
+    bmi = Column(ARRAY(Float), nullable=False)
+    spo2 = Column(ARRAY(Integer), nullable=False)
+    rag = Column(ARRAY(String(8)), nullable=False)
+    overall_score = Column(ARRAY(Integer), nullable=False)
+
+class PersonPriority(Base):
+    # Who to see first, one row per person; see app/priority.py for the score.
+    __tablename__ = "person_priority"
+    person_id: Mapped[int] = mapped_column(ForeignKey("people.id"), primary_key=True)
+    village_id: Mapped[int] = mapped_column(ForeignKey("villages.id"), nullable=False)
+    household_id: Mapped[int] = mapped_column(ForeignKey("households.id"), nullable=False)
+    hamlet = Column(String(120), nullable=True)
+    rag = Column(String(8), nullable=True)  # NULL: never screened
+    overall_score = Column(Integer, nullable=True)
+    followup_date = Column(Date, nullable=True)
+    missed_reminders = Column(Integer, nullable=False, server_default="0")
+    household_flagged = Column(Integer, nullable=False, server_default="0")  # other RED/AMBER members
+    priority = Column(Integer, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+class VillageDailyStats(Base):
+    # Dashboard rollup, one row per village per UTC day; see app/rollups.py.
+    __tablename__ = "village_daily_stats"
+    village_id: Mapped[int] = mapped_column(ForeignKey("villages.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    people_registered = Column(Integer, nullable=False, server_default="0")
+    encounters_submitted = Column(Integer, nullable=False, server_default="0")
+    verified = Column(Integer, nullable=False, server_default="0")  # by submission day, not approval day
+    red = Column(Integer, nullable=False, server_default="0")
+    amber = Column(Integer, nullable=False, server_default="0")
+    green = Column(Integer, nullable=False, server_default="0")
+
+class Job(Base):
+    # Background work queue; see app/jobs.py. Finished rows are kept (with timings) until pruned.
+    __tablename__ = "jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    payload_json = Column(JSON, nullable=True)
+    status = Column(String(16), nullable=False, default="QUEUED")  # QUEUED/RUNNING/DONE/FAILED
+    dedupe_key = Column(String(128), nullable=True, unique=True)  # e.g. one row per schedule slot
+    run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text, nullable=True)
+    result_json = Column(JSON, nullable=True)
+    locked_by = Column(String(128), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
-Index("ix_people_village_updated", Person.village_id, Person.updated_at)
-Index("ix_households_village_updated", Household.village_id, Household.updated_at)
+# (updated_at, id) keysets for delta sync
+Index("ix_people_village_updated", Person.village_id, Person.updated_at, Person.id)
+Index("ix_people_updated", Person.updated_at, Person.id)
+Index("ix_households_village_updated", Household.village_id, Household.updated_at, Household.id)
+Index("ix_camps_village_updated", Camp.village_id, Camp.updated_at, Camp.id)
 Index("ix_camps_village_date", Camp.village_id, Camp.date)
+Index("ix_camps_date_updated", Camp.date, Camp.updated_at)  # nearby-camp index version (app/nearby.py)
+# people search (pg_trgm + btree_gin; see app/search.py)
+Index("ix_people_village_name_trgm", Person.village_id, Person.name_key, postgresql_using="gin", postgresql_ops={"name_key": "gin_trgm_ops"})
+# digits only, reversed: "+91 98450-12345" and "9845012345" share a suffix. Inlined literals, so
+# the search predicate is the index expression even under server-side prepared statements
+PHONE_DIGITS_REV = func.reverse(func.regexp_replace(Person.phone, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")))
+Index("ix_people_phone_digits_rev", PHONE_DIGITS_REV.label("phone_rev"), postgresql_ops={"phone_rev": "text_pattern_ops"})
+# census import upserts (app/census.py)
+Index("ux_households_village_key", Household.village_id, Household.external_key, unique=True, postgresql_where=Household.external_key.isnot(None))
+Index("ux_people_village_key", Person.village_id, Person.external_key, unique=True, postgresql_where=Person.external_key.isnot(None))
+Index("ux_encounters_client_uuid", Encounter.client_uuid, unique=True)
+Index("ix_worklist_due", FollowupWorklist.followup_date, FollowupWorklist.rag_rank, FollowupWorklist.person_id)
+Index("ix_worklist_village_due", FollowupWorklist.village_id, FollowupWorklist.followup_date, FollowupWorklist.rag_rank, FollowupWorklist.person_id)
+# clinician queue / unverified list: newest first, keyset on (submitted_at, id)
+QUEUE_STATUSES = ("VERIFIED", "UNVERIFIED")
+Index("ix_encounters_queue", Encounter.submitted_at.desc(), Encounter.id.desc(), postgresql_where=Encounter.status.in_(QUEUE_STATUSES))
+Index("ix_encounters_unverified", Encounter.submitted_at.desc(), Encounter.id.desc(), postgresql_where=Encounter.status == "UNVERIFIED")
+Index("ix_derived_results_rag", DerivedResult.rag, DerivedResult.encounter_id)
+# per-person history (app/timeline.py rebuilds, and any person's encounter list)
+Index("ix_encounters_person_submitted", Encounter.person_id, Encounter.submitted_at)
+Index("ux_encounters_person_timestep", Encounter.person_id, Encounter.totp_timestep, unique=True,
+      postgresql_where=Encounter.totp_timestep.isnot(None))
+Index("ix_person_latest_village", PersonLatest.village_id)
+# priority top-K per village / hamlet, and the lookups behind each refresh (app/priority.py)
+Index("ix_person_priority_village", PersonPriority.village_id, PersonPriority.priority.desc(), PersonPriority.person_id)
+Index("ix_person_priority_hamlet", PersonPriority.village_id, PersonPriority.hamlet, PersonPriority.priority.desc(), PersonPriority.person_id)
+Index("ix_people_household", Person.household_id)
+Index("ix_reminder_logs_person", ReminderLog.person_id, ReminderLog.created_at)
+# job queue: claim scans only due QUEUED rows; lease reaper only RUNNING ones
+Index("ix_jobs_due", Job.run_at, Job.id, postgresql_where=Job.status == "QUEUED")
+Index("ix_jobs_running", Job.locked_at, postgresql_where=Job.status == "RUNNING")
+Index("ix_jobs_kind_finished", Job.kind, Job.finished_at)
+Index("ix_verification_tokens_expires", VerificationToken.expires_at)
+Index("ix_sync_ops_created", SyncOp.created_at)
+Index("ix_audit_entity", AuditLog.entity, AuditLog.entity_id, AuditLog.created_at)
+Index("ix_audit_actor", AuditLog.actor_worker_id, AuditLog.created_at)
+Index("ix_village_daily_stats_day", VillageDailyStats.day)
@@ -0,0 +1,103 @@
+# Nearest upcoming camps for a point, from an in-process grid index over camp coordinates.
+# Upcoming camps (date >= today) are bucketed into CELL_DEG x CELL_DEG cells; a query
+# visits only the cells overlapping its radius and runs an exact haversine on those
+# candidates. The index is rebuilt when the camps' version (the sum of the trigger-bumped
+# camp_versions counters, and the date) moves; that version is re-read at most every
+# CAMP_INDEX_CHECK_S, so another process's camp writes show up within that long. Writes in
+# this process invalidate().
+import math, time
+from datetime import date
+import numpy as np
+from sqlalchemy import select, func
+from .config import settings
+from .models import Camp, CampVersion
+
+CELL_DEG = 0.1  # ~11 km of latitude
+EARTH_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_KM / 180
+
+def version_stmt(today: date):
+    # one row per village; every committed camp write bumps one of them
+    return select(func.coalesce(func.sum(CampVersion.version), 0), func.count())
+
+def rows_stmt(today: date):
+    return select(Camp).where(Camp.date >= today)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Degrees in, km out; any argument may be an array."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _cell(deg):
+    return np.floor(np.asarray(deg) / CELL_DEG).astype(np.int64)
+
+class CampIndex:
+    def __init__(self, version: tuple, camps: list):
+        self.version = version
+        self.camps = camps  # CampOut; only lat/lng/date/id are read here
+        self.lat = np.array([float(c.lat) for c in camps], dtype=np.float64)
+        self.lng = np.array([float(c.lng) for c in camps], dtype=np.float64)
+        self.day = np.array([c.date.toordinal() for c in camps], dtype=np.int64)
+        self.id = np.array([c.id for c in camps], dtype=np.int64)
+        cells: dict[tuple[int, int], list[int]] = {}
+        for pos, key in enumerate(zip(_cell(self.lat).tolist(), _cell(self.lng).tolist())):
+            cells.setdefault(key, []).append(pos)
+        self.cells = {k: np.array(v, dtype=np.int64) for k, v in cells.items()}
+        keys = np.array(list(self.cells), dtype=np.int64).reshape(-1, 2)
+        self.cell_i, self.cell_j = keys[:, 0], keys[:, 1]
+
+    def _candidates(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        dlat = radius_km / KM_PER_DEG
+        dlng = radius_km / (KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01))
+        i0, i1 = int(_cell(lat - dlat)), int(_cell(lat + dlat))
+        j0, j1 = int(_cell(lng - dlng)), int(_cell(lng + dlng))
+        if (i1 - i0 + 1) * (j1 - j0 + 1) <= len(self.cells):
+            hits = [self.cells[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in self.cells]
+        else:
+            # a window wider than the index (large radius, or near a pole, where dlng
+            # approaches 180 degrees): filter the occupied cells instead of walking the window
+            inside = (self.cell_i >= i0) & (self.cell_i <= i1) & (self.cell_j >= j0) & (self.cell_j <= j1)
+            hits = [self.cells[(i, j)] for i, j in zip(self.cell_i[inside].tolist(), self.cell_j[inside].tolist())]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
+
+    def query(self, lat: float, lng: float, radius_km: float, from_date: date | None = None,
+              limit: int = 20, order: str = "distance") -> list[tuple[int, float]]:
+        """[(position in self.camps, distance_km)], nearest first (or soonest first, order="date")."""
+        idx = self._candidates(lat, lng, radius_km)
+        if from_date is not None and len(idx):
+            idx = idx[self.day[idx] >= from_date.toordinal()]
+        if not len(idx):
+            return []
+        dist = haversine_km(lat, lng, self.lat[idx], self.lng[idx])
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        keys = (self.id[idx], self.day[idx], dist) if order == "distance" else (self.id[idx], dist, self.day[idx])
+        best = np.lexsort(keys)[:limit]  # last key is the primary one
+        return [(int(idx[k]), round(float(dist[k]), 3)) for k in best]
+
+_index: CampIndex | None = None
+_checked = 0.0
+
+def fresh() -> CampIndex | None:
+    """The current index, if its version was confirmed within CAMP_INDEX_CHECK_S."""
+    if _index is not None and time.monotonic() - _checked < settings.CAMP_INDEX_CHECK_S:
+        return _index
+    return None
+
+def confirm(version: tuple) -> CampIndex | None:
+    """The current index if it is still at `version` (just read from the database)."""
+    global _checked
+    if _index is not None and _index.version == version:
+        _checked = time.monotonic()
+        return _index
+    return None
+
+def build(version: tuple, camps: list) -> CampIndex:
+    global _index, _checked
+    _index, _checked = CampIndex(version, camps), time.monotonic()
+    return _index
+
+def invalidate():
+    global _checked
+    _checked = 0.0
@@ -0,0 +1,86 @@
+# Push channel for the clinician queue. Submits NOTIFY inside their own transaction, so
+# only committed encounters are announced (a rolled-back sync op's notify is dropped with
+# it). Each API process keeps one LISTEN connection and fans payloads out to its
+# connected stream clients; see routers/live.py.
+import asyncio, json, logging
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import select, func, cast, literal, literal_column, Integer, String, Text
+from .config import settings
+from .models import Person
+
+QUEUE_CHANNEL = "clinician_queue"
+QUEUE_RAGS = ("RED", "AMBER")
+SUBSCRIBER_BACKLOG = 200  # a client this far behind is dropped; it reconnects and reloads
+
+log = logging.getLogger(__name__)
+
+def queue_notify(encounter_id: int, person_id: int, rag: str, status: str, submitted_at: datetime):
+    # typed casts: asyncpg can't infer parameter types through json_build_object's "any"
+    def field(name, value):
+        return literal_column(f"'{name}'"), value
+    payload = func.json_build_object(
+        *field("encounter_id", cast(literal(encounter_id), Integer)),
+        *field("person_id", Person.id),
+        *field("person_name", Person.full_name),
+        *field("rag", cast(literal(rag), String)),
+        *field("status", cast(literal(status), String)),
+        *field("submitted_at", cast(literal(submitted_at.isoformat()), String)),
+    )
+    return select(func.pg_notify(literal_column(f"'{QUEUE_CHANNEL}'"), cast(payload, Text))).where(Person.id == person_id)
+
+def _listen_dsn() -> str:
+    return "postgresql://" + settings.DATABASE_URL.split("://", 1)[1]
+
+class QueueHub:
+    def __init__(self):
+        self._subs: set[asyncio.Queue] = set()
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            import asyncpg  # only processes that serve the stream need it
+            self._conn = await asyncpg.connect(_listen_dsn())
+            self._conn.add_termination_listener(self._on_lost)
+            await self._conn.add_listener(QUEUE_CHANNEL, self._on_notify)
+
+    async def stop(self):
+        conn, self._conn = self._conn, None
+        self._subs.clear()
+        if conn is not None and not conn.is_closed():
+            await conn.close()
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            item = json.loads(payload)
+        except ValueError:
+            return
+        for q in list(self._subs):
+            try:
+                q.put_nowait(item)
+            except asyncio.QueueFull:
+                self._subs.discard(q)
+
+    def _on_lost(self, conn):
+        # Anything sent while we reconnect would be missed, so drop every client; they
+        # reload the queue page and resubscribe.
+        log.warning("queue listener connection lost")
+        self._conn = None
+        self._subs.clear()
+
+    @contextmanager
+    def subscribe(self):
+        q = asyncio.Queue(SUBSCRIBER_BACKLOG)
+        self._subs.add(q)
+        try:
+            yield q
+        finally:
+            self._subs.discard(q)
+
+    def subscribed(self, q: asyncio.Queue) -> bool:
+        return q in self._subs
+
+queue_hub = QueueHub()
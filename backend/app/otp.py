@@ -0,0 +1,165 @@
+# Patient TOTP secrets and bulk verification of codes captured offline.
+# Nothing here commits: callers own the transaction.
+import hmac
+from datetime import datetime, timedelta, timezone
+import pyotp
+from cryptography.fernet import Fernet
+from sqlalchemy import select, update, or_, case
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import Encounter, TotpSecret
+from .schemas import OfflineTotpIn, OfflineTotpResult
+from .metrics import timed
+from . import rollups
+
+INTERVAL = 30
+VALID_WINDOW = 1  # ±1 timestep, as for online verification
+
+fernet = Fernet(settings.FERNET_KEY.encode() if isinstance(settings.FERNET_KEY, str) else settings.FERNET_KEY)
+
+def decrypt_secret(ts: TotpSecret) -> str:
+    with timed("fernet"):
+        return fernet.decrypt(ts.secret_encrypted).decode()
+
+def encrypt_secret(secret: str) -> bytes:
+    with timed("fernet"):
+        return fernet.encrypt(secret.encode())
+
+def _timestep(t: datetime) -> int:
+    return int(t.timestamp()) // INTERVAL
+
+def locked(ts: TotpSecret, now: datetime) -> bool:
+    return (ts.failed_attempts >= settings.TOTP_MAX_FAILED and ts.failed_at is not None
+            and now - ts.failed_at < timedelta(minutes=settings.TOTP_LOCKOUT_MINUTES))
+
+def record_failure(ts: TotpSecret, now: datetime):
+    if ts.failed_at is not None and now - ts.failed_at >= timedelta(minutes=settings.TOTP_LOCKOUT_MINUTES):
+        ts.failed_attempts = 0  # an old run of failures doesn't count towards a new lockout
+    ts.failed_attempts += 1
+    ts.failed_at = now
+
+def record_success(ts: TotpSecret):
+    ts.failed_attempts, ts.failed_at = 0, None
+
+def verify_offline(db: Session, items: list[OfflineTotpIn]) -> list[OfflineTotpResult]:
+    """Check a batch of offline codes and flip the matching encounters to VERIFIED.
+
+    Everything is loaded in one query per table; each person's secret is decrypted once
+    and their HOTP values computed once per timestep. Codes are checked against the
+    device's clock at capture (±VALID_WINDOW steps), which must fall inside the
+    encounter's own window. One item per encounter per batch, and wrong codes count
+    towards the person's lockout (TOTP_MAX_FAILED), as online. Anti-replay: a timestep
+    verifies at most one of a person's encounters (encounters.totp_timestep), so an
+    older code uploaded after a newer one still verifies, while a reused one doesn't.
+    """
+    now = datetime.now(timezone.utc)
+    oldest = now - timedelta(hours=settings.TOTP_OFFLINE_MAX_AGE_HOURS)
+    results = [OfflineTotpResult(encounter_id=it.encounter_id, client_uuid=it.client_uuid, ok=False, status=0) for it in items]
+
+    ids = {it.encounter_id for it in items if it.encounter_id is not None}
+    uuids = {it.client_uuid for it in items if it.client_uuid is not None}
+    encs = db.execute(
+        select(Encounter.id, Encounter.client_uuid, Encounter.person_id, Encounter.status,
+               Encounter.client_created_at, Encounter.submitted_at)
+        .where(or_(Encounter.id.in_(ids), Encounter.client_uuid.in_(uuids)))
+    ).all()
+    by_id = {e.id: e for e in encs}
+    by_uuid = {e.client_uuid: e for e in encs if e.client_uuid is not None}
+
+    # Locked so concurrent verifications (online or another batch) can't both use a
+    # timestep; person_id order keeps lock acquisition deadlock-free.
+    person_ids = {it.person_id for it in items}
+    secrets_ = {
+        ts.person_id: ts
+        for ts in db.scalars(select(TotpSecret).where(TotpSecret.person_id.in_(person_ids)).order_by(TotpSecret.person_id).with_for_update())
+    }
+    hotps: dict[int, pyotp.HOTP] = {}
+    codes: dict[tuple[int, int], str] = {}
+
+    def fail(i, status, error):
+        results[i].status, results[i].error = status, error
+
+    seen = set()
+    matched = []  # (person_id, timestep, item index, encounter id)
+    for i, it in enumerate(items):
+        enc = by_id.get(it.encounter_id) if it.encounter_id is not None else by_uuid.get(it.client_uuid)
+        if enc is None:
+            fail(i, 404, "Encounter not found")  # not synced yet: the device retries later
+            continue
+        results[i].encounter_id, results[i].client_uuid = enc.id, enc.client_uuid
+        if enc.id in seen:
+            fail(i, 409, "Encounter already in this batch")  # one code per encounter per upload
+            continue
+        seen.add(enc.id)
+        if enc.person_id != it.person_id:
+            fail(i, 400, "Invalid encounter")
+            continue
+        if enc.status == "VERIFIED":
+            results[i].ok, results[i].status = True, 200  # retried upload
+            continue
+        if enc.status != "UNVERIFIED":
+            fail(i, 409, "Encounter not submitted")
+            continue
+        ts = secrets_.get(it.person_id)
+        if ts is None:
+            fail(i, 400, "TOTP not provisioned")
+            continue
+        if locked(ts, now):
+            fail(i, 429, "Too many failed attempts")
+            continue
+        read_at = it.client_time if it.client_time.tzinfo else it.client_time.replace(tzinfo=timezone.utc)
+        slack = timedelta(seconds=INTERVAL * VALID_WINDOW)
+        if read_at < oldest:
+            fail(i, 400, "Code too old")
+            continue
+        if read_at > now + slack or (enc.submitted_at and read_at > enc.submitted_at + slack) \
+                or (enc.client_created_at and read_at < enc.client_created_at - slack):
+            fail(i, 400, "client_time outside the encounter")
+            continue
+
+        if it.person_id not in hotps:
+            hotps[it.person_id] = pyotp.HOTP(decrypt_secret(ts))
+        step = _timestep(read_at)
+        hit = None
+        for s in range(step - VALID_WINDOW, step + VALID_WINDOW + 1):
+            if (it.person_id, s) not in codes:
+                codes[it.person_id, s] = hotps[it.person_id].at(s)
+            if hmac.compare_digest(codes[it.person_id, s], it.code):
+                hit = s
+                break
+        if hit is None:
+            record_failure(ts, now)
+            fail(i, 400, "Invalid code")
+            continue
+        matched.append((it.person_id, hit, i, enc.id))
+
+    used = set()
+    if matched:
+        used = set(db.execute(
+            select(Encounter.person_id, Encounter.totp_timestep)
+            .where(Encounter.person_id.in_({m[0] for m in matched}),
+                   Encounter.totp_timestep >= min(m[1] for m in matched))
+        ).tuples())
+    steps = {}
+    for person_id, step, i, enc_id in sorted(matched):
+        if (person_id, step) in used or step <= secrets_[person_id].replay_floor:
+            fail(i, 409, "Replay detected")  # this code already verified another encounter
+            continue
+        used.add((person_id, step))
+        steps[enc_id] = step
+        ts = secrets_[person_id]
+        ts.last_verified_timestep = max(ts.last_verified_timestep or 0, step)
+        record_success(ts)
+        results[i].ok, results[i].status = True, 200
+
+    if steps:
+        flipped = db.scalars(
+            update(Encounter)
+            .where(Encounter.id.in_(steps), Encounter.status == "UNVERIFIED")
+            .values(status="VERIFIED", verified_at=now,
+                    totp_timestep=case(steps, value=Encounter.id))
+            .returning(Encounter.id)
+        ).all()
+        if flipped:
+            db.execute(rollups.bump_verified(flipped))
+    return results
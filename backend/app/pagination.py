@@ -0,0 +1,49 @@
+# Opaque keyset cursors: the sort key of the last row served, as url-safe base64 JSON.
+import base64, json
+from datetime import date, datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+def encode_cursor(*key) -> str:
+    raw = json.dumps([k.isoformat() if isinstance(k, (date, datetime)) else k for k in key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(400, "Invalid cursor")
+    return key
+
+def delta_stmt(stmt, model, cursor: str | None, updated_since: str | None, limit: int):
+    """Restrict a select() to one delta-sync page, ordered by (updated_at, id).
+
+    Fetches limit + 1 rows so delta_page() can tell whether more follow. Statement only,
+    so the sync and async routers share it.
+    """
+    if cursor:
+        ts, rid = decode_cursor(cursor, 2)
+        try:
+            key = (datetime.fromisoformat(ts), int(rid))
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+        stmt = stmt.where(tuple_(model.updated_at, model.id) > key)
+    elif updated_since:
+        try:
+            stmt = stmt.where(model.updated_at > datetime.fromisoformat(updated_since))
+        except ValueError:
+            raise HTTPException(400, "Invalid updated_since")
+    return stmt.order_by(model.updated_at, model.id).limit(limit + 1)
+
+def delta_page(rows: list, limit: int, cursor: str | None):
+    """Returns (rows, has_more, next_cursor) for the rows a delta_stmt() returned.
+
+    next_cursor is set whenever the device has a position to resume from, including on
+    the last page, so the next sync picks up only rows changed since.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id) if rows else cursor
+    return rows, has_more, next_cursor
@@ -0,0 +1,31 @@
+# Phonetic key for romanised Indian names, so transliteration variants
+# (Sita/Seetha, Lakshmi/Laxmi, Deepak/Dipak) collapse to the same string.
+# Residual differences are left to trigram similarity on the key.
+import re
+
+_RULES = [
+    (re.compile(r"ksh|x"), "ks"),
+    (re.compile(r"chh|ch"), "c"),
+    (re.compile(r"([tdbkgjs])h"), r"\1"),  # aspirates and sh: th->t, bh->b, sh->s ...
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck|q"), "k"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"ee|ii|ie"), "i"),
+    (re.compile(r"oo|uu|ou"), "u"),
+    (re.compile(r"ai|ay|ei"), "e"),
+    (re.compile(r"aa"), "a"),
+    (re.compile(r"(.)\1+"), r"\1"),  # doubled letters
+    (re.compile(r"(?<=...)[ah]$"), ""),  # Rama/Ram, Sitah/Sita; short words keep theirs
+]
+
+def _word_key(word: str) -> str:
+    for pattern, repl in _RULES:
+        word = pattern.sub(repl, word)
+    return word
+
+def name_key(name: str | None) -> str | None:
+    if not name:
+        return None
+    words = re.findall(r"[^\W\d_]+", name.lower())
+    return " ".join(_word_key(w) for w in words) or None
@@ -0,0 +1,70 @@
+# Per-person priority: "who in this village do we see first". One person_priority row per
+# person, scored from their latest screening (person_latest), how long their follow-up is
+# overdue (followup_worklist), reminders that failed since that screening (reminder_logs)
+# and how many others in the household are RED/AMBER. Writes refresh the rows they affect
+# (a submission: the whole household; a reminder: that person), so the top-K read is an
+# index range scan. Days overdue grow without any write, and newly registered people get
+# their first row there too: the priority.refresh job recomputes every village daily, so
+# the ranking lags the calendar by at most a day.
+from sqlalchemy import text
+
+WEIGHTS = {
+    "RED": 1000, "AMBER": 400,             # latest RAG
+    "score": 2,                            # per point of overall_score
+    "overdue_day": 3, "overdue_cap": 180,  # per day past followup_date, up to the cap
+    "missed": 50, "missed_cap": 5,         # per failed reminder since the last screening
+    "household": 100, "household_cap": 3,  # per other RED/AMBER household member
+}
+MISSED_OUTCOMES = ("not_reached", "declined")
+
+_SCORE = (
+    f"CASE l.rag WHEN 'RED' THEN {WEIGHTS['RED']} WHEN 'AMBER' THEN {WEIGHTS['AMBER']} ELSE 0 END"
+    f" + {WEIGHTS['score']} * COALESCE(l.overall_score, 0)"
+    f" + {WEIGHTS['overdue_day']} * LEAST(GREATEST(CURRENT_DATE - w.followup_date, 0), {WEIGHTS['overdue_cap']})"
+    f" + {WEIGHTS['missed']} * LEAST(m.n, {WEIGHTS['missed_cap']})"
+    f" + {WEIGHTS['household']} * LEAST(f.n, {WEIGHTS['household_cap']})"
+)
+
+def _refresh(where: str):
+    return text(f"""
+        INSERT INTO person_priority (person_id, village_id, household_id, hamlet, rag, overall_score,
+                                      followup_date, missed_reminders, household_flagged, priority, computed_at)
+        SELECT p.id, p.village_id, p.household_id, h.hamlet, l.rag, l.overall_score,
+               w.followup_date, m.n, f.n, {_SCORE}, now()
+        FROM people p
+        JOIN households h ON h.id = p.household_id
+        LEFT JOIN person_latest l ON l.person_id = p.id
+        LEFT JOIN followup_worklist w ON w.person_id = p.id
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS n FROM reminder_logs r
+            WHERE r.person_id = p.id AND r.outcome IN {MISSED_OUTCOMES}
+              AND r.created_at >= COALESCE(l.screened_at, '-infinity')
+        ) m
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS n FROM people q JOIN person_latest ql ON ql.person_id = q.id
+            WHERE q.household_id = p.household_id AND q.id <> p.id AND ql.rag IN ('RED', 'AMBER')
+        ) f
+        WHERE {where}
+        ON CONFLICT (person_id) DO UPDATE SET
+            village_id = excluded.village_id, household_id = excluded.household_id, hamlet = excluded.hamlet,
+            rag = excluded.rag, overall_score = excluded.overall_score, followup_date = excluded.followup_date,
+            missed_reminders = excluded.missed_reminders, household_flagged = excluded.household_flagged,
+            priority = excluded.priority, computed_at = excluded.computed_at
+    """)
+
+REFRESH_HOUSEHOLD = _refresh("p.household_id = (SELECT household_id FROM people WHERE id = :person_id)")
+REFRESH_PERSON = _refresh("p.id = :person_id")
+REFRESH_VILLAGE = _refresh("p.village_id = :village_id")
+
+def refresh_household(person_id: int):
+    """After a submission: the person's RAG also moves their household members' clustering term."""
+    return REFRESH_HOUSEHOLD.bindparams(person_id=person_id)
+
+def refresh_person(person_id: int):
+    return REFRESH_PERSON.bindparams(person_id=person_id)
+
+def refresh_village(village_id: int):
+    return REFRESH_VILLAGE.bindparams(village_id=village_id)
+
+def days_overdue(followup_date, today) -> int:
+    return max((today - followup_date).days, 0) if followup_date else 0
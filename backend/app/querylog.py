@@ -0,0 +1,170 @@
+# Statement-level query profiling: every SQL statement a request runs, with its time.
+# Off unless QUERY_PROFILE (nothing is installed then). When on, for each request:
+#   - X-DB-Queries / X-DB-Ms response headers (used by app.scripts.bench),
+#   - slow statements (>= SLOW_QUERY_MS) logged with the endpoint that ran them,
+#   - repeated statement shapes (same SQL, different parameters, >= N_PLUS_ONE_MIN times)
+#     logged as a likely N+1, e.g. lazy loads of a relationship inside a loop,
+#   - requests over their budget (QUERY_BUDGETS per endpoint, else QUERY_BUDGET) logged,
+#     and flagged with an X-Query-Budget header.
+# Finished profiles are kept in `recent`, so a test can drive the app and then call
+# recent[-1].check(budget); capture() profiles code called directly, without a request.
+import logging, re
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from time import perf_counter
+from sqlalchemy import event
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+QUERY_HEADER = "x-db-queries"
+
+# parameter lists and inlined literals differ between otherwise identical statements
+_IN_LIST = re.compile(r"\(\s*(?:%\(\w+\)s|\$\d+|\?)(?:\s*,\s*(?:%\(\w+\)s|\$\d+|\?))*\s*\)")
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def shape(sql: str) -> str:
+    return _PARAM.sub("?", _IN_LIST.sub("(?)", " ".join(sql.split())))
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+@dataclass
+class Statement:
+    sql: str
+    seconds: float
+    many: bool = False
+
+@dataclass
+class Profile:
+    endpoint: str = "-"
+    statements: list[Statement] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(s.seconds for s in self.statements)
+
+    def repeated(self, min_count: int | None = None) -> list[tuple[str, int]]:
+        """Statement shapes run at least min_count times, most frequent first."""
+        n = min_count or settings.N_PLUS_ONE_MIN
+        return [(sql, c) for sql, c in Counter(shape(s.sql) for s in self.statements).most_common() if c >= n]
+
+    def report(self) -> str:
+        lines = [f"{self.endpoint}: {self.count} queries, {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {s.seconds * 1000:7.1f} ms  {' '.join(s.sql.split())[:200]}" for s in self.statements]
+        return "\n".join(lines)
+
+    def check(self, budget: int):
+        if self.count > budget:
+            raise QueryBudgetExceeded(f"{self.count} queries > budget {budget}\n{self.report()}")
+
+recent: deque[Profile] = deque(maxlen=100)
+
+_current: ContextVar[Profile | None] = ContextVar("query_profile", default=None)
+
+@lru_cache(maxsize=4)
+def _budgets(spec: str) -> dict[str, int]:
+    # "GET /api/people=3, POST /api/encounters=8"; the route template, as in app.metrics
+    out = {}
+    for item in spec.split(","):
+        endpoint, _, n = item.strip().rpartition("=")
+        if endpoint:
+            out[endpoint.strip()] = int(n)
+    return out
+
+def budget_for(endpoint: str) -> int | None:
+    """Statements allowed per request to endpoint; None for no limit. A listed 0 means none at all."""
+    budgets = _budgets(settings.QUERY_BUDGETS)
+    if endpoint in budgets:
+        return budgets[endpoint]
+    return settings.QUERY_BUDGET or None
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    conn.info["querylog_t0"] = perf_counter()
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    seconds = perf_counter() - conn.info.pop("querylog_t0", perf_counter())
+    profile = _current.get()
+    if profile is not None:
+        profile.statements.append(Statement(statement, seconds, executemany))
+    if seconds * 1000 >= settings.SLOW_QUERY_MS:
+        log.warning("slow query (%.0f ms) in %s: %s", seconds * 1000,
+                    profile.endpoint if profile else "-", " ".join(statement.split())[:1000])
+
+_listening = False
+
+def listen():
+    global _listening
+    if _listening:
+        return
+    from .db import engine, async_engine
+    for e in filter(None, [engine, async_engine.sync_engine if async_engine else None]):
+        event.listen(e, "before_cursor_execute", _before_cursor)
+        event.listen(e, "after_cursor_execute", _after_cursor)
+    _listening = True
+
+@contextmanager
+def capture(endpoint: str = "-"):
+    """Profile the statements run inside the block (same thread/task) and yield the Profile."""
+    listen()
+    profile = Profile(endpoint)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+def _finish(profile: Profile):
+    recent.append(profile)
+    for sql, n in profile.repeated():
+        log.warning("possible N+1 in %s: %d x %s", profile.endpoint, n, sql[:500])
+    budget = budget_for(profile.endpoint)
+    if budget is not None and profile.count > budget:
+        log.warning("query budget exceeded in %s: %d > %d", profile.endpoint, profile.count, budget)
+    log.debug("%s: %d queries, %.1f ms", profile.endpoint, profile.count, profile.seconds * 1000)
+
+class QueryProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = Profile(f"{scope['method']} {scope['path']}")
+        token = _current.set(profile)
+
+        def name():
+            # the route template once routing has run; the raw path before that
+            route = getattr(scope.get("route"), "path", None)
+            return f"{scope['method']} {route}" if route else profile.endpoint
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                # the handler has returned: everything it ran is counted
+                profile.endpoint = name()
+                headers = [*message.get("headers", []),
+                           (QUERY_HEADER.encode(), str(profile.count).encode()),
+                           (b"x-db-ms", f"{profile.seconds * 1000:.1f}".encode())]
+                budget = budget_for(profile.endpoint)
+                if budget is not None and profile.count > budget:
+                    headers.append((b"x-query-budget", f"exceeded {profile.count}/{budget}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            profile.endpoint = name()
+            _finish(profile)
+
+def install(app):
+    listen()
+    app.add_middleware(QueryProfileMiddleware)
@@ -16,22 +16,29 @@ PERMS: Dict[Role, Set[str]] = {
         "camps:view_assigned",
         "due:view_assigned",
         "reminders:write",
+        "census:import",
+        "priority:view",
     },
     Role.SCREENER: {
         "encounter:start", "encounter:submit",
         "vitals:write", "tests:write",
         "tasks:create",
         "camps:view_assigned",
+        "timeline:view",
     },
     Role.CLINICIAN: {
         "queue:view", "unverified:view",
         "encounter:approve", "encounter:reject",
         "assessment:write",
         "tasks:close",
+        "timeline:view",
+        "priority:view",
     },
     Role.ADMIN: {
         "admin:manage", "dashboards:view", "inventory:manage", "export:csv",
         "camps:create", "villages:manage", "assignments:manage",
+        "census:import",
+        "priority:view",
     },
     Role.PATIENT: {
         "patient:view_self", "patient:totp", "camps:view_village",
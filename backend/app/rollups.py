@@ -0,0 +1,134 @@
+# Per-village, per-day counters behind the coverage and verification dashboards.
+# Write paths bump them in their own transaction (bump / bump_verified / add); the
+# rollups.compact job (app/maintenance.py) recomputes recent days from the raw tables,
+# which heals anything the bumps missed (imports, manual fixes, deletes).
+# Inside deferred() (the sync batch), add() only collects deltas and apply_deferred()
+# writes them in one upsert at the end, rows in (village, day) order: a long transaction
+# then locks each row once, last, and concurrent batches can't deadlock on them.
+# Days are UTC dates of people.created_at / encounters.submitted_at.
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from sqlalchemy import select, func, literal, cast, Date, Integer, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .models import Person, Encounter, VillageDailyStats
+
+COUNTERS = ("people_registered", "encounters_submitted", "verified", "red", "amber", "green")
+
+def utc_day(ts: datetime | None = None) -> date:
+    return (ts or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+
+def village_of(person_id):
+    return select(Person.village_id).where(Person.id == person_id).scalar_subquery()
+
+def _upsert(cols: list[str], src):
+    t = VillageDailyStats.__table__
+    stmt = pg_insert(t).from_select(["village_id", "day", *cols], src)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.c.village_id, t.c.day],
+        set_={c: t.c[c] + stmt.excluded[c] for c in cols},
+    )
+
+def bump(village_id, day: date, when=None, **deltas):
+    """Add deltas to one (village, day) row. With `when` (a CTE), one bump per row it returns."""
+    src = select(
+        literal(village_id, Integer) if isinstance(village_id, int) else village_id,
+        cast(literal(day), Date),
+        *[literal(n, Integer) for n in deltas.values()],
+    )
+    if when is not None:
+        src = src.select_from(when)
+    return _upsert(list(deltas), src)
+
+def submitted(rag: str, verified: bool) -> dict:
+    return {"encounters_submitted": 1, "verified": int(verified), (rag.lower() if rag in ("RED", "AMBER") else "green"): 1}
+
+def bump_submitted(person_id: int, day: date, rag: str, verified: bool, when=None):
+    return bump(village_of(person_id), day, when, **submitted(rag, verified))
+
+_DEFERRED = "rollup_deltas"
+
+@contextmanager
+def deferred(db):
+    """Collect add() calls on this session; apply_deferred() writes them."""
+    db.info[_DEFERRED] = []
+    try:
+        yield
+    finally:
+        db.info.pop(_DEFERRED, None)
+
+def add(db, day: date, village_id: int | None = None, person_id: int | None = None, **deltas):
+    """Bump one (village, day) row now, or at apply_deferred() inside deferred(db)."""
+    pending = db.info.get(_DEFERRED)
+    if pending is None:
+        db.execute(bump(village_id if village_id is not None else village_of(person_id), day, **deltas))
+    else:
+        pending.append((village_id, person_id, day, deltas))
+
+def mark(db) -> int:
+    return len(db.info.get(_DEFERRED) or ())
+
+def discard(db, to: int):
+    # the savepoint holding these writes rolled back
+    pending = db.info.get(_DEFERRED)
+    if pending is not None:
+        del pending[to:]
+
+def apply_deferred(db):
+    pending = db.info.get(_DEFERRED)
+    if not pending:
+        return
+    person_ids = {p for v, p, _, _ in pending if v is None}
+    villages = dict(db.execute(select(Person.id, Person.village_id).where(Person.id.in_(person_ids))).all()) if person_ids else {}
+    totals: dict[tuple[int, date], Counter] = {}
+    for v, p, day, deltas in pending:
+        totals.setdefault((v if v is not None else villages[p], day), Counter()).update(deltas)
+    pending.clear()
+    t = VillageDailyStats.__table__
+    rows = [{"village_id": v, "day": d, **{c: n.get(c, 0) for c in COUNTERS}} for (v, d), n in sorted(totals.items())]
+    stmt = pg_insert(t).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[t.c.village_id, t.c.day],
+        set_={c: t.c[c] + stmt.excluded[c] for c in COUNTERS},
+    ))
+
+def bump_verified(encounter_ids):
+    # counted on the day the encounter was submitted, like the rest of its row
+    day = cast(func.timezone("UTC", Encounter.submitted_at), Date)
+    src = (
+        select(Person.village_id, day, func.count())
+        .join(Person, Person.id == Encounter.person_id)
+        .where(Encounter.id.in_(encounter_ids), Encounter.submitted_at.isnot(None))
+        .group_by(Person.village_id, day)
+    )
+    return _upsert(["verified"], src)
+
+# Exact counts for every day >= :since, overwriting whatever the bumps left. Run inside one
+# transaction after deleting the same range, so days whose counts fell to zero disappear too.
+RECOMPUTE_SQL = text("""
+    INSERT INTO village_daily_stats (village_id, day, people_registered, encounters_submitted, verified, red, amber, green)
+    SELECT village_id, day, sum(people), sum(submitted), sum(verified), sum(red), sum(amber), sum(green)
+    FROM (
+        SELECT p.village_id, (p.created_at AT TIME ZONE 'UTC')::date AS day,
+               1 AS people, 0 AS submitted, 0 AS verified, 0 AS red, 0 AS amber, 0 AS green
+        FROM people p
+        WHERE p.created_at >= :since
+        UNION ALL
+        SELECT p.village_id, (e.submitted_at AT TIME ZONE 'UTC')::date,
+               0, 1, (e.status = 'VERIFIED')::int,
+               (d.rag = 'RED')::int, (d.rag = 'AMBER')::int, (COALESCE(d.rag, 'GREEN') NOT IN ('RED', 'AMBER'))::int
+        FROM encounters e
+        JOIN people p ON p.id = e.person_id
+        LEFT JOIN derived_results d ON d.encounter_id = e.id
+        WHERE e.submitted_at >= :since
+    ) x
+    GROUP BY village_id, day
+    ON CONFLICT (village_id, day) DO UPDATE SET
+        people_registered = excluded.people_registered, encounters_submitted = excluded.encounters_submitted,
+        verified = excluded.verified, red = excluded.red, amber = excluded.amber, green = excluded.green
+""")
+
+def recompute(db, since: date) -> int:
+    start = datetime(since.year, since.month, since.day, tzinfo=timezone.utc)
+    db.execute(text("DELETE FROM village_daily_stats WHERE day >= :day"), {"day": since})
+    return db.execute(RECOMPUTE_SQL, {"since": start}).rowcount
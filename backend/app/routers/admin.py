@@ -1,34 +1,228 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv, io, json, zlib
+from datetime import date, datetime, time, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..db import get_db
-from ..models import Person, Encounter, DerivedResult, Worker
-from ..schemas import WorkerCreateIn, WorkerOut, PersonIn, PersonOut
-from ..security import require_perm, hash_password
+from sqlalchemy import func, select, tuple_
+from ..db import get_db, SessionLocal
+from ..models import Person, Household, Encounter, Vitals, Tests, DerivedResult, Worker, FollowupWorklist, Job, VillageDailyStats
+from ..schemas import (
+    WorkerCreateIn, WorkerUpdateIn, WorkerOut, PersonIn, PersonOut, OverdueSummary, OverdueVillage, OverdueItem, OverduePage,
+    JobStatsOut, JobEnqueueOut, RollupVillage, RollupDay, CoverageOut, VerificationRatesOut,
+)
+from ..jobs import HANDLERS, enqueue
+from .. import maintenance  # noqa: F401  (registers the built-in job kinds)
+from .. import rollups
+from ..compression import accepts
+from ..pagination import encode_cursor, decode_cursor
+from ..security import require_perm, hash_password, invalidate_worker
+from ..audit import audit_read
 from ..rbac import Role
 
 router = APIRouter(prefix="/api", tags=["admin"])
 
-@router.get("/dashboard/coverage", dependencies=[Depends(require_perm("dashboards:view"))])
-def coverage(db: Session = Depends(get_db)):
-    total_people = db.query(func.count(Person.id)).scalar()
-    screened = db.query(func.count(Encounter.id)).filter(Encounter.submitted_at.isnot(None)).scalar()
-    return {"total_people": total_people, "screened": screened}
+def _rollups(db: Session, village_id: int | None, date_from: date | None, date_to: date | None):
+    # Reads village_daily_stats only: cost grows with villages x days, not with people or encounters.
+    s = VillageDailyStats
+    sums = [func.coalesce(func.sum(getattr(s, c)), 0) for c in rollups.COUNTERS]
+    where = []
+    if village_id:
+        where.append(s.village_id == village_id)
+    if date_from:
+        where.append(s.day >= date_from)
+    if date_to:
+        where.append(s.day <= date_to)
+    by_village = db.execute(select(s.village_id, *sums).where(*where).group_by(s.village_id).order_by(s.village_id)).all()
+    by_day = db.execute(select(s.day, *sums).where(*where).group_by(s.day).order_by(s.day)).all()
 
-@router.get("/dashboard/verification-rates", dependencies=[Depends(require_perm("dashboards:view"))])
-def verification_rates(db: Session = Depends(get_db)):
-    total = db.query(func.count(Encounter.id)).filter(Encounter.submitted_at.isnot(None)).scalar()
-    verified = db.query(func.count(Encounter.id)).filter(Encounter.status == "VERIFIED").scalar()
-    return {"total_submitted": total, "verified": verified, "verified_rate": (verified / total) if total else 0.0}
+    def counts(row) -> dict:
+        people, submitted, verified, red, amber, green = row[1:]
+        return dict(people_registered=people, screened=submitted, verified=verified, red=red, amber=amber, green=green)
+    villages = [RollupVillage(village_id=r[0], **counts(r)) for r in by_village]
+    days = [RollupDay(day=r[0], **counts(r)) for r in by_day]
+    return villages, days
 
-@router.get("/dashboard/overdue", dependencies=[Depends(require_perm("dashboards:view"))])
-def overdue_stub():
-    # Real overdue is computed client-side by due engine offline; server can later aggregate derived_results.followup_date.
-    return {"note": "Overdue list is computed offline on device from rules.json + latest derived results."}
+@router.get("/dashboard/coverage", response_model=CoverageOut, dependencies=[Depends(require_perm("dashboards:view"))])
+def coverage(
+    village_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: Session = Depends(get_db),
+):
+    villages, days = _rollups(db, village_id, date_from, date_to)
+    return CoverageOut(
+        date_from=date_from, date_to=date_to,
+        total_people=sum(v.people_registered for v in villages), screened=sum(v.screened for v in villages),
+        villages=villages, days=days,
+    )
+
+@router.get("/dashboard/verification-rates", response_model=VerificationRatesOut, dependencies=[Depends(require_perm("dashboards:view"))])
+def verification_rates(
+    village_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: Session = Depends(get_db),
+):
+    villages, days = _rollups(db, village_id, date_from, date_to)
+    total = sum(v.screened for v in villages)
+    verified = sum(v.verified for v in villages)
+    return VerificationRatesOut(
+        date_from=date_from, date_to=date_to,
+        total_submitted=total, verified=verified, verified_rate=(verified / total) if total else 0.0,
+        villages=villages, days=days,
+    )
+
+@router.get("/dashboard/overdue", response_model=OverdueSummary, dependencies=[Depends(require_perm("dashboards:view"))])
+def overdue(village_id: int | None = None, as_of: date | None = None, db: Session = Depends(get_db)):
+    # Counts come straight off ix_worklist_village_due: one row per person, never a scan of history.
+    as_of = as_of or date.today()
+    w = FollowupWorklist
+    q = (
+        db.query(
+            w.village_id,
+            func.count(),
+            func.count().filter(w.rag == "RED"),
+            func.count().filter(w.rag == "AMBER"),
+        )
+        .filter(w.followup_date < as_of)
+        .group_by(w.village_id)
+        .order_by(w.village_id)
+    )
+    if village_id:
+        q = q.filter(w.village_id == village_id)
+    villages = [OverdueVillage(village_id=v, overdue=n, red=red, amber=amber) for v, n, red, amber in q]
+    return OverdueSummary(as_of=as_of, total=sum(v.overdue for v in villages), villages=villages)
+
+@router.get("/dashboard/overdue/list", response_model=OverduePage, dependencies=[Depends(require_perm("dashboards:view"))])
+def overdue_list(
+    village_id: int | None = None,
+    as_of: date | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    # Most days overdue first, then RED before AMBER before GREEN.
+    as_of = as_of or date.today()
+    w = FollowupWorklist
+    q = (
+        db.query(w, Person.full_name)
+        .join(Person, Person.id == w.person_id)
+        .filter(w.followup_date < as_of)
+    )
+    if village_id:
+        q = q.filter(w.village_id == village_id)
+    if cursor:
+        due, rank, person_id = decode_cursor(cursor, 3)
+        try:
+            key = (date.fromisoformat(due), int(rank), int(person_id))
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+        q = q.filter(tuple_(w.followup_date, w.rag_rank, w.person_id) > key)
+    rows = q.order_by(w.followup_date, w.rag_rank, w.person_id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [OverdueItem(
+        person_id=r.person_id, person_name=name, village_id=r.village_id, encounter_id=r.encounter_id,
+        rag=r.rag, followup_date=r.followup_date, days_overdue=(as_of - r.followup_date).days,
+    ) for r, name in rows]
+    last = rows[-1][0] if rows else None
+    return OverduePage(
+        items=items, has_more=has_more,
+        next_cursor=encode_cursor(last.followup_date, last.rag_rank, last.person_id) if has_more else None,
+    )
 
-@router.get("/export/csv", dependencies=[Depends(require_perm("export:csv"))])
-def export_csv_stub():
-    return {"note": "Implement CSV streaming export (people, encounters, results). Keep it paged and gzip."}
+EXPORT_PAGE = 2000
+
+EXPORT_COLUMNS = {
+    "people": [
+        Person.id, Person.village_id, Person.household_id, Household.hamlet, Person.full_name,
+        Person.sex, Person.dob, Person.phone, Person.demographics_json, Person.risk_survey_json,
+        Person.created_at, Person.updated_at,
+    ],
+    "encounters": [
+        Encounter.id, Encounter.person_id, Person.village_id, Person.household_id, Person.full_name,
+        Person.sex, Person.dob, Encounter.camp_id, Encounter.status, Encounter.client_created_at,
+        Encounter.submitted_at, Encounter.verified_at,
+        Vitals.sbp1, Vitals.dbp1, Vitals.sbp2, Vitals.dbp2, Vitals.sbp_avg, Vitals.dbp_avg,
+        Vitals.hr, Vitals.spo2, Vitals.temp, Vitals.weight, Vitals.height, Vitals.bmi, Vitals.waist,
+        Tests.glucose_type, Tests.glucose_value, Tests.hb,
+        DerivedResult.rag, DerivedResult.overall_score, DerivedResult.flags_json,
+        DerivedResult.next_step, DerivedResult.followup_date, DerivedResult.rules_version,
+    ],
+}
+
+def _export_stmt(kind: str, village_id: int | None, date_from: date | None, date_to: date | None, after_id: int):
+    cols = EXPORT_COLUMNS[kind]
+    if kind == "people":
+        key, ts = Person.id, Person.created_at
+        stmt = select(*cols).join(Household, Household.id == Person.household_id)
+    else:
+        key, ts = Encounter.id, Encounter.submitted_at
+        stmt = (
+            select(*cols)
+            .join(Person, Person.id == Encounter.person_id)
+            .outerjoin(Vitals, Vitals.encounter_id == Encounter.id)
+            .outerjoin(Tests, Tests.encounter_id == Encounter.id)
+            .outerjoin(DerivedResult, DerivedResult.encounter_id == Encounter.id)
+        )
+    if village_id:
+        stmt = stmt.where(Person.village_id == village_id)
+    if date_from:
+        stmt = stmt.where(ts >= datetime.combine(date_from, time.min, timezone.utc))
+    if date_to:
+        stmt = stmt.where(ts < datetime.combine(date_to + timedelta(days=1), time.min, timezone.utc))
+    # keyset on the first column: a dropped download resumes with after_id=<last id received>
+    return stmt.where(key > after_id).order_by(key)
+
+def _cell(v):
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, separators=(",", ":"))
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+def _csv_stream(stmt, header: list[str], gzip: bool):
+    # Own session: the request-scoped one is closed before the body is streamed.
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buf = io.StringIO()
+    w = csv.writer(buf)
+
+    def drain() -> bytes:
+        data = buf.getvalue().encode()
+        buf.seek(0); buf.truncate()
+        return comp.compress(data) if comp else data
+
+    w.writerow(header)
+    yield drain()
+    with SessionLocal() as db:
+        # server-side cursor, EXPORT_PAGE rows in memory at a time
+        for page in db.execute(stmt.execution_options(yield_per=EXPORT_PAGE)).partitions():
+            w.writerows([_cell(v) for v in row] for row in page)
+            chunk = drain()
+            if chunk:
+                yield chunk
+    if comp:
+        yield comp.flush()
+
+@router.get("/export/csv", dependencies=[Depends(require_perm("export:csv")), Depends(audit_read("export"))])
+def export_csv(
+    request: Request,
+    kind: str = "encounters",
+    village_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after_id: int = 0,
+):
+    if kind not in EXPORT_COLUMNS:
+        raise HTTPException(400, f"kind must be one of {', '.join(EXPORT_COLUMNS)}")
+    stmt = _export_stmt(kind, village_id, date_from, date_to, after_id)
+    header = [c.name if c.table is not Household else "hamlet" for c in EXPORT_COLUMNS[kind]]
+    gzip = accepts(request.headers.get("accept-encoding") or "", "gzip")
+    headers = {"Content-Disposition": f'attachment; filename="{kind}.csv"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(_csv_stream(stmt, header, gzip), media_type="text/csv", headers=headers)
 
 @router.post("/admin/workers", response_model=WorkerOut, dependencies=[Depends(require_perm("admin:manage"))])
 def create_worker(body: WorkerCreateIn, db: Session = Depends(get_db)):
@@ -67,10 +261,85 @@ def create_worker(body: WorkerCreateIn, db: Session = Depends(get_db)):
         updated_at=w.updated_at,
     )
 
+@router.patch("/admin/workers/{worker_id}", response_model=WorkerOut, dependencies=[Depends(require_perm("admin:manage"))])
+def update_worker(worker_id: int, body: WorkerUpdateIn, db: Session = Depends(get_db)):
+    w = db.get(Worker, worker_id)
+    if not w:
+        raise HTTPException(status_code=404, detail="Worker not found")
+
+    changes = body.model_dump(exclude_unset=True)
+    cols = Worker.__table__.c
+    nulls = [k for k, v in changes.items() if v is None and (k == "role" or (k in cols and not cols[k].nullable))]
+    if nulls:
+        raise HTTPException(status_code=422, detail=f"{', '.join(nulls)}: may not be null")
+    if "role" in changes:
+        try:
+            role = Role(changes.pop("role").upper())
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid role")
+        if role == Role.PATIENT:
+            raise HTTPException(status_code=400, detail="Workers cannot have the patient role")
+        w.role = role.value
+    if "assigned_villages" in changes:
+        w.assigned_villages_json = changes.pop("assigned_villages") or []
+    if changes.get("password"):
+        w.password_hash = hash_password(changes.pop("password"))
+    changes.pop("password", None)
+    for k, v in changes.items():
+        setattr(w, k, v)
+    db.commit()
+    db.refresh(w)
+    invalidate_worker(w.id)  # takes effect on this worker's next request, even with a live token
+    return WorkerOut(
+        id=w.id,
+        username=w.username,
+        role=w.role,
+        display_name=w.display_name,
+        phone=w.phone,
+        assigned_villages=w.assigned_villages_json or [],
+        is_active=w.is_active,
+        updated_at=w.updated_at,
+    )
+
 @router.post("/admin/patients", response_model=PersonOut, dependencies=[Depends(require_perm("admin:manage"))])
 def create_patient(body: PersonIn, db: Session = Depends(get_db)):
     p = Person(**body.model_dump())
     db.add(p)
+    db.execute(rollups.bump(body.village_id, rollups.utc_day(), people_registered=1))
     db.commit()
     db.refresh(p)
     return PersonOut(**body.model_dump(), id=p.id, updated_at=p.updated_at)
+
+@router.get("/admin/jobs", response_model=list[JobStatsOut], dependencies=[Depends(require_perm("admin:manage"))])
+def job_stats(hours: int = Query(24, ge=1, le=24 * 30), db: Session = Depends(get_db)):
+    # pending work, plus timings of jobs finished in the window
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    done = Job.status == "DONE"
+    rows = db.execute(
+        select(
+            Job.kind,
+            func.count().filter(Job.status == "QUEUED"),
+            func.count().filter(Job.status == "RUNNING"),
+            func.count().filter(done),
+            func.count().filter(Job.status == "FAILED"),
+            func.percentile_cont(0.5).within_group(Job.duration_ms).filter(done),
+            func.percentile_cont(0.95).within_group(Job.duration_ms).filter(done),
+            func.max(Job.duration_ms).filter(done),
+            func.min(Job.run_at).filter(Job.status == "QUEUED", Job.run_at <= func.now()),
+        )
+        .where((Job.finished_at >= since) | Job.status.in_(["QUEUED", "RUNNING"]))
+        .group_by(Job.kind)
+        .order_by(Job.kind)
+    ).all()
+    return [
+        JobStatsOut(kind=k, queued=q, running=r, done=d, failed=f, p50_ms=p50, p95_ms=p95, max_ms=mx, oldest_due_at=due)
+        for k, q, r, d, f, p50, p95, mx, due in rows
+    ]
+
+@router.post("/admin/jobs/{kind}", response_model=JobEnqueueOut, dependencies=[Depends(require_perm("admin:manage"))])
+def enqueue_job(kind: str, payload: dict | None = None, db: Session = Depends(get_db)):
+    if kind not in HANDLERS:
+        raise HTTPException(404, "Unknown job kind")
+    enqueue(db, kind, payload)
+    db.commit()
+    return JobEnqueueOut(kind=kind, queued=True)
@@ -0,0 +1,83 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from ...db import get_async_db
+from ...models import Camp
+from ...schemas import CampIn, CampOut, CampPage, NearbyCampOut, NearbyBatchIn, NearbyBatchOut
+from ...security import require_perm, get_principal
+from ...pagination import delta_page
+from ...etag import make_etag, cached_response, store_response
+from ... import nearby
+from ..camps import camps_stmt, camps_version_stmt, camp_version_stmt, camp_out, nearby_out, nearby_batch_out
+
+router = APIRouter(prefix="/api", tags=["camps"])
+
+async def camp_index(db: AsyncSession) -> nearby.CampIndex:
+    if (index := nearby.fresh()) is not None:
+        return index
+    today = date.today()
+    version = (*(await db.execute(nearby.version_stmt(today))).one(), today)
+    if (index := nearby.confirm(version)) is not None:
+        return index
+    return nearby.build(version, [camp_out(r) for r in await db.scalars(nearby.rows_stmt(today))])
+
+@router.post("/camps", response_model=CampOut, dependencies=[Depends(require_perm("camps:create"))])
+async def create_camp(body: CampIn, db: AsyncSession = Depends(get_async_db)):
+    c = Camp(**body.model_dump())
+    db.add(c)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(400, "Invalid village_id or camp data")
+    nearby.invalidate()
+    await db.refresh(c)
+    return CampOut(**body.model_dump(), id=c.id, updated_at=c.updated_at)
+
+@router.get("/camps", response_model=CampPage)
+async def list_camps(
+    request: Request,
+    village_id: int,
+    from_date: str | None = None,
+    updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    pr = Depends(get_principal),
+):
+    version = tuple((await db.execute(camps_version_stmt(village_id))).one())
+    etag = make_etag("camps", village_id, *version, from_date, updated_since, cursor, limit)
+    if (hit := cached_response(request, etag)) is not None:
+        return hit
+    rows = (await db.scalars(camps_stmt(village_id, from_date, cursor, updated_since, limit))).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return store_response(request, etag, CampPage(items=[camp_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor))
+
+@router.get("/camps/nearby", response_model=list[NearbyCampOut])
+async def nearby_camps(
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    radius_km: float = Query(25, gt=0, le=200),
+    from_date: date | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    order: str = Query("distance", pattern="^(distance|date)$"),
+    db: AsyncSession = Depends(get_async_db),
+    pr = Depends(get_principal),
+):
+    index = await camp_index(db)
+    return nearby_out(index, index.query(lat, lng, radius_km, from_date or date.today(), limit, order))
+
+@router.post("/camps/nearby/batch", response_model=NearbyBatchOut)
+async def nearby_camps_batch(body: NearbyBatchIn, db: AsyncSession = Depends(get_async_db), pr = Depends(get_principal)):
+    return nearby_batch_out(await camp_index(db), body)
+
+@router.get("/camps/{camp_id}", response_model=CampOut)
+async def get_camp(camp_id: int, request: Request, db: AsyncSession = Depends(get_async_db), pr = Depends(get_principal)):
+    version = await db.scalar(camp_version_stmt(camp_id))
+    if version is None:
+        raise HTTPException(404, "Not found")
+    etag = make_etag("camp", camp_id, version)
+    if (hit := cached_response(request, etag)) is not None:
+        return hit
+    return store_response(request, etag, camp_out(await db.get(Camp, camp_id)))
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...db import get_async_db
+from ...models import Encounter
+from ...schemas import QueuePage
+from ...security import require_perm, get_principal
+from ...audit import audit_read
+from ...rollups import bump_verified
+from ..clinician import queue_stmt, unverified_stmt, queue_page, review_audit
+
+router = APIRouter(prefix="/api", tags=["clinician"])
+
+@router.get("/queue", response_model=QueuePage, dependencies=[Depends(require_perm("queue:view")), Depends(audit_read("encounter"))])
+async def queue(rag: str, cursor: str | None = None, limit: int = Query(50, ge=1, le=200), db: AsyncSession = Depends(get_async_db)):
+    return queue_page((await db.execute(queue_stmt(rag, cursor, limit))).all(), limit)
+
+@router.get("/encounters/unverified", response_model=QueuePage, dependencies=[Depends(require_perm("unverified:view")), Depends(audit_read("encounter"))])
+async def unverified(cursor: str | None = None, limit: int = Query(50, ge=1, le=200), db: AsyncSession = Depends(get_async_db)):
+    return queue_page((await db.execute(unverified_stmt(cursor, limit))).all(), limit)
+
+@router.post("/encounters/{encounter_id}/approve", dependencies=[Depends(require_perm("encounter:approve"))])
+async def approve(encounter_id: int, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    enc = await db.get(Encounter, encounter_id)
+    if not enc:
+        raise HTTPException(404, "Not found")
+    if enc.status != "UNVERIFIED":
+        raise HTTPException(409, "Not unverified")
+    enc.status = "VERIFIED"
+    await db.execute(bump_verified([encounter_id]))
+    await db.commit()
+    review_audit(pr, "approve", encounter_id)
+    return {"ok": True}
+
+@router.post("/encounters/{encounter_id}/reject", dependencies=[Depends(require_perm("encounter:reject"))])
+async def reject(encounter_id: int, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    enc = await db.get(Encounter, encounter_id)
+    if not enc:
+        raise HTTPException(404, "Not found")
+    if enc.status != "UNVERIFIED":
+        raise HTTPException(409, "Not unverified")
+    review_audit(pr, "reject", encounter_id)
+    return {"ok": True}
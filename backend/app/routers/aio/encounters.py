@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from ...db import get_async_db
+from ...models import Encounter
+from ...schemas import (
+    EncounterStartIn, EncounterStartOut, EncounterSubmitIn, EncounterSubmitOut,
+    EncounterCreateIn, EncounterCreateOut,
+)
+from ...security import require_perm, get_principal
+from ... import submissions
+
+router = APIRouter(prefix="/api", tags=["encounters"])
+
+# The write path itself stays in app.submissions; run_sync drives it over the asyncpg
+# connection without blocking the event loop.
+
+@router.post("/encounters", response_model=EncounterCreateOut, dependencies=[Depends(require_perm("encounter:submit"))])
+async def create_encounter(body: EncounterCreateIn, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    try:
+        out = await db.run_sync(submissions.create_and_submit, pr.worker.id, body)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(400, "Invalid person_id or camp_id")
+    return out
+
+@router.post("/encounters/start", response_model=EncounterStartOut, dependencies=[Depends(require_perm("encounter:start"))])
+async def start_encounter(body: EncounterStartIn, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    enc = await db.run_sync(submissions.start_encounter, pr.worker.id, body)
+    await db.commit()
+    await db.refresh(enc)
+    return EncounterStartOut(encounter_id=enc.id, status=enc.status)
+
+@router.post("/encounters/{encounter_id}/submit", response_model=EncounterSubmitOut, dependencies=[Depends(require_perm("encounter:submit"))])
+async def submit_encounter(encounter_id: int, body: EncounterSubmitIn, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    enc = await db.get(Encounter, encounter_id)
+    if not enc:
+        raise HTTPException(404, "Encounter not found")
+    dr = await db.run_sync(lambda s: submissions.submit_encounter(s, enc, body))
+    await db.commit()
+    return EncounterSubmitOut(status=enc.status, rag=dr.rag, overall_score=dr.overall_score)
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...db import get_async_db
+from ...models import Household, Person
+from ...schemas import HouseholdIn, HouseholdOut, HouseholdPage, PersonIn, PersonOut, PersonPage, PersonSearchOut
+from ...security import require_perm
+from ...audit import audit_read
+from ...pagination import delta_page
+from ...search import search_people
+from ... import rollups
+from ..enumeration import households_stmt, people_stmt, household_out, person_out
+
+router = APIRouter(prefix="/api", tags=["enumeration"])
+
+@router.post("/households", response_model=HouseholdOut, dependencies=[Depends(require_perm("household:create"))])
+async def create_household(body: HouseholdIn, db: AsyncSession = Depends(get_async_db)):
+    h = Household(**body.model_dump())
+    db.add(h)
+    await db.commit()
+    await db.refresh(h)
+    return HouseholdOut(**body.model_dump(), id=h.id, updated_at=h.updated_at)
+
+@router.get("/households", response_model=HouseholdPage, dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("household"))])
+async def list_households(
+    village_id: int,
+    updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = (await db.scalars(households_stmt(village_id, cursor, updated_since, limit))).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return HouseholdPage(items=[household_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor)
+
+@router.post("/people", response_model=PersonOut, dependencies=[Depends(require_perm("people:create"))])
+async def create_person(body: PersonIn, db: AsyncSession = Depends(get_async_db)):
+    p = Person(**body.model_dump())
+    db.add(p)
+    await db.execute(rollups.bump(body.village_id, rollups.utc_day(), people_registered=1))
+    await db.commit()
+    await db.refresh(p)
+    return PersonOut(**body.model_dump(), id=p.id, updated_at=p.updated_at)
+
+@router.get("/people", response_model=PersonPage, dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("person"))])
+async def list_people(
+    village_id: int | None = None,
+    updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = (await db.scalars(people_stmt(village_id, cursor, updated_since, limit))).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return PersonPage(items=[person_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor)
+
+@router.get("/people/search", response_model=list[PersonSearchOut], dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("person"))])
+async def people_search(
+    q: str = Query(min_length=2, max_length=80),
+    village_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    hits = await db.run_sync(search_people, q, village_id, limit)
+    return [person_out(r, PersonSearchOut, score=score) for r, score in hits]
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...db import get_async_db
+from ...models import Task, ReminderLog
+from ...schemas import TaskIn, TaskOut, ReminderIn
+from ...security import require_perm, get_principal
+from ...audit import audit_read
+from ... import priority
+from ..tasks import new_task, tasks_stmt, task_out, mark_closed
+
+router = APIRouter(prefix="/api", tags=["tasks"])
+
+@router.post("/tasks", response_model=TaskOut, dependencies=[Depends(require_perm("tasks:create"))])
+async def create_task(body: TaskIn, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    t = new_task(body, pr.worker.id)
+    db.add(t); await db.commit(); await db.refresh(t)
+    return TaskOut(**body.model_dump(), id=t.id, status=t.status)
+
+@router.get("/tasks", response_model=list[TaskOut], dependencies=[Depends(require_perm("queue:view")), Depends(audit_read("task"))])
+async def list_tasks(status: str = "OPEN", db: AsyncSession = Depends(get_async_db)):
+    return [task_out(r) for r in await db.scalars(tasks_stmt(status))]
+
+@router.post("/tasks/{task_id}/close", dependencies=[Depends(require_perm("tasks:close"))])
+async def close_task(task_id: int, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    t = await db.get(Task, task_id)
+    if not t:
+        raise HTTPException(404, "Not found")
+    mark_closed(t, pr)
+    await db.commit()
+    return {"ok": True}
+
+@router.post("/reminders", dependencies=[Depends(require_perm("reminders:write"))])
+async def create_reminder(body: ReminderIn, db: AsyncSession = Depends(get_async_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    db.add(ReminderLog(person_id=body.person_id, worker_id=pr.worker.id, outcome=body.outcome, notes=body.notes))
+    await db.flush()
+    await db.execute(priority.refresh_person(body.person_id))
+    await db.commit()
+    return {"ok": True}
@@ -1,15 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, func, literal_column, String
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime, date
+from datetime import date
 from ..db import get_db
-from ..models import Camp
-from ..schemas import CampIn, CampOut
+from ..models import Camp, CampVersion
+from ..schemas import CampIn, CampOut, CampPage, NearbyCampOut, NearbyBatchIn, NearbyBatchOut, NearbyResult, NearbyHit
 from ..security import require_perm, get_principal
 from ..rbac import Role
+from ..pagination import delta_stmt, delta_page
+from ..etag import make_etag, cached_response, store_response
+from .. import nearby
 
 router = APIRouter(prefix="/api", tags=["camps"])
 
+# Shared with routers/aio/camps.py.
+
+def camps_stmt(village_id: int, from_date: str | None, cursor: str | None, updated_since: str | None, limit: int):
+    stmt = select(Camp).where(Camp.village_id == village_id)
+    if from_date:
+        stmt = stmt.where(Camp.date >= date.fromisoformat(from_date))
+    return delta_stmt(stmt, Camp, cursor, updated_since, limit)
+
+def camps_version_stmt(village_id: int):
+    # the village's trigger-bumped counter: every committed insert, update or delete moves it
+    return select(func.coalesce(
+        select(CampVersion.version).where(CampVersion.village_id == village_id).scalar_subquery(), 0))
+
+def camp_version_stmt(camp_id: int):
+    # xmin changes with every row version, whatever order the writers' transactions started in
+    return select(literal_column("camps.xmin", String)).where(Camp.id == camp_id)
+
+def camp_out(r: Camp) -> CampOut:
+    return CampOut(
+        id=r.id, village_id=r.village_id, name=r.name, date=r.date,
+        start_time=r.start_time, end_time=r.end_time,
+        address=r.address, landmark=r.landmark,
+        lat=float(r.lat), lng=float(r.lng),
+        contact_name=r.contact_name, contact_phone=r.contact_phone,
+        services_json=r.services_json, updated_at=r.updated_at
+    )
+
+def nearby_out(index: nearby.CampIndex, hits: list) -> list[NearbyCampOut]:
+    return [NearbyCampOut(**index.camps[i].model_dump(), distance_km=d) for i, d in hits]
+
+def nearby_batch_out(index: nearby.CampIndex, body: NearbyBatchIn) -> NearbyBatchOut:
+    from_date = body.from_date or date.today()
+    results, used = [], {}
+    for p in body.points:
+        hits = index.query(p.lat, p.lng, body.radius_km, from_date, body.limit, body.order)
+        for i, _ in hits:
+            used.setdefault(i, index.camps[i])
+        results.append(NearbyResult(key=p.key, camps=[NearbyHit(camp_id=index.camps[i].id, distance_km=d) for i, d in hits]))
+    return NearbyBatchOut(camps=list(used.values()), results=results)
+
+def camp_index(db: Session) -> nearby.CampIndex:
+    if (index := nearby.fresh()) is not None:
+        return index
+    today = date.today()
+    version = (*db.execute(nearby.version_stmt(today)).one(), today)
+    return nearby.confirm(version) or nearby.build(version, [camp_out(r) for r in db.scalars(nearby.rows_stmt(today))])
+
 @router.post("/camps", response_model=CampOut, dependencies=[Depends(require_perm("camps:create"))])
 def create_camp(body: CampIn, db: Session = Depends(get_db)):
     c = Camp(**body.model_dump())
@@ -19,43 +70,56 @@ def create_camp(body: CampIn, db: Session = Depends(get_db)):
     except IntegrityError:
         db.rollback()
         raise HTTPException(400, "Invalid village_id or camp data")
+    nearby.invalidate()
     db.refresh(c)
     return CampOut(**body.model_dump(), id=c.id, updated_at=c.updated_at)
 
-@router.get("/camps", response_model=list[CampOut])
+@router.get("/camps", response_model=CampPage)
 def list_camps(
+    request: Request,
     village_id: int,
     from_date: str | None = None,
     updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(200, ge=1, le=1000),
     db: Session = Depends(get_db),
     pr = Depends(get_principal),
 ):
     # Patients can view their village camps; workers limited in UI by assigned villages.
-    q = db.query(Camp).filter(Camp.village_id == village_id)
-    if from_date:
-        q = q.filter(Camp.date >= date.fromisoformat(from_date))
-    if updated_since:
-        q = q.filter(Camp.updated_at > datetime.fromisoformat(updated_since))
-    rows = q.order_by(Camp.date.asc()).limit(200).all()
-    return [CampOut(
-        id=r.id, village_id=r.village_id, name=r.name, date=r.date,
-        start_time=r.start_time, end_time=r.end_time,
-        address=r.address, landmark=r.landmark,
-        lat=float(r.lat), lng=float(r.lng),
-        contact_name=r.contact_name, contact_phone=r.contact_phone,
-        services_json=r.services_json, updated_at=r.updated_at
-    ) for r in rows]
+    version = tuple(db.execute(camps_version_stmt(village_id)).one())
+    etag = make_etag("camps", village_id, *version, from_date, updated_since, cursor, limit)
+    if (hit := cached_response(request, etag)) is not None:
+        return hit
+    rows = db.scalars(camps_stmt(village_id, from_date, cursor, updated_since, limit)).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return store_response(request, etag, CampPage(items=[camp_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor))
+
+# declared before /camps/{camp_id}, which would otherwise claim the path
+@router.get("/camps/nearby", response_model=list[NearbyCampOut])
+def nearby_camps(
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    radius_km: float = Query(25, gt=0, le=200),
+    from_date: date | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    order: str = Query("distance", pattern="^(distance|date)$"),
+    db: Session = Depends(get_db),
+    pr = Depends(get_principal),
+):
+    """Upcoming camps within radius_km, nearest first (order=date: soonest first)."""
+    index = camp_index(db)
+    return nearby_out(index, index.query(lat, lng, radius_km, from_date or date.today(), limit, order))
+
+@router.post("/camps/nearby/batch", response_model=NearbyBatchOut)
+def nearby_camps_batch(body: NearbyBatchIn, db: Session = Depends(get_db), pr = Depends(get_principal)):
+    return nearby_batch_out(camp_index(db), body)
 
 @router.get("/camps/{camp_id}", response_model=CampOut)
-def get_camp(camp_id: int, db: Session = Depends(get_db), pr = Depends(get_principal)):
-    r = db.get(Camp, camp_id)
-    if not r:
+def get_camp(camp_id: int, request: Request, db: Session = Depends(get_db), pr = Depends(get_principal)):
+    version = db.scalar(camp_version_stmt(camp_id))
+    if version is None:
         raise HTTPException(404, "Not found")
-    return CampOut(
-        id=r.id, village_id=r.village_id, name=r.name, date=r.date,
-        start_time=r.start_time, end_time=r.end_time,
-        address=r.address, landmark=r.landmark,
-        lat=float(r.lat), lng=float(r.lng),
-        contact_name=r.contact_name, contact_phone=r.contact_phone,
-        services_json=r.services_json, updated_at=r.updated_at
-    )
+    etag = make_etag("camp", camp_id, version)
+    if (hit := cached_response(request, etag)) is not None:
+        return hit
+    return store_response(request, etag, camp_out(db.get(Camp, camp_id)))
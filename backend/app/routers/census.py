@@ -0,0 +1,52 @@
+import io, tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..db import SessionLocal
+from ..schemas import ImportReport
+from ..security import require_perm, Principal
+from ..audit import record_by
+from ..rbac import Role
+from .. import census
+
+router = APIRouter(prefix="/api", tags=["census"])
+
+SPOOL_MEMORY = 8 * 1024 * 1024  # larger uploads spill to a temp file
+
+def _import(kind: str, fmt: str, spool, villages: set[int] | None) -> ImportReport:
+    with spool, SessionLocal() as db:
+        rows = census.read_rows(io.TextIOWrapper(spool, encoding="utf-8-sig", newline=""), fmt)
+        return census.import_rows(db, kind, rows, villages)
+
+@router.post("/import/census/{kind}", response_model=ImportReport)
+async def import_census(
+    kind: str,
+    request: Request,
+    fmt: str | None = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    pr: Principal = Depends(require_perm("census:import")),
+):
+    """Body is the raw file (text/csv or application/x-ndjson); see app/census.py for the row format."""
+    if kind not in census.KINDS:
+        raise HTTPException(status_code=404, detail="Unknown import kind")
+    fmt = fmt or census.format_for(request.headers.get("content-type"))
+    if not fmt:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+    limit = settings.CENSUS_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail=f"Upload larger than {limit} bytes")
+    length = request.headers.get("content-length") or ""
+    if length.isdigit() and int(length) > limit:
+        raise too_large
+    # spool the upload first so a slow client never holds a database connection
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    size = 0
+    async for piece in request.stream():
+        size += len(piece)
+        if size > limit:  # chunked bodies carry no Content-Length
+            spool.close()
+            raise too_large
+        spool.write(piece)
+    spool.seek(0)
+    villages = None if pr.role == Role.ADMIN else set(pr.worker.assigned_villages_json or [])
+    report = await run_in_threadpool(_import, kind, fmt, spool, villages)
+    record_by(pr, "import", kind, meta=report.model_dump(include={"rows", "inserted", "updated", "unchanged", "failed"}))
+    return report
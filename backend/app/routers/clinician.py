@@ -1,39 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import select, tuple_, bindparam
 from ..db import get_db
-from ..models import Encounter, Person, DerivedResult, AuditLog
-from ..schemas import QueueItem
+from ..models import Encounter, Person, DerivedResult, QUEUE_STATUSES
+from ..schemas import QueueItem, QueuePage
 from ..security import require_perm, get_principal
+from ..pagination import encode_cursor, decode_cursor
+from ..audit import record_by, audit_read
+from ..rollups import bump_verified
 
 router = APIRouter(prefix="/api", tags=["clinician"])
 
-@router.get("/queue", response_model=list[QueueItem], dependencies=[Depends(require_perm("queue:view"))])
-def queue(rag: str, db: Session = Depends(get_db)):
-    rows = (
-        db.query(Encounter, Person, DerivedResult)
-        .join(Person, Person.id == Encounter.person_id)
-        .join(DerivedResult, DerivedResult.encounter_id == Encounter.id)
-        .filter(DerivedResult.rag == rag, Encounter.status.in_(["VERIFIED", "UNVERIFIED"]))
-        .order_by(Encounter.submitted_at.desc())
-        .limit(200).all()
-    )
-    out = []
-    for enc, p, dr in rows:
-        out.append(QueueItem(encounter_id=enc.id, person_id=p.id, person_name=p.full_name, rag=dr.rag, status=enc.status, submitted_at=enc.submitted_at))
-    return out
-
-@router.get("/encounters/unverified", response_model=list[QueueItem], dependencies=[Depends(require_perm("unverified:view"))])
-def unverified(db: Session = Depends(get_db)):
-    rows = (
-        db.query(Encounter, Person, DerivedResult)
+# Shared with routers/aio/clinician.py.
+
+def _queue_base():
+    return (
+        select(Encounter.id, Encounter.person_id, Person.full_name, DerivedResult.rag, Encounter.status, Encounter.submitted_at)
         .join(Person, Person.id == Encounter.person_id)
         .join(DerivedResult, DerivedResult.encounter_id == Encounter.id)
-        .filter(Encounter.status == "UNVERIFIED")
-        .order_by(Encounter.submitted_at.desc())
-        .limit(200).all()
     )
-    return [QueueItem(encounter_id=e.id, person_id=p.id, person_name=p.full_name, rag=dr.rag, status=e.status, submitted_at=e.submitted_at) for e,p,dr in rows]
+
+def _page(stmt, cursor: str | None, limit: int):
+    # newest first; keyset on (submitted_at, id) so deep pages cost the same as the first
+    if cursor:
+        ts, rid = decode_cursor(cursor, 2)
+        try:
+            key = (datetime.fromisoformat(ts), int(rid))
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+        stmt = stmt.where(tuple_(Encounter.submitted_at, Encounter.id) < key)
+    return stmt.order_by(Encounter.submitted_at.desc(), Encounter.id.desc()).limit(limit + 1)
+
+# Status predicates are rendered inline (literal_execute) so that prepared statements
+# (asyncpg) still match the partial indexes' WHERE clauses.
+def queue_stmt(rag: str, cursor: str | None = None, limit: int = 50):
+    in_queue = Encounter.status.in_(bindparam("queue_statuses", list(QUEUE_STATUSES), expanding=True, literal_execute=True))
+    return _page(_queue_base().where(DerivedResult.rag == rag, in_queue), cursor, limit)
+
+def unverified_stmt(cursor: str | None = None, limit: int = 50):
+    unverified = Encounter.status == bindparam("unverified", "UNVERIFIED", literal_execute=True)
+    return _page(_queue_base().where(unverified), cursor, limit)
+
+def queue_page(rows: list, limit: int) -> QueuePage:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].submitted_at, rows[-1].id) if has_more else None
+    return QueuePage(items=[queue_item(r) for r in rows], has_more=has_more, next_cursor=next_cursor)
+
+def queue_item(row) -> QueueItem:
+    return QueueItem(encounter_id=row.id, person_id=row.person_id, person_name=row.full_name, rag=row.rag, status=row.status, submitted_at=row.submitted_at)
+
+def review_audit(pr, action: str, encounter_id: int):
+    # call after the commit: the audit trail is written behind the request
+    record_by(pr, action, "encounter", encounter_id)
+
+@router.get("/queue", response_model=QueuePage, dependencies=[Depends(require_perm("queue:view")), Depends(audit_read("encounter"))])
+def queue(rag: str, cursor: str | None = None, limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_db)):
+    return queue_page(db.execute(queue_stmt(rag, cursor, limit)).all(), limit)
+
+@router.get("/encounters/unverified", response_model=QueuePage, dependencies=[Depends(require_perm("unverified:view")), Depends(audit_read("encounter"))])
+def unverified(cursor: str | None = None, limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_db)):
+    return queue_page(db.execute(unverified_stmt(cursor, limit)).all(), limit)
 
 @router.post("/encounters/{encounter_id}/approve", dependencies=[Depends(require_perm("encounter:approve"))])
 def approve(encounter_id: int, db: Session = Depends(get_db), pr=Depends(get_principal)):
@@ -44,8 +72,9 @@ def approve(encounter_id: int, db: Session = Depends(get_db), pr=Depends(get_pri
         raise HTTPException(409, "Not unverified")
     enc.status = "VERIFIED"
     enc.verified_at = enc.verified_at  # clinician approval time could be stored separately if desired
-    db.add(AuditLog(actor_worker_id=pr.worker.id if pr.worker else None, action="approve", entity="encounter", entity_id=str(encounter_id)))
+    db.execute(bump_verified([encounter_id]))
     db.commit()
+    review_audit(pr, "approve", encounter_id)
     return {"ok": True}
 
 @router.post("/encounters/{encounter_id}/reject", dependencies=[Depends(require_perm("encounter:reject"))])
@@ -56,6 +85,5 @@ def reject(encounter_id: int, db: Session = Depends(get_db), pr=Depends(get_prin
     if enc.status != "UNVERIFIED":
         raise HTTPException(409, "Not unverified")
     # Keep record but mark rejected via audit; production: add status REJECTED.
-    db.add(AuditLog(actor_worker_id=pr.worker.id if pr.worker else None, action="reject", entity="encounter", entity_id=str(encounter_id)))
-    db.commit()
+    review_audit(pr, "reject", encounter_id)
     return {"ok": True}
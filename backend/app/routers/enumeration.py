@@ -1,14 +1,42 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from datetime import datetime
 from ..db import get_db
 from ..models import Household, Person
-from ..schemas import HouseholdIn, HouseholdOut, PersonIn, PersonOut
+from ..schemas import HouseholdIn, HouseholdOut, HouseholdPage, PersonIn, PersonOut, PersonPage, PersonSearchOut
 from ..security import require_perm
+from ..audit import audit_read
+from ..pagination import delta_stmt, delta_page
+from ..search import search_people
+from .. import rollups
 
 router = APIRouter(prefix="/api", tags=["enumeration"])
 
+# Statements and row mappers below are shared with routers/aio/enumeration.py.
+
+def households_stmt(village_id: int, cursor: str | None, updated_since: str | None, limit: int):
+    return delta_stmt(select(Household).where(Household.village_id == village_id), Household, cursor, updated_since, limit)
+
+def people_stmt(village_id: int | None, cursor: str | None, updated_since: str | None, limit: int):
+    stmt = select(Person)
+    if village_id:
+        stmt = stmt.where(Person.village_id == village_id)
+    return delta_stmt(stmt, Person, cursor, updated_since, limit)
+
+def household_out(r: Household) -> HouseholdOut:
+    return HouseholdOut(
+        id=r.id, village_id=r.village_id, hamlet=r.hamlet, address=r.address,
+        head_name=r.head_name, phone=r.phone, updated_at=r.updated_at
+    )
+
+def person_out(r: Person, cls=PersonOut, **extra) -> PersonOut:
+    return cls(
+        id=r.id, household_id=r.household_id, village_id=r.village_id,
+        full_name=r.full_name, sex=r.sex, dob=r.dob, phone=r.phone,
+        demographics_json=r.demographics_json, risk_survey_json=r.risk_survey_json,
+        updated_at=r.updated_at, **extra
+    )
+
 @router.post("/households", response_model=HouseholdOut, dependencies=[Depends(require_perm("household:create"))])
 def create_household(body: HouseholdIn, db: Session = Depends(get_db)):
     h = Household(**body.model_dump())
@@ -17,41 +45,44 @@ def create_household(body: HouseholdIn, db: Session = Depends(get_db)):
     db.refresh(h)
     return HouseholdOut(**body.model_dump(), id=h.id, updated_at=h.updated_at)
 
-@router.get("/households", response_model=list[HouseholdOut], dependencies=[Depends(require_perm("due:view_assigned"))])
-def list_households(village_id: int, updated_since: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(Household).filter(Household.village_id == village_id)
-    if updated_since:
-        dt = datetime.fromisoformat(updated_since)
-        q = q.filter(Household.updated_at > dt)
-    rows = q.order_by(Household.updated_at.asc()).limit(500).all()
-    return [HouseholdOut(
-        id=r.id, village_id=r.village_id, hamlet=r.hamlet, address=r.address,
-        head_name=r.head_name, phone=r.phone, updated_at=r.updated_at
-    ) for r in rows]
+@router.get("/households", response_model=HouseholdPage, dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("household"))])
+def list_households(
+    village_id: int,
+    updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    rows = db.scalars(households_stmt(village_id, cursor, updated_since, limit)).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return HouseholdPage(items=[household_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor)
 
 @router.post("/people", response_model=PersonOut, dependencies=[Depends(require_perm("people:create"))])
 def create_person(body: PersonIn, db: Session = Depends(get_db)):
     p = Person(**body.model_dump())
     db.add(p)
+    db.execute(rollups.bump(body.village_id, rollups.utc_day(), people_registered=1))
     db.commit()
     db.refresh(p)
     return PersonOut(**body.model_dump(), id=p.id, updated_at=p.updated_at)
 
-@router.get("/people", response_model=list[PersonOut], dependencies=[Depends(require_perm("due:view_assigned"))])
-def list_people(search: str = "", village_id: int | None = None, updated_since: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(Person)
-    if village_id:
-        q = q.filter(Person.village_id == village_id)
-    if search:
-        like = f"%{search}%"
-        q = q.filter(or_(Person.full_name.ilike(like), Person.phone.ilike(like)))
-    if updated_since:
-        dt = datetime.fromisoformat(updated_since)
-        q = q.filter(Person.updated_at > dt)
-    rows = q.order_by(Person.updated_at.asc()).limit(500).all()
-    return [PersonOut(
-        id=r.id, household_id=r.household_id, village_id=r.village_id,
-        full_name=r.full_name, sex=r.sex, dob=r.dob, phone=r.phone,
-        demographics_json=r.demographics_json, risk_survey_json=r.risk_survey_json,
-        updated_at=r.updated_at
-    ) for r in rows]
+@router.get("/people", response_model=PersonPage, dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("person"))])
+def list_people(
+    village_id: int | None = None,
+    updated_since: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    rows = db.scalars(people_stmt(village_id, cursor, updated_since, limit)).all()
+    rows, has_more, next_cursor = delta_page(rows, limit, cursor)
+    return PersonPage(items=[person_out(r) for r in rows], has_more=has_more, next_cursor=next_cursor)
+
+@router.get("/people/search", response_model=list[PersonSearchOut], dependencies=[Depends(require_perm("due:view_assigned")), Depends(audit_read("person"))])
+def people_search(
+    q: str = Query(min_length=2, max_length=80),
+    village_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    return [person_out(r, PersonSearchOut, score=score) for r, score in search_people(db, q, village_id, limit)]
@@ -0,0 +1,43 @@
+import asyncio, json, logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from ..compression import NO_COMPRESSION
+from ..notify import queue_hub, QUEUE_RAGS
+from ..security import require_perm
+
+router = APIRouter(prefix="/api", tags=["clinician"])
+log = logging.getLogger(__name__)
+
+HEARTBEAT_S = 15  # keeps proxies from closing an idle stream and notices dropped subscribers
+
+@router.get("/queue/stream", dependencies=[Depends(require_perm("queue:view"))])
+async def queue_stream(rag: list[str] = Query(list(QUEUE_RAGS))):
+    """Server-sent events: one `encounter` event (a QueueItem) per RED/AMBER submit.
+
+    Clients load /api/queue first, then listen here; on reconnect they reload the page,
+    since events sent while disconnected are not replayed.
+    """
+    try:
+        await queue_hub.start()
+    except Exception:
+        log.exception("queue listener unavailable")
+        raise HTTPException(503, "Live queue unavailable")
+    wanted = set(rag)
+
+    async def events():
+        with queue_hub.subscribe() as q:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(q.get(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if not queue_hub.subscribed(q):
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if item.get("rag") in wanted:
+                    yield f"id: {item['encounter_id']}\nevent: encounter\ndata: {json.dumps(item)}\n\n"
+
+    # events must reach the client as they are written, never held in a compressor
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", NO_COMPRESSION: "1"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
@@ -0,0 +1,43 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..db import get_db
+from ..models import Person, PersonPriority
+from ..schemas import PriorityItem, PriorityOut
+from ..security import require_perm
+from ..audit import audit_read
+from .. import priority
+
+router = APIRouter(prefix="/api", tags=["priority"])
+
+@router.get("/villages/{village_id}/priority", response_model=PriorityOut,
+            dependencies=[Depends(require_perm("priority:view")), Depends(audit_read("person"))])
+def village_priority(
+    village_id: int,
+    hamlet: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Highest priority first. Reads `limit` rows off ix_person_priority_village/_hamlet."""
+    pp = PersonPriority
+    stmt = (
+        select(pp, Person.full_name)
+        .join(Person, Person.id == pp.person_id)
+        .where(pp.village_id == village_id)
+        .order_by(pp.priority.desc(), pp.person_id)
+        .limit(limit)
+    )
+    if hamlet is not None:
+        stmt = stmt.where(pp.hamlet == hamlet)
+    today = date.today()
+    items = [
+        PriorityItem(
+            person_id=r.person_id, full_name=name, household_id=r.household_id, hamlet=r.hamlet,
+            rag=r.rag, overall_score=r.overall_score, followup_date=r.followup_date,
+            days_overdue=priority.days_overdue(r.followup_date, today),
+            missed_reminders=r.missed_reminders, household_flagged=r.household_flagged, priority=r.priority,
+        )
+        for r, name in db.execute(stmt).all()
+    ]
+    return PriorityOut(village_id=village_id, hamlet=hamlet, items=items)
@@ -0,0 +1,239 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from ..db import get_db
+from ..models import Household, Person, Camp, Encounter, ReminderLog, Task, SyncOp
+from ..schemas import (
+    SyncBatchIn, SyncBatchOut, SyncOpResult, SyncOpIn,
+    HouseholdIn, HouseholdOut, PersonIn, PersonOut, CampIn, CampOut,
+    EncounterStartIn, EncounterStartOut, EncounterSubmitOpIn, EncounterSubmitOut, EncounterCreateIn,
+    ReminderIn, TaskIn, TaskOut,
+)
+from ..security import get_principal
+from ..rbac import has_perm
+from .. import submissions, rollups, priority, nearby
+
+router = APIRouter(prefix="/api", tags=["sync"])
+
+# Each op builds its rows and returns a callable that renders the result once the
+# rows are flushed (ids and server defaults are only known after the flush).
+
+def _household(db, pr, body: HouseholdIn):
+    h = Household(**body.model_dump())
+    db.add(h)
+    return lambda: HouseholdOut(**body.model_dump(), id=h.id, updated_at=h.updated_at)
+
+def _person(db, pr, body: PersonIn):
+    p = Person(**body.model_dump())
+    db.add(p)
+    rollups.add(db, rollups.utc_day(), village_id=body.village_id, people_registered=1)
+    return lambda: PersonOut(**body.model_dump(), id=p.id, updated_at=p.updated_at)
+
+def _camp(db, pr, body: CampIn):
+    c = Camp(**body.model_dump())
+    db.add(c)
+    return lambda: CampOut(**body.model_dump(), id=c.id, updated_at=c.updated_at)
+
+def _encounter_start(db, pr, body: EncounterStartIn):
+    enc = submissions.start_encounter(db, pr.worker.id, body)
+    return lambda: EncounterStartOut(encounter_id=enc.id, status=enc.status)
+
+def _encounter_submit(db, pr, body: EncounterSubmitOpIn):
+    enc = db.get(Encounter, body.encounter_id)
+    if not enc:
+        raise HTTPException(404, "Encounter not found")
+    dr = submissions.submit_encounter(db, enc, body.body)
+    return lambda: EncounterSubmitOut(status=enc.status, rag=dr.rag, overall_score=dr.overall_score)
+
+def _encounter_create(db, pr, body: EncounterCreateIn):
+    out = submissions.create_and_submit(db, pr.worker.id, body)
+    return lambda: out
+
+def _reminder(db, pr, body: ReminderIn):
+    r = ReminderLog(person_id=body.person_id, worker_id=pr.worker.id, outcome=body.outcome, notes=body.notes)
+    db.add(r)
+    db.flush()
+    db.execute(priority.refresh_person(body.person_id))
+    return lambda: {"ok": True, "id": r.id}
+
+def _task(db, pr, body: TaskIn):
+    t = Task(
+        person_id=body.person_id,
+        encounter_id=body.encounter_id,
+        type=body.type,
+        status="OPEN",
+        due_date=body.due_date,
+        notes=body.notes,
+        created_by_worker_id=pr.worker.id,
+    )
+    db.add(t)
+    return lambda: TaskOut(**body.model_dump(), id=t.id, status=t.status)
+
+# op type -> (permission, payload schema, apply, groupable)
+# Groupable ops are plain inserts: consecutive runs of them are flushed as one multi-row INSERT.
+OPS = {
+    "household:create": ("household:create", HouseholdIn, _household, True),
+    "person:create": ("people:create", PersonIn, _person, True),
+    "camp:create": ("camps:create", CampIn, _camp, False),
+    "encounter:start": ("encounter:start", EncounterStartIn, _encounter_start, False),
+    "encounter:submit": ("encounter:submit", EncounterSubmitOpIn, _encounter_submit, False),
+    "encounter:create": ("encounter:submit", EncounterCreateIn, _encounter_create, False),
+    "reminder:create": ("reminders:write", ReminderIn, _reminder, True),
+    "task:create": ("tasks:create", TaskIn, _task, True),
+}
+
+def _ref_id(data: dict):
+    return data.get("id", data.get("encounter_id"))
+
+def _resolve_refs(payload: dict, known: dict) -> dict:
+    # "<name>_ref": "<op_id>" -> "<name>_id": id created by that op (this batch or an earlier one)
+    out = dict(payload)
+    for k in [k for k in payload if k.endswith("_ref")]:
+        ref = out.pop(k)
+        if ref not in known or _ref_id(known[ref]) is None:
+            raise HTTPException(424, f"Unresolved reference {k}={ref}")
+        out[k[:-4] + "_id"] = _ref_id(known[ref])
+    return out
+
+def _prepare(op: SyncOpIn, pr, known: dict):
+    spec = OPS.get(op.type)
+    if not spec:
+        raise HTTPException(400, f"Unknown op type {op.type}")
+    perm, schema, apply, _ = spec
+    if not has_perm(pr.role, perm):
+        raise HTTPException(403, "Forbidden")
+    try:
+        body = schema.model_validate(_resolve_refs(op.payload, known))
+    except ValidationError as e:
+        raise HTTPException(422, "; ".join(f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in e.errors()))
+    return apply, body
+
+def _dump(out) -> dict:
+    return out.model_dump(mode="json") if isinstance(out, BaseModel) else out
+
+def _ok(op: SyncOpIn, data: dict, replayed: bool = False) -> SyncOpResult:
+    return SyncOpResult(op_id=op.op_id, ok=True, status=200, data=data, replayed=replayed)
+
+def _transient(e: DBAPIError) -> bool:
+    # deadlock / serialization failure: the batch is worth retrying as a whole
+    return getattr(e.orig, "pgcode", None) in ("40P01", "40001")
+
+def _retry_batch(db: Session, e: DBAPIError):
+    db.rollback()
+    raise HTTPException(503, "Database busy; retry the batch") from e
+
+def _apply_one(db: Session, pr, op: SyncOpIn, known: dict) -> SyncOpResult:
+    mark = rollups.mark(db)
+    try:
+        apply, body = _prepare(op, pr, known)
+        with db.begin_nested():
+            render = apply(db, pr, body)
+            db.flush()
+            data = _dump(render())
+            db.add(SyncOp(worker_id=pr.worker.id, op_key=op.op_id, op_type=op.type, result_json=data))
+    except HTTPException as e:
+        rollups.discard(db, mark)
+        return SyncOpResult(op_id=op.op_id, ok=False, status=e.status_code, error=str(e.detail))
+    except IntegrityError:
+        rollups.discard(db, mark)
+        # a concurrent upload of the same op committed first (our insert waited on its key):
+        # answer with what it stored, as a retry would get
+        stored = db.execute(
+            select(SyncOp.result_json).where(SyncOp.worker_id == pr.worker.id, SyncOp.op_key == op.op_id)
+        ).first()
+        if stored is not None:
+            known[op.op_id] = stored.result_json
+            return _ok(op, stored.result_json, replayed=True)
+        return SyncOpResult(op_id=op.op_id, ok=False, status=409, error="Conflicts with existing data")
+    except DBAPIError as e:
+        if _transient(e):
+            _retry_batch(db, e)
+        rollups.discard(db, mark)
+        return SyncOpResult(op_id=op.op_id, ok=False, status=400, error="Invalid data")
+    except ValueError as e:  # a payload value the write path couldn't use; fails this op, not the batch
+        rollups.discard(db, mark)
+        return SyncOpResult(op_id=op.op_id, ok=False, status=422, error=str(e))
+    known[op.op_id] = data
+    return _ok(op, data)
+
+def _apply_group(db: Session, pr, ops: list[SyncOpIn], known: dict) -> list[SyncOpResult] | None:
+    # All-or-nothing for the run; None tells the caller to fall back to per-item savepoints.
+    mark = rollups.mark(db)
+    try:
+        prepared = [_prepare(op, pr, known) for op in ops]
+        with db.begin_nested():
+            renders = [apply(db, pr, body) for apply, body in prepared]
+            db.flush()
+            datas = [_dump(r()) for r in renders]
+            db.add_all([
+                SyncOp(worker_id=pr.worker.id, op_key=op.op_id, op_type=op.type, result_json=data)
+                for op, data in zip(ops, datas)
+            ])
+    except DBAPIError as e:
+        if _transient(e):
+            _retry_batch(db, e)
+        rollups.discard(db, mark)
+        return None
+    except (HTTPException, ValueError):
+        rollups.discard(db, mark)
+        return None
+    for op, data in zip(ops, datas):
+        known[op.op_id] = data
+    return [_ok(op, data) for op, data in zip(ops, datas)]
+
+def _apply_ops(db: Session, pr, ops: list[SyncOpIn], known: dict, results: list[SyncOpResult]):
+    i = 0
+    while i < len(ops):
+        op = ops[i]
+        if op.op_id in known:
+            results.append(_ok(op, known[op.op_id], replayed=True))
+            i += 1
+            continue
+
+        spec = OPS.get(op.type)
+        if spec and spec[3]:
+            j, seen = i, set()
+            while j < len(ops) and ops[j].type == op.type and ops[j].op_id not in known and ops[j].op_id not in seen:
+                seen.add(ops[j].op_id)
+                j += 1
+            if j - i > 1:
+                grouped = _apply_group(db, pr, ops[i:j], known)
+                if grouped is None:
+                    grouped = [_apply_one(db, pr, o, known) for o in ops[i:j]]
+                results.extend(grouped)
+                i = j
+                continue
+
+        results.append(_apply_one(db, pr, op, known))
+        i += 1
+
+@router.post("/sync/batch", response_model=SyncBatchOut)
+def sync_batch(body: SyncBatchIn, db: Session = Depends(get_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    ops = body.ops
+
+    # One lookup for every key this batch mentions: its own op ids (retried uploads)
+    # and the ops it references (possibly applied by an earlier upload).
+    keys = {o.op_id for o in ops}
+    keys |= {v for o in ops for k, v in o.payload.items() if k.endswith("_ref") and isinstance(v, str)}
+    known = {
+        s.op_key: s.result_json or {}
+        for s in db.query(SyncOp).filter(SyncOp.worker_id == pr.worker.id, SyncOp.op_key.in_(keys))
+    }
+
+    results: list[SyncOpResult] = []
+    with rollups.deferred(db):
+        _apply_ops(db, pr, ops, known, results)
+        try:
+            rollups.apply_deferred(db)  # one upsert, rows in (village, day) order
+        except DBAPIError as e:
+            if _transient(e):
+                _retry_batch(db, e)
+            raise
+    db.commit()
+    if any(op.type == "camp:create" and r.ok and not r.replayed for op, r in zip(ops, results)):
+        nearby.invalidate()  # after the commit, so the reload sees the new camps
+    return SyncBatchOut(results=results)
@@ -1,46 +1,62 @@
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..models import Task
 from ..schemas import TaskIn, TaskOut, ReminderIn
 from ..models import ReminderLog
 from ..security import require_perm, get_principal
+from ..audit import audit_read
+from .. import priority
 
 router = APIRouter(prefix="/api", tags=["tasks"])
 
-@router.post("/tasks", response_model=TaskOut, dependencies=[Depends(require_perm("tasks:create"))])
-def create_task(body: TaskIn, db: Session = Depends(get_db), pr=Depends(get_principal)):
-    if not pr.worker:
-        raise HTTPException(403, "Worker required")
-    t = Task(
+# Shared with routers/aio/tasks.py.
+
+def new_task(body: TaskIn, worker_id: int) -> Task:
+    return Task(
         person_id=body.person_id,
         encounter_id=body.encounter_id,
         type=body.type,
         status="OPEN",
         due_date=body.due_date,
         notes=body.notes,
-        created_by_worker_id=pr.worker.id,
+        created_by_worker_id=worker_id,
     )
+
+def tasks_stmt(status: str):
+    return select(Task).where(Task.status == status).order_by(Task.created_at.desc()).limit(200)
+
+def task_out(r: Task) -> TaskOut:
+    return TaskOut(
+        id=r.id, person_id=r.person_id, encounter_id=r.encounter_id, type=r.type,
+        due_date=r.due_date, notes=r.notes, status=r.status
+    )
+
+def mark_closed(t: Task, pr):
+    t.status = "CLOSED"
+    t.closed_by_worker_id = pr.worker.id if pr.worker else None
+    t.closed_at = datetime.now(timezone.utc)
+
+@router.post("/tasks", response_model=TaskOut, dependencies=[Depends(require_perm("tasks:create"))])
+def create_task(body: TaskIn, db: Session = Depends(get_db), pr=Depends(get_principal)):
+    if not pr.worker:
+        raise HTTPException(403, "Worker required")
+    t = new_task(body, pr.worker.id)
     db.add(t); db.commit(); db.refresh(t)
     return TaskOut(**body.model_dump(), id=t.id, status=t.status)
 
-@router.get("/tasks", response_model=list[TaskOut], dependencies=[Depends(require_perm("queue:view"))])
+@router.get("/tasks", response_model=list[TaskOut], dependencies=[Depends(require_perm("queue:view")), Depends(audit_read("task"))])
 def list_tasks(status: str = "OPEN", db: Session = Depends(get_db)):
-    rows = db.query(Task).filter(Task.status == status).order_by(Task.created_at.desc()).limit(200).all()
-    return [TaskOut(
-        id=r.id, person_id=r.person_id, encounter_id=r.encounter_id, type=r.type,
-        due_date=r.due_date, notes=r.notes, status=r.status
-    ) for r in rows]
+    return [task_out(r) for r in db.scalars(tasks_stmt(status))]
 
 @router.post("/tasks/{task_id}/close", dependencies=[Depends(require_perm("tasks:close"))])
 def close_task(task_id: int, db: Session = Depends(get_db), pr=Depends(get_principal)):
     t = db.get(Task, task_id)
     if not t:
         raise HTTPException(404, "Not found")
-    t.status = "CLOSED"
-    t.closed_by_worker_id = pr.worker.id if pr.worker else None
-    t.closed_at = datetime.now(timezone.utc)
+    mark_closed(t, pr)
     db.commit()
     return {"ok": True}
 
@@ -49,5 +65,7 @@ def create_reminder(body: ReminderIn, db: Session = Depends(get_db), pr=Depends(
     if not pr.worker:
         raise HTTPException(403, "Worker required")
     r = ReminderLog(person_id=body.person_id, worker_id=pr.worker.id, outcome=body.outcome, notes=body.notes)
-    db.add(r); db.commit()
+    db.add(r); db.flush()
+    db.execute(priority.refresh_person(body.person_id))
+    db.commit()
     return {"ok": True}
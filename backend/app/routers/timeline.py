@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..db import get_db
+from ..models import Person, PersonLatest, PersonHistory
+from ..schemas import PersonTimelineOut, PersonLatestOut, TimelineSeries
+from ..security import get_principal, Principal
+from ..audit import audit_read
+from ..rbac import has_perm
+from .. import timeline
+
+router = APIRouter(prefix="/api", tags=["timeline"])
+
+@router.get("/people/{person_id}/timeline", response_model=PersonTimelineOut, dependencies=[Depends(audit_read("person"))])
+def person_timeline(person_id: int, since: datetime | None = None, db: Session = Depends(get_db), pr: Principal = Depends(get_principal)):
+    # staff with timeline:view see anyone; a patient only themselves
+    if pr.person is not None:
+        allowed = pr.person.id == person_id and has_perm(pr.role, "patient:view_self")
+    else:
+        allowed = has_perm(pr.role, "timeline:view")
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    row = db.execute(
+        select(PersonHistory, PersonLatest)
+        .outerjoin(PersonLatest, PersonLatest.person_id == PersonHistory.person_id)
+        .where(PersonHistory.person_id == person_id)
+    ).first()
+    if row is None:
+        if db.get(Person, person_id) is None:
+            raise HTTPException(status_code=404, detail="Person not found")
+        return PersonTimelineOut(person_id=person_id, series=TimelineSeries(**{k: [] for k in timeline.SERIES}))
+
+    history, latest = row
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return PersonTimelineOut(
+        person_id=person_id,
+        latest=PersonLatestOut(
+            encounter_id=latest.encounter_id, screened_at=latest.screened_at, rag=latest.rag,
+            overall_score=latest.overall_score, sbp_avg=latest.sbp_avg, dbp_avg=latest.dbp_avg,
+            glucose_value=latest.glucose_value, bmi=latest.bmi, spo2=latest.spo2,
+        ) if latest else None,
+        series=TimelineSeries(**timeline.points(history, since)),
+    )
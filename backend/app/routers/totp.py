@@ -1,25 +1,18 @@
 import base64, secrets
 from datetime import datetime, timedelta, timezone
 import pyotp
-from cryptography.fernet import Fernet
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from ..db import get_db
 from ..config import settings
 from ..models import Person, TotpSecret, VerificationToken, Encounter
-from ..schemas import TotpInitOut, VerifyTotpIn, VerifyTotpOut
+from ..schemas import TotpInitOut, VerifyTotpIn, VerifyTotpOut, VerifyTotpBulkIn, VerifyTotpBulkOut
 from ..security import require_perm
 from ..rbac import Role
+from ..otp import decrypt_secret, encrypt_secret, verify_offline, locked, record_failure, record_success
 
 router = APIRouter(prefix="/api", tags=["totp"])
-fernet = Fernet(settings.FERNET_KEY.encode() if isinstance(settings.FERNET_KEY, str) else settings.FERNET_KEY)
-
-def _decrypt_secret(ts: TotpSecret) -> str:
-    return fernet.decrypt(ts.secret_encrypted).decode()
-
-def _encrypt_secret(secret: str) -> bytes:
-    return fernet.encrypt(secret.encode())
 
 @router.post("/people/{person_id}/totp/init", response_model=TotpInitOut, dependencies=[Depends(require_perm("admin:manage"))])
 def init_totp(person_id: int, db: Session = Depends(get_db)):
@@ -30,11 +23,11 @@ def init_totp(person_id: int, db: Session = Depends(get_db)):
     ts = db.get(TotpSecret, person_id)
     if not ts:
         secret = pyotp.random_base32()
-        ts = TotpSecret(person_id=person_id, secret_encrypted=_encrypt_secret(secret), provisioning_done=True)
+        ts = TotpSecret(person_id=person_id, secret_encrypted=encrypt_secret(secret), provisioning_done=True)
         db.add(ts)
         db.commit()
     else:
-        secret = _decrypt_secret(ts)
+        secret = decrypt_secret(ts)
         ts.provisioning_done = True
         db.commit()
 
@@ -60,20 +53,26 @@ def verify_totp(body: VerifyTotpIn, db: Session = Depends(get_db)):
     if not ts:
         raise HTTPException(400, "TOTP not provisioned")
 
-    secret = _decrypt_secret(ts)
+    now = datetime.now(timezone.utc)
+    if locked(ts, now):
+        raise HTTPException(429, "Too many failed attempts")
+    secret = decrypt_secret(ts)
     totp = pyotp.TOTP(secret, interval=30)
 
     # ±1 timestep drift
-    now = datetime.now(timezone.utc)
     timestep = int(now.timestamp()) // 30
     ok = totp.verify(body.code, valid_window=1)
     if not ok:
+        record_failure(ts, now)
+        db.commit()
         raise HTTPException(400, "Invalid code")
 
     # anti-replay via timestep
     if timestep <= (ts.last_verified_timestep or 0):
         raise HTTPException(409, "Replay detected")
     ts.last_verified_timestep = timestep
+    record_success(ts)
+    enc.totp_timestep = timestep  # offline codes can't reuse it (app/otp.py)
     db.add(ts)
 
     token = secrets.token_urlsafe(32)
@@ -83,3 +82,16 @@ def verify_totp(body: VerifyTotpIn, db: Session = Depends(get_db)):
     db.commit()
 
     return VerifyTotpOut(verification_token=token, expires_at=expires_at)
+
+@router.post("/verify-totp/bulk", response_model=VerifyTotpBulkOut, dependencies=[Depends(require_perm("encounter:submit"))])
+def verify_totp_bulk(body: VerifyTotpBulkIn, db: Session = Depends(get_db)):
+    """Codes captured offline, uploaded after sync: verified encounters become VERIFIED.
+
+    Per-item results; 404 means the encounter hasn't been synced yet and is worth retrying.
+    """
+    for it in body.items:
+        if (it.encounter_id is None) == (it.client_uuid is None):
+            raise HTTPException(422, "Each item needs exactly one of encounter_id, client_uuid")
+    results = verify_offline(db, body.items)
+    db.commit()
+    return VerifyTotpBulkOut(results=results)
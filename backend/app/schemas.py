@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Any, List, Dict
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Any, List, Dict, Literal
 from datetime import date, datetime
+from uuid import UUID
 
 class LoginIn(BaseModel):
     username: str
@@ -45,6 +46,39 @@ class PersonOut(PersonIn):
     id: int
     updated_at: datetime
 
+class PersonSearchOut(PersonOut):
+    score: float
+
+# Census import rows (app/census.py): external keys instead of ids. People name their
+# household by key, or by id for households that already exist.
+class HouseholdImportIn(HouseholdIn):
+    key: str = Field(min_length=1, max_length=64)
+
+class PersonImportIn(PersonIn):
+    household_id: Optional[int] = None
+    household_key: Optional[str] = Field(None, min_length=1, max_length=64)
+    key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+    @model_validator(mode="after")
+    def _household(self):
+        if self.household_id is None and self.household_key is None:
+            raise ValueError("household_key or household_id is required")
+        return self
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row (CSV header not counted)
+    error: str
+
+class ImportReport(BaseModel):
+    kind: str
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
 class CampIn(BaseModel):
     village_id: int
     name: str
@@ -63,6 +97,49 @@ class CampOut(CampIn):
     id: int
     updated_at: datetime
 
+class NearbyCampOut(CampOut):
+    distance_km: float
+
+class NearbyPoint(BaseModel):
+    key: int | str  # the caller's id for this point, e.g. a household id
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+
+class NearbyBatchIn(BaseModel):
+    points: List[NearbyPoint] = Field(max_length=2000)
+    radius_km: float = Field(25, gt=0, le=200)
+    from_date: Optional[date] = None
+    limit: int = Field(3, ge=1, le=20)  # per point
+    order: Literal["distance", "date"] = "distance"
+
+class NearbyHit(BaseModel):
+    camp_id: int
+    distance_km: float
+
+class NearbyResult(BaseModel):
+    key: int | str
+    camps: List[NearbyHit]
+
+class NearbyBatchOut(BaseModel):
+    camps: List[CampOut]  # each camp once; results refer to them by id
+    results: List[NearbyResult]
+
+# Delta-sync pages: keep next_cursor and send it back as ?cursor= to continue (or to resume later).
+class HouseholdPage(BaseModel):
+    items: List[HouseholdOut]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+class PersonPage(BaseModel):
+    items: List[PersonOut]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+class CampPage(BaseModel):
+    items: List[CampOut]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
 class WorkerCreateIn(BaseModel):
     username: str
     password: str
@@ -71,6 +148,14 @@ class WorkerCreateIn(BaseModel):
     phone: str | None = None
     assigned_villages: list[int] | None = None
 
+class WorkerUpdateIn(BaseModel):
+    role: str | None = None
+    display_name: str | None = None
+    phone: str | None = None
+    assigned_villages: list[int] | None = None
+    is_active: bool | None = None
+    password: str | None = None
+
 class WorkerOut(BaseModel):
     id: int
     username: str
@@ -95,6 +180,28 @@ class VerifyTotpOut(BaseModel):
     verification_token: str
     expires_at: datetime
 
+class OfflineTotpIn(BaseModel):
+    # code the patient showed while the device was offline; the encounter is named by
+    # its server id, or by client_uuid when it was itself created offline
+    person_id: int
+    encounter_id: Optional[int] = None
+    client_uuid: Optional[UUID] = None
+    code: str = Field(min_length=6, max_length=6)
+    client_time: datetime  # device clock when the code was read
+
+class VerifyTotpBulkIn(BaseModel):
+    items: List[OfflineTotpIn] = Field(max_length=500)
+
+class OfflineTotpResult(BaseModel):
+    encounter_id: Optional[int] = None
+    client_uuid: Optional[UUID] = None
+    ok: bool
+    status: int
+    error: Optional[str] = None
+
+class VerifyTotpBulkOut(BaseModel):
+    results: List[OfflineTotpResult]
+
 class EncounterStartIn(BaseModel):
     person_id: int
     camp_id: Optional[int] = None
@@ -138,6 +245,22 @@ class EncounterSubmitOut(BaseModel):
     rag: str
     overall_score: Optional[int] = None
 
+class EncounterCreateIn(BaseModel):
+    client_uuid: UUID  # generated on device; retries with the same uuid are no-ops
+    person_id: int
+    camp_id: Optional[int] = None
+    client_created_at: Optional[datetime] = None
+    vitals: VitalsIn
+    tests: TestsIn
+    rules_version: str
+    derived: Dict[str, Any]
+    client_submitted_at: Optional[datetime] = None
+
+class EncounterCreateOut(EncounterSubmitOut):
+    encounter_id: int
+    client_uuid: UUID
+    created: bool
+
 class QueueItem(BaseModel):
     encounter_id: int
     person_id: int
@@ -146,6 +269,57 @@ class QueueItem(BaseModel):
     status: str
     submitted_at: Optional[datetime] = None
 
+class PersonLatestOut(BaseModel):
+    encounter_id: int
+    screened_at: datetime
+    rag: str
+    overall_score: Optional[int] = None
+    sbp_avg: Optional[int] = None
+    dbp_avg: Optional[int] = None
+    glucose_value: Optional[int] = None
+    bmi: Optional[float] = None
+    spo2: Optional[int] = None
+
+class TimelineSeries(BaseModel):
+    # column-packed, oldest first: index i of every list is one screening
+    t: List[datetime]
+    encounter_id: List[int]
+    sbp_avg: List[Optional[int]]
+    dbp_avg: List[Optional[int]]
+    glucose_value: List[Optional[int]]
+    bmi: List[Optional[float]]
+    spo2: List[Optional[int]]
+    rag: List[Optional[str]]
+    overall_score: List[Optional[int]]
+
+class PersonTimelineOut(BaseModel):
+    person_id: int
+    latest: Optional[PersonLatestOut] = None
+    series: TimelineSeries
+
+class PriorityItem(BaseModel):
+    person_id: int
+    full_name: str
+    household_id: int
+    hamlet: Optional[str] = None
+    rag: Optional[str] = None
+    overall_score: Optional[int] = None
+    followup_date: Optional[date] = None
+    days_overdue: int
+    missed_reminders: int
+    household_flagged: int
+    priority: int
+
+class PriorityOut(BaseModel):
+    village_id: int
+    hamlet: Optional[str] = None
+    items: List[PriorityItem]
+
+class QueuePage(BaseModel):
+    items: List[QueueItem]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
 class TaskIn(BaseModel):
     person_id: int
     encounter_id: Optional[int] = None
@@ -161,3 +335,97 @@ class ReminderIn(BaseModel):
     person_id: int
     outcome: str
     notes: Optional[str] = None
+
+class SyncOpIn(BaseModel):
+    op_id: str = Field(min_length=1, max_length=64)  # idempotency key, unique per worker
+    type: str
+    payload: Dict[str, Any]
+
+class SyncBatchIn(BaseModel):
+    ops: List[SyncOpIn] = Field(max_length=500)
+
+class SyncOpResult(BaseModel):
+    op_id: str
+    ok: bool
+    status: int
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    replayed: bool = False
+
+class SyncBatchOut(BaseModel):
+    results: List[SyncOpResult]
+
+class EncounterSubmitOpIn(BaseModel):
+    encounter_id: int
+    body: EncounterSubmitIn
+
+class OverdueVillage(BaseModel):
+    village_id: int
+    overdue: int
+    red: int
+    amber: int
+
+class OverdueSummary(BaseModel):
+    as_of: date
+    total: int
+    villages: List[OverdueVillage]
+
+class OverdueItem(BaseModel):
+    person_id: int
+    person_name: str
+    village_id: int
+    encounter_id: int
+    rag: str
+    followup_date: date
+    days_overdue: int
+
+class OverduePage(BaseModel):
+    items: List[OverdueItem]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+class RollupCounts(BaseModel):
+    people_registered: int
+    screened: int
+    verified: int
+    red: int
+    amber: int
+    green: int
+
+class RollupVillage(RollupCounts):
+    village_id: int
+
+class RollupDay(RollupCounts):
+    day: date
+
+class CoverageOut(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    total_people: int  # registered in the range (all time without one)
+    screened: int
+    villages: List[RollupVillage]
+    days: List[RollupDay]
+
+class VerificationRatesOut(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    total_submitted: int
+    verified: int
+    verified_rate: float
+    villages: List[RollupVillage]
+    days: List[RollupDay]
+
+class JobStatsOut(BaseModel):
+    kind: str
+    queued: int
+    running: int
+    done: int
+    failed: int
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    max_ms: Optional[int] = None
+    oldest_due_at: Optional[datetime] = None  # queue lag: the longest-waiting due job
+
+class JobEnqueueOut(BaseModel):
+    kind: str
+    queued: bool
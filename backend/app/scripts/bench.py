@@ -0,0 +1,358 @@
+"""Endpoint benchmark: throughput, latency percentiles and DB queries per request.
+
+Boots the API (one uvicorn worker, in a child process) against DATABASE_URL, seeds a
+benchmark population there if it is missing, then drives each scenario in turn with
+--concurrency closed-loop clients for --duration seconds:
+
+    python -m app.scripts.bench [--async] [--concurrency 32] [--duration 20] \\
+        [--scenario sync --scenario submit ...] [--json bench.json] [--compare base.json]
+
+Scenarios: login, sync (people delta sync: pages through a village, then polls from
+its cursor), submit (offline-style POST /api/encounters), queue (clinician RED/AMBER
+pages) and camps (conditional GET with the device's last ETag).
+
+Latency is measured on a server running without the query profiler. Queries per request
+come from a second, profiled server (QUERY_PROFILE=1, app/querylog.py) that the same
+scenario drives with one client for --query-samples requests, so the profiler's per-statement
+hooks never show up in the timings.
+
+Use a scratch database: seeding generates bench-* villages (see gen_population) with
+two years of camps and encounters, and adds bench_* workers. With --url an already-running server
+is driven instead; its responses carry query counts only if it runs with QUERY_PROFILE=1
+(`python -m app.scripts.bench --serve --profile --port N`), and then its latencies include
+the profiler's overhead; the report marks such runs "profiled".
+
+The JSON report holds the commit, settings and per-scenario numbers; --compare prints
+the change in req/s and p95 against an earlier report.
+"""
+import argparse, asyncio, json, os, random, statistics, subprocess, sys, time, uuid
+from collections import Counter
+from datetime import datetime, timezone
+import httpx
+
+PASSWORD = "bench"
+ROLES = {"ENUMERATOR": "bench_enum", "SCREENER": "bench_screen", "CLINICIAN": "bench_clin"}
+QUERY_HEADER = "x-db-queries"
+
+# ---- server side ------------------------------------------------------------------------
+
+def serve(port: int, profile: bool):
+    # app.querylog adds X-DB-Queries (statements run before the response started)
+    os.environ["QUERY_PROFILE"] = "1" if profile else "0"
+    import uvicorn
+    from app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def _boot(port: int, db_async: bool, profile: bool = False):
+    env = {**os.environ, "DB_ASYNC": "1" if db_async else "0"}
+    cmd = [sys.executable, "-m", "app.scripts.bench", "--serve", "--port", str(port)]
+    proc = subprocess.Popen(cmd + (["--profile"] if profile else []), env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            httpx.get(url + "/api/me", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise SystemExit("bench server did not start")
+            time.sleep(0.2)
+
+# ---- population -------------------------------------------------------------------------
+
+def seed(villages: int, households: int, camps: int, attendance: float, rng_seed: int) -> dict:
+    """Generate the bench population (app.scripts.gen_population) unless it is already there."""
+    from sqlalchemy import select, func
+    from app.db import SessionLocal
+    from app.models import Village, Person, Encounter
+    from app.scripts.gen_population import generate
+
+    with SessionLocal() as db:
+        have = db.scalars(select(Village.id).where(Village.name.like("bench-%")).order_by(Village.id)).all()
+        screener = _bench_workers(db)["SCREENER"]
+        db.commit()
+    if len(have) < villages:
+        have = [*have, *generate(
+            villages - len(have), households=households, camps=camps, years=2, attendance=attendance,
+            seed=rng_seed, jobs=os.cpu_count() or 1, prefix="bench", first_index=len(have), worker_id=screener,
+        )]
+    with SessionLocal() as db:
+        workers = _bench_workers(db, have)
+        db.commit()
+        rows = db.execute(select(Person.village_id, Person.id).where(Person.village_id.in_(have))).all()
+        people = {}
+        for v, p in rows:
+            people.setdefault(v, []).append(p)
+        encounters = db.scalar(
+            select(func.count(Encounter.id)).join(Person, Person.id == Encounter.person_id).where(Person.village_id.in_(have))
+        )
+    return {"villages": have, "people": people, "workers": workers, "encounters": encounters}
+
+def _bench_workers(db, villages: list[int] | None = None) -> dict:
+    from sqlalchemy import select
+    from app.models import Worker
+    from app.security import hash_password
+    out = {}
+    for role, username in ROLES.items():
+        w = db.scalar(select(Worker).where(Worker.username == username))
+        if w is None:
+            w = Worker(username=username, password_hash=hash_password(PASSWORD), role=role, display_name=username, is_active=True)
+            db.add(w)
+        if villages is not None:
+            w.assigned_villages_json = list(villages)
+        db.flush()
+        out[role] = w.id
+    return out
+
+# ---- scenarios --------------------------------------------------------------------------
+
+class Device:
+    """Per-client state: what a phone would remember between requests."""
+
+    def __init__(self, pop: dict, rng: random.Random):
+        self.pop, self.rng = pop, rng
+        self.village = rng.choice(pop["villages"])
+        self.cursor = None
+        self.etag = None
+        self.queue_cursor = None
+
+def _encounter_body(dev: Device) -> dict:
+    from app.triage import compute_bp_avg, compute_bmi, current_rules
+    rng = dev.rng
+    sbp, dbp = rng.randint(100, 190), rng.randint(60, 115)
+    vitals = {
+        "sbp1": sbp, "dbp1": dbp, "sbp2": sbp + rng.randint(-6, 6), "dbp2": dbp + rng.randint(-4, 4),
+        "hr": rng.randint(55, 110), "spo2": rng.randint(90, 100), "temp": round(rng.uniform(36.1, 38.2), 1),
+        "weight": round(rng.uniform(38, 95), 1), "height": round(rng.uniform(1.45, 1.85), 2), "waist": rng.randint(65, 110),
+    }
+    tests = {"glucose_type": "RANDOM", "glucose_value": rng.randint(80, 320), "hb": round(rng.uniform(8, 15), 1)}
+    # derived the way the PWA does it offline, so the server's recheck agrees
+    sbp_avg, dbp_avg = compute_bp_avg(vitals["sbp1"], vitals["dbp1"], vitals["sbp2"], vitals["dbp2"])
+    ctx = {**vitals, **tests, "sbp_avg": sbp_avg, "dbp_avg": dbp_avg, "bmi": compute_bmi(vitals["weight"], vitals["height"]),
+           "overdue_days": 0, "missed_followups": 0}
+    rules = current_rules()
+    now = datetime.now(timezone.utc)
+    derived = rules.evaluate(ctx, now.date())
+    derived["next_due_date"] = derived["next_due_date"].isoformat()
+    return {
+        "client_uuid": str(uuid.uuid4()), "person_id": rng.choice(dev.pop["people"][dev.village]),
+        "client_created_at": now.isoformat(), "client_submitted_at": now.isoformat(),
+        "vitals": vitals, "tests": tests, "rules_version": rules.version, "derived": derived,
+    }
+
+async def _login(c: httpx.AsyncClient, dev: Device):
+    return await c.post("/api/login", json={"username": ROLES["SCREENER"], "password": PASSWORD})
+
+async def _sync(c: httpx.AsyncClient, dev: Device):
+    params = {"village_id": dev.village, "limit": 500}
+    if dev.cursor:
+        params["cursor"] = dev.cursor
+    r = await c.get("/api/people", params=params)
+    if r.status_code == 200:
+        dev.cursor = r.json()["next_cursor"]
+    return r
+
+async def _submit(c: httpx.AsyncClient, dev: Device):
+    return await c.post("/api/encounters", json=_encounter_body(dev))
+
+async def _queue(c: httpx.AsyncClient, dev: Device):
+    params = {"rag": dev.rng.choice(["RED", "AMBER"]), "limit": 50}
+    if dev.queue_cursor and dev.rng.random() < 0.25:  # sometimes scroll on
+        params["cursor"] = dev.queue_cursor
+    r = await c.get("/api/queue", params=params)
+    if r.status_code == 200:
+        dev.queue_cursor = r.json()["next_cursor"]
+    return r
+
+async def _camps(c: httpx.AsyncClient, dev: Device):
+    r = await c.get("/api/camps", params={"village_id": dev.village}, headers={"If-None-Match": dev.etag} if dev.etag else {})
+    dev.etag = r.headers.get("etag", dev.etag)
+    return r
+
+SCENARIOS = {
+    "login": (None, _login),
+    "sync": ("ENUMERATOR", _sync),
+    "submit": ("SCREENER", _submit),
+    "queue": ("CLINICIAN", _queue),
+    "camps": ("SCREENER", _camps),
+}
+
+# ---- driver -----------------------------------------------------------------------------
+
+def _pct(xs: list, p: float) -> float:
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+def _summary(samples: list, elapsed: float) -> dict:
+    ok = sorted(s for s, status, _ in samples if 0 < status < 400)
+    queries = [q for _, status, q in samples if q is not None and 0 < status < 400]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status, _ in samples if status == 0 or status >= 400),
+        "status": dict(sorted(Counter(str(status) for _, status, _ in samples).items())),
+        "rps": round(len(ok) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ok) * 1000, 2) if ok else 0.0,
+        "p50_ms": round(_pct(ok, 0.50) * 1000, 2),
+        "p95_ms": round(_pct(ok, 0.95) * 1000, 2),
+        "p99_ms": round(_pct(ok, 0.99) * 1000, 2),
+        "max_ms": round(ok[-1] * 1000, 2) if ok else 0.0,
+        "queries_mean": round(statistics.fmean(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+async def _drive(url, fn, token, pop, concurrency, duration, warmup, rng_seed) -> dict:
+    headers = {"Accept-Encoding": "gzip"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    samples = []
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as c:
+        measure_from = time.monotonic() + warmup
+        deadline = measure_from + duration
+
+        async def client(i: int):
+            dev = Device(pop, random.Random(rng_seed * 10_000 + i))
+            while (start := time.monotonic()) < deadline:
+                t0 = time.perf_counter()
+                try:
+                    r = await fn(c, dev)
+                    status, q = r.status_code, r.headers.get(QUERY_HEADER)
+                except httpx.HTTPError:
+                    status, q = 0, None
+                if start >= measure_from:
+                    samples.append((time.perf_counter() - t0, status, int(q) if q else None))
+
+        await asyncio.gather(*[client(i) for i in range(concurrency)])
+        elapsed = time.monotonic() - measure_from
+    return _summary(samples, elapsed)
+
+async def _count_queries(url, fn, token, pop, n, rng_seed) -> dict:
+    """Queries per request from a profiled server: one client, n requests, nothing timed."""
+    headers = {"Accept-Encoding": "gzip", **({"Authorization": f"Bearer {token}"} if token else {})}
+    queries = []
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=60) as c:
+        dev = Device(pop, random.Random(rng_seed))
+        for _ in range(n):
+            r = await fn(c, dev)
+            if r.status_code < 400 and (q := r.headers.get(QUERY_HEADER)):
+                queries.append(int(q))
+    return {
+        "queries_mean": round(statistics.fmean(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+def _tokens(url: str) -> dict:
+    out = {}
+    with httpx.Client(base_url=url, timeout=30) as c:
+        for role, username in ROLES.items():
+            r = c.post("/api/login", json={"username": username, "password": PASSWORD})
+            r.raise_for_status()
+            out[role] = r.json()["access_token"]
+    return out
+
+def _commit() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def _print(report: dict):
+    m = report["meta"]
+    print(f"{m['commit'] or '?'}{' (dirty)' if m['dirty'] else ''}{' (profiled)' if m['profiled'] else ''}  async={m['db_async']}  "
+          f"{m['concurrency']} clients x {m['duration_s']}s  people={m['population']['people']}")
+    print(f"{'scenario':<10} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'q/req':>6} {'q max':>6}")
+    for name, s in report["scenarios"].items():
+        q = "-" if s["queries_mean"] is None else s["queries_mean"]
+        qmax = "-" if s["queries_max"] is None else s["queries_max"]
+        print(f"{name:<10} {s['requests']:>7} {s['errors']:>5} {s['rps']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+              f"{s['p99_ms']:>8} {s['max_ms']:>8} {q:>6} {qmax:>6}")
+
+def _compare(report: dict, base: dict):
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+    print(f"\nvs {base['meta']['commit'] or '?'}:")
+    print(f"{'scenario':<10} {'req/s':>16} {'p95 ms':>18} {'q/req':>12}")
+    for name, s in report["scenarios"].items():
+        b = base["scenarios"].get(name)
+        if not b:
+            continue
+        q = f"{b['queries_mean']}->{s['queries_mean']}" if s["queries_mean"] is not None else "-"
+        print(f"{name:<10} {s['rps']:>8} {delta(s['rps'], b['rps']):>7} {s['p95_ms']:>9} {delta(s['p95_ms'], b['p95_ms']):>8} {q:>12}")
+
+def main(args):
+    pop = seed(args.villages, args.households, args.camps, args.attendance, args.seed)
+    procs = []
+    if args.url:
+        url, query_url = args.url, None
+    else:
+        proc, url = _boot(args.port, args.db_async)
+        procs.append(proc)
+        proc, query_url = _boot(args.port + 1, args.db_async, profile=True)
+        procs.append(proc)
+    try:
+        tokens = _tokens(url)
+        scenarios = {}
+        for name in args.scenario or list(SCENARIOS):
+            role, fn = SCENARIOS[name]
+            print(f"{name}: {args.concurrency} clients, {args.warmup}s warmup + {args.duration}s", file=sys.stderr)
+            scenarios[name] = asyncio.run(_drive(
+                url, fn, tokens.get(role), pop, args.concurrency, args.duration, args.warmup, args.seed,
+            ))
+            if query_url:
+                scenarios[name].update(asyncio.run(_count_queries(
+                    query_url, fn, tokens.get(role), pop, args.query_samples, args.seed,
+                )))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(10)
+
+    report = {
+        "meta": {
+            **_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "url": url, "db_async": args.db_async if not args.url else None,
+            # timings taken with the query profiler on (only when driving a profiled --url)
+            "profiled": query_url is None and any(s["queries_mean"] is not None for s in scenarios.values()),
+            "concurrency": args.concurrency, "duration_s": args.duration, "warmup_s": args.warmup, "seed": args.seed,
+            "population": {
+                "villages": len(pop["villages"]), "people": sum(len(p) for p in pop["people"].values()),
+                "encounters": pop["encounters"],
+            },
+        },
+        "scenarios": scenarios,
+    }
+    _print(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            _compare(report, json.load(f))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--serve", action="store_true", help="run the query-counting server only (used by the benchmark itself)")
+    ap.add_argument("--profile", action="store_true", help="with --serve: count queries (QUERY_PROFILE=1)")
+    ap.add_argument("--port", type=int, default=8765, help="the profiled query-count server uses port + 1")
+    ap.add_argument("--url", help="drive this running server instead of booting one")
+    ap.add_argument("--async", dest="db_async", action="store_true", help="boot with DB_ASYNC=1")
+    ap.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable; default all")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--warmup", type=float, default=3)
+    ap.add_argument("--villages", type=int, default=20)
+    ap.add_argument("--households", type=int, default=150, help="mean per village")
+    ap.add_argument("--camps", type=int, default=12, help="per village per year")
+    ap.add_argument("--attendance", type=float, default=0.3, help="mean chance an adult attends a given camp")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--query-samples", type=int, default=50, help="requests per scenario on the query-count server")
+    ap.add_argument("--json", help="write the report to this file")
+    ap.add_argument("--compare", help="earlier --json report to diff against")
+    args = ap.parse_args()
+    if args.serve:
+        serve(args.port, args.profile)
+    else:
+        main(args)
@@ -0,0 +1,71 @@
+"""Bytes saved and latency added by response compression on the main JSON list endpoints.
+
+Fetches each path from a running server as identity, gzip and br and reports wire bytes,
+the saving against identity, median end-to-end time, and the compressor's own CPU time
+on that body at the level CompressionMiddleware would pick.
+
+    python -m app.scripts.bench_compression --username enum1 --password ... [--village 1] [--runs 20]
+"""
+import argparse, statistics, time
+import httpx
+from app.compression import choose_level, compressor
+
+DEFAULT_PATHS = [
+    "/api/people?village_id={village}&limit=500",
+    "/api/households?village_id={village}&limit=500",
+    "/api/camps?village_id={village}",
+    "/api/tasks",
+    "/api/queue?rag=RED",
+]
+ENCODINGS = ("identity", "gzip", "br")
+
+def _cpu_ms(body: bytes, path: str, encoding: str, runs: int) -> float:
+    level = choose_level(path, len(body), encoding)
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        c = compressor(encoding, level)
+        c.compress(body)
+        c.finish()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def bench(url, username, password, paths, runs):
+    with httpx.Client(base_url=url, timeout=60) as c:
+        r = c.post("/api/login", json={"username": username, "password": password})
+        r.raise_for_status()
+        c.headers["Authorization"] = "Bearer " + r.json()["access_token"]
+
+        print(f"{'path':<46} {'enc':<8} {'bytes':>9} {'saved':>7} {'p50 ms':>8} {'cpu ms':>7}")
+        for path in paths:
+            base = None
+            for enc in ENCODINGS:
+                sizes, times, status = [], [], None
+                for _ in range(runs):
+                    t0 = time.perf_counter()
+                    r = c.get(path, headers={"Accept-Encoding": enc})
+                    r.read()
+                    times.append(time.perf_counter() - t0)
+                    sizes.append(r.num_bytes_downloaded)
+                    status = r.status_code
+                if status >= 400:
+                    print(f"{path[:46]:<46} {enc:<8} HTTP {status}")
+                    break
+                size = statistics.median(sizes)
+                if enc == "identity":
+                    base, body = size, r.content
+                saved = f"{(1 - size / base) * 100:.0f}%" if base else "-"
+                compressed = enc != "identity" and r.headers.get("content-encoding") == enc
+                cpu = f"{_cpu_ms(body, path.split('?')[0], enc, runs):.2f}" if compressed else "-"
+                print(f"{path[:46]:<46} {enc:<8} {int(size):>9} {saved:>7} {statistics.median(times) * 1000:>8.1f} {cpu:>7}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--username", required=True)
+    ap.add_argument("--password", required=True)
+    ap.add_argument("--village", type=int, default=1)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--path", action="append", help="GET path to include (repeatable); {village} is substituted")
+    args = ap.parse_args()
+    bench(args.url, args.username, args.password, [p.format(village=args.village) for p in args.path or DEFAULT_PATHS], args.runs)
@@ -0,0 +1,324 @@
+"""Generate a synthetic population: villages, households, people, camps and encounter history.
+
+    python -m app.scripts.gen_population --villages 500 [--households 250] [--household-size 4.3]
+        [--camps 12] [--years 3] [--attendance 0.3] [--seed 1] [--as-of 2026-10-01] [--jobs 8]
+
+Each village is drawn column-wise with NumPy from (seed, village index) alone, so the
+same arguments give the same rows whatever --jobs is (--as-of pins the calendar as well).
+Row ids come from blocks the parent process reserves in village-index order before any
+worker starts, so they are reproducible too, given the same starting sequence values.
+Adults attend some of their village's past camps; their vitals wander around a personal
+baseline that drifts with age, and every encounter is triaged with the current rules.json
+(app.scripts.retriage.VectorRules), so the RAG mix follows from the vitals. Each village
+is written with COPY in one transaction; followup_worklist and village_daily_stats are
+rebuilt from the result at the end.
+
+Ids are reserved in blocks from the table sequences, so run it against a scratch or
+staging database that nothing else is inserting into meanwhile.
+"""
+import argparse, csv, io, json, os, time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from multiprocessing import get_context
+import numpy as np
+from sqlalchemy import select, insert, text
+from app.db import engine, SessionLocal
+from app.models import Village, Worker
+from app.phonetic import name_key
+from app.scripts.retriage import VectorRules
+from app.triage import current_rules
+
+FIRST_F = ["Sita", "Lakshmi", "Geeta", "Kavya", "Shanthi", "Asha", "Radha", "Meena", "Savitri", "Parvati",
+           "Anita", "Sunita", "Rekha", "Usha", "Pooja", "Divya", "Nandini", "Kamala", "Bhagya", "Renuka"]
+FIRST_M = ["Ravi", "Manju", "Suresh", "Anil", "Ramesh", "Mahesh", "Prakash", "Krishna", "Venkatesh", "Nagaraj",
+           "Basavaraj", "Shivappa", "Raju", "Deepak", "Ganesh", "Mohan", "Srinivas", "Harish", "Ashok", "Vijay"]
+LAST = ["Devi", "Kumar", "Gowda", "Naik", "Shetty", "Rao", "Patil", "Reddy", "Hegde", "Bhat",
+        "Kulkarni", "Poojary", "Nayak", "Achar", "Shet", "Murthy", "Hiremath", "Desai", "Joshi", "Pai"]
+HAMLETS = ["Main", "Colony", "Tanda", "Kere", "Hosur", "Temple St", "School Rd", "Market"]
+
+@dataclass(frozen=True)
+class Options:
+    households: int
+    household_size: float
+    camps: int          # per village per year
+    years: int
+    attendance: float   # mean chance an adult attends a given camp
+    seed: int
+    as_of: date
+    worker_id: int
+
+ID_TABLES = ("households", "people", "camps", "encounters")
+
+def _reserve(cur, table: str, n: int) -> int:
+    # the first of n ids taken from the table's sequence; the advisory lock keeps concurrent runs apart
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('gen_population'))")
+    cur.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", (table,))
+    first = cur.fetchone()[0]
+    cur.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", (table, first + max(n, 1) - 1))
+    cur.connection.commit()
+    return first
+
+def _id_blocks(counts: list[dict]) -> list[dict]:
+    """{table: first id} per village: one block per table, split in village-index order."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        starts = {t: _reserve(cur, t, sum(c[t] for c in counts)) for t in ID_TABLES}
+        cur.close()
+    finally:
+        raw.close()
+    out = []
+    for c in counts:
+        out.append(dict(starts))
+        for t in ID_TABLES:
+            starts[t] += c[t]
+    return out
+
+def _copy(cur, table: str, cols: tuple, rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def _ts(a: np.ndarray) -> list:
+    return np.datetime_as_string(a.astype("datetime64[s]"), unit="s", timezone="UTC").tolist()
+
+_keys: dict = {}
+_raw = None
+
+Shape = namedtuple("Shape", "today start n_hh hh_created hh_last hh_of n_p female age dob first phones p_created "
+                             "n_past past camp_dates lat0 lng0 adults a_idx c_idx submitted person")
+
+def _shape(index: int, o: Options) -> tuple[np.random.Generator, Shape]:
+    """The village's rng and everything drawn up to the row counts; cheap, so the parent can
+    size every village's id blocks before the workers redraw it in full."""
+    rng = np.random.default_rng([o.seed, index])
+    today = np.datetime64(o.as_of, "D")
+    start = today - np.timedelta64(365 * o.years, "D")
+
+    # households, registered before the history window opens
+    n_hh = max(1, int(rng.normal(o.households, o.households * 0.15)))
+    hh_created = start.astype("datetime64[s]") - rng.integers(86400, 365 * 86400, n_hh).astype("timedelta64[s]")
+    hh_last = rng.integers(0, len(LAST), n_hh)
+
+    # people
+    sizes = np.clip(rng.poisson(o.household_size, n_hh), 1, 12)
+    hh_of = np.repeat(np.arange(n_hh), sizes)
+    n_p = len(hh_of)
+    female = rng.random(n_p) < 0.5
+    age = rng.triangular(0, 8, 90, n_p)
+    dob = today - (age * 365.25).astype("timedelta64[D]")
+    first = np.where(female, np.array(FIRST_F, dtype=object)[rng.integers(0, len(FIRST_F), n_p)],
+                     np.array(FIRST_M, dtype=object)[rng.integers(0, len(FIRST_M), n_p)])
+    phones = np.where(rng.random(n_p) < 0.55, rng.integers(6_000_000_000, 9_999_999_999, n_p).astype(str), None)
+    p_created = hh_created[hh_of] + rng.integers(0, 3600, n_p).astype("timedelta64[s]")
+
+    # camps: o.camps a year across the window, plus a few upcoming
+    n_past = o.camps * o.years
+    spacing = 365 * o.years / max(n_past, 1)
+    past = start + (np.arange(n_past) * spacing + rng.uniform(0, spacing, n_past)).astype("timedelta64[D]")
+    upcoming = today + np.sort(rng.integers(1, 90, max(1, o.camps // 4))).astype("timedelta64[D]")
+    camp_dates = np.concatenate([past, upcoming])
+    lat0, lng0 = rng.uniform(12.0, 18.0), rng.uniform(74.5, 78.5)
+
+    # encounters: each adult attends each past camp with their own propensity
+    adults = np.flatnonzero(age >= 18)
+    propensity = np.clip(o.attendance * rng.gamma(2.0, 0.5, len(adults)), 0, 0.95)
+    a_idx, c_idx = np.nonzero(rng.random((len(adults), n_past)) < propensity[:, None])
+    submitted = (past[c_idx].astype("datetime64[s]") + np.timedelta64(3 * 3600 + 1800, "s")
+                 + rng.integers(0, 6 * 3600, len(c_idx)).astype("timedelta64[s]"))
+    order = np.argsort(submitted, kind="stable")
+    a_idx, c_idx, submitted = a_idx[order], c_idx[order], submitted[order]
+    person = adults[a_idx]
+    return rng, Shape(today, start, n_hh, hh_created, hh_last, hh_of, n_p, female, age, dob, first, phones, p_created,
+                      n_past, past, camp_dates, lat0, lng0, adults, a_idx, c_idx, submitted, person)
+
+def _counts(index: int, o: Options) -> dict:
+    v = _shape(index, o)[1]
+    return {"households": v.n_hh, "people": v.n_p, "camps": len(v.camp_dates), "encounters": len(v.person)}
+
+def _village(index: int, village_id: int, o: Options, first_ids: dict) -> dict:
+    global _raw
+    rng, (today, start, n_hh, hh_created, hh_last, hh_of, n_p, female, age, dob, first, phones, p_created,
+          n_past, past, camp_dates, lat0, lng0, adults, a_idx, c_idx, submitted, person) = _shape(index, o)
+    names = [f"{f} {LAST[l]}" for f, l in zip(first.tolist(), hh_last[hh_of].tolist())]
+    keys = [_keys.setdefault(n, name_key(n)) for n in names]
+    n_e = len(person)
+
+    # per-adult baselines, then per-visit noise; BP creeps up over the years
+    a_age, a_female = age[adults], female[adults]
+    sbp_b = 104 + 0.5 * np.maximum(a_age - 25, 0) + rng.normal(0, 12, len(adults))
+    dbp_b = 0.5 * sbp_b + rng.normal(10, 6, len(adults))
+    diabetic = rng.random(len(adults)) < 0.12
+    glc_b = np.exp(rng.normal(np.log(105), 0.2, len(adults))) + diabetic * rng.gamma(2.0, 45.0, len(adults))
+    bmi_b = rng.normal(23.5, 4.0, len(adults))
+    height_b = np.where(a_female, rng.normal(1.52, 0.06, len(adults)), rng.normal(1.64, 0.06, len(adults)))
+    hb_b = np.where(a_female, rng.normal(12.2, 1.2, len(adults)), rng.normal(14.0, 1.2, len(adults)))
+    years_in = (submitted.astype("datetime64[D]") - start).astype(float) / 365
+
+    sbp1 = np.rint(sbp_b[a_idx] + 1.2 * years_in + rng.normal(0, 7, n_e))
+    dbp1 = np.rint(dbp_b[a_idx] + 0.6 * years_in + rng.normal(0, 5, n_e))
+    sbp2 = np.rint(sbp1 + rng.normal(-2, 4, n_e))
+    dbp2 = np.rint(dbp1 + rng.normal(-1, 3, n_e))
+    height = np.round(height_b[a_idx], 2)
+    weight = np.round(bmi_b[a_idx] * height ** 2 + rng.normal(0, 1.2, n_e), 1)
+    fasting = rng.random(n_e) < 0.2
+    cols = {
+        "sbp_avg": np.floor((sbp1 + sbp2) / 2 + 0.5), "dbp_avg": np.floor((dbp1 + dbp2) / 2 + 0.5),
+        "hr": np.rint(rng.normal(78, 10, n_e)),
+        "spo2": np.clip(np.rint(98 - np.abs(rng.normal(0, 1.2, n_e)) - (rng.random(n_e) < 0.03) * rng.integers(3, 10, n_e)), 80, 100),
+        "temp": np.round(rng.normal(36.8, 0.3, n_e) + (rng.random(n_e) < 0.04) * rng.normal(1.6, 0.4, n_e), 1),
+        "height": height, "weight": weight, "bmi": np.round(weight / height ** 2, 2),
+        "waist": np.round(0.75 * weight + 30 + rng.normal(0, 4, n_e), 1),
+        "glucose_value": np.rint(glc_b[a_idx] * np.where(fasting, 0.85, 1.15) * rng.lognormal(0, 0.12, n_e)),
+        "hb": np.round(hb_b[a_idx] + rng.normal(0, 0.6, n_e), 1),
+        "glucose_type": np.where(fasting, "FASTING", "RANDOM").astype(object),
+        "overdue_days": np.zeros(n_e), "missed_followups": np.zeros(n_e),
+    }
+    vec = VectorRules(current_rules().spec)
+    res = vec.evaluate(cols, submitted.astype("datetime64[D]"))
+    verified = rng.random(n_e) < 0.75
+
+    if _raw is None:
+        _raw = engine.raw_connection()
+    cur = _raw.cursor()
+    try:
+        hh_id, p_id, c_id, e_id = (np.arange(first_ids[t], first_ids[t] + n, dtype=np.int64)
+                                   for t, n in zip(ID_TABLES, (n_hh, n_p, len(camp_dates), n_e)))
+
+        hh_ts = _ts(hh_created)
+        _copy(cur, "households", ("id", "village_id", "hamlet", "head_name", "phone", "created_at", "updated_at"), zip(
+            hh_id.tolist(), [village_id] * n_hh, [HAMLETS[i] for i in rng.integers(0, len(HAMLETS), n_hh).tolist()],
+            [names[i] for i in np.searchsorted(hh_of, np.arange(n_hh)).tolist()],
+            rng.integers(6_000_000_000, 9_999_999_999, n_hh).tolist(), hh_ts, hh_ts,
+        ))
+        p_ts = _ts(p_created)
+        _copy(cur, "people", ("id", "household_id", "village_id", "full_name", "name_key", "sex", "dob", "phone",
+                              "created_at", "updated_at"), zip(
+            p_id.tolist(), hh_id[hh_of].tolist(), [village_id] * n_p, names, keys,
+            np.where(female, "F", "M").tolist(), dob.astype(str).tolist(), phones.tolist(), p_ts, p_ts,
+        ))
+        c_ts = _ts(camp_dates - np.timedelta64(30, "D"))
+        _copy(cur, "camps", ("id", "village_id", "name", "date", "start_time", "end_time", "lat", "lng",
+                             "services_json", "created_at", "updated_at"), zip(
+            c_id.tolist(), [village_id] * len(camp_dates), [f"Health camp {d}" for d in camp_dates.astype(str).tolist()],
+            camp_dates.astype(str).tolist(), ["09:00"] * len(camp_dates), ["15:00"] * len(camp_dates),
+            np.round(lat0 + rng.normal(0, 0.01, len(camp_dates)), 7).tolist(),
+            np.round(lng0 + rng.normal(0, 0.01, len(camp_dates)), 7).tolist(),
+            ['["BP","GLUCOSE","HB"]'] * len(camp_dates), c_ts, c_ts,
+        ))
+        sub_ts = _ts(submitted)
+        client_ts = _ts(submitted - rng.integers(300, 1800, n_e).astype("timedelta64[s]"))
+        _copy(cur, "encounters", ("id", "person_id", "camp_id", "started_by_worker_id", "status", "verified_at",
+                                  "submitted_at", "client_created_at", "screened_at", "created_at", "updated_at"), zip(
+            e_id.tolist(), p_id[person].tolist(), c_id[c_idx].tolist(), [o.worker_id] * n_e,
+            np.where(verified, "VERIFIED", "UNVERIFIED").tolist(),
+            [t if v else None for t, v in zip(sub_ts, verified.tolist())],
+            sub_ts, client_ts, client_ts, sub_ts, sub_ts,
+        ))
+        eids = e_id.tolist()
+        _copy(cur, "vitals", ("encounter_id", "sbp1", "dbp1", "sbp2", "dbp2", "sbp_avg", "dbp_avg", "hr", "spo2",
+                              "temp", "weight", "height", "bmi", "waist", "consent"), zip(
+            eids, *(a.astype(int).tolist() for a in (sbp1, dbp1, sbp2, dbp2, cols["sbp_avg"], cols["dbp_avg"], cols["hr"], cols["spo2"])),
+            cols["temp"].tolist(), weight.tolist(), height.tolist(), cols["bmi"].tolist(), cols["waist"].tolist(), ["t"] * n_e,
+        ))
+        _copy(cur, "tests", ("encounter_id", "glucose_type", "glucose_value", "hb"), zip(
+            eids, cols["glucose_type"].tolist(), cols["glucose_value"].astype(int).tolist(), cols["hb"].tolist(),
+        ))
+        domains = list(res["domain_scores"])
+        scores = np.column_stack([res["domain_scores"][d] for d in domains]).tolist() if domains else [[]] * n_e
+        _copy(cur, "derived_results", ("encounter_id", "rag", "flags_json", "next_step", "followup_date",
+                                       "domain_scores_json", "overall_score", "rules_version"), zip(
+            eids, res["rag"].tolist(), [json.dumps(f) for f in res["flags"]], res["next_step"].tolist(),
+            res["next_due_date"].astype(str).tolist(), [json.dumps(dict(zip(domains, s))) for s in scores],
+            res["overall_score"].tolist(), [vec.version] * n_e,
+        ))
+        _raw.commit()
+    except Exception:
+        _raw.rollback()
+        raise
+    finally:
+        cur.close()
+    rag, counts = np.unique(res["rag"].astype(str), return_counts=True)
+    return {"households": n_hh, "people": n_p, "camps": len(camp_dates), "encounters": n_e,
+            **{str(r).lower(): int(c) for r, c in zip(rag, counts)}}
+
+def _screener(db) -> int:
+    w = db.scalar(select(Worker).where(Worker.username == "gen_screener"))
+    if w is None:
+        w = Worker(username="gen_screener", password_hash="!", role="SCREENER", display_name="Generated data", is_active=False)
+        db.add(w)
+        db.flush()
+    return w.id
+
+def generate(villages: int, households: int = 250, household_size: float = 4.3, camps: int = 12, years: int = 3,
+             attendance: float = 0.3, seed: int = 1, as_of: date | None = None, jobs: int = 1,
+             prefix: str = "gen", first_index: int = 0, worker_id: int | None = None) -> list[int]:
+    """Load the population and rebuild the derived tables; returns the new village ids."""
+    as_of = as_of or date.today()
+    with SessionLocal() as db:
+        o = Options(households, household_size, camps, years, attendance, seed, as_of, worker_id or _screener(db))
+        indexes = range(first_index, first_index + villages)
+        vids = db.scalars(insert(Village).returning(Village.id, sort_by_parameter_order=True), [
+            {"name": f"{prefix}-{i}", "district": "Synthetic", "state": "KA"} for i in indexes
+        ]).all()
+        db.commit()
+
+    totals, t0 = {}, time.perf_counter()
+    def progress(done: int, r: dict):
+        for k, v in r.items():
+            totals[k] = totals.get(k, 0) + v
+        elapsed = time.perf_counter() - t0
+        print(f"  {done}/{villages} villages  {totals['people']:,} people  {totals['encounters']:,} encounters  "
+              f"{totals['encounters'] / elapsed:,.0f} enc/s  elapsed {elapsed:,.1f}s", flush=True)
+
+    blocks = _id_blocks([_counts(i, o) for i in indexes])
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as pool:
+            futures = [pool.submit(_village, i, v, o, b) for i, v, b in zip(indexes, vids, blocks)]
+            for done, f in enumerate(futures, 1):
+                progress(done, f.result())
+    else:
+        for done, (i, v, b) in enumerate(zip(indexes, vids, blocks), 1):
+            progress(done, _village(i, v, o, b))
+
+    print("Rebuilding followup_worklist, village_daily_stats, person timelines and priorities", flush=True)
+    from app.maintenance import reconcile_worklist
+    from app.rollups import recompute
+    from app import timeline, priority
+    window = (date.today() - as_of).days + 365 * (years + 1) + 1
+    with SessionLocal() as db:
+        reconcile_worklist(db, {"days": window})
+        start = as_of - timedelta(days=365 * (years + 1))
+        recompute(db, start)
+        timeline.rebuild(db, datetime(start.year, start.month, start.day, tzinfo=timezone.utc))
+        db.commit()
+        for v in vids:
+            db.execute(priority.refresh_village(v))
+            db.commit()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for t in ("households", "people", "camps", "encounters", "vitals", "tests", "derived_results",
+                  "person_latest", "person_history", "person_priority"):
+            conn.execute(text(f"ANALYZE {t}"))
+    elapsed = time.perf_counter() - t0
+    print(f"Done in {elapsed:,.1f}s: " + ", ".join(f"{v:,} {k}" for k, v in totals.items()))
+    return list(vids)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--villages", type=int, required=True)
+    ap.add_argument("--households", type=int, default=250, help="mean per village")
+    ap.add_argument("--household-size", type=float, default=4.3, help="mean people per household")
+    ap.add_argument("--camps", type=int, default=12, help="camps per village per year")
+    ap.add_argument("--years", type=int, default=3, help="length of the encounter history")
+    ap.add_argument("--attendance", type=float, default=0.3, help="mean chance an adult attends a given camp")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--as-of", type=date.fromisoformat, help="last day of the history (default today)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="villages generated in parallel")
+    ap.add_argument("--prefix", default="gen", help="village names are <prefix>-<index>")
+    ap.add_argument("--first-index", type=int, default=0, help="start at this village index (to extend an earlier run)")
+    args = ap.parse_args()
+    generate(args.villages, args.households, args.household_size, args.camps, args.years, args.attendance,
+             args.seed, args.as_of, args.jobs, args.prefix, args.first_index)
@@ -0,0 +1,43 @@
+"""Import households or people from a census file (CSV with a header row, or NDJSON).
+
+Same pipeline as POST /api/import/census/{kind} (app/census.py), without the village
+restriction or the cap on reported errors. Import households first: people rows refer to
+them by household_key (or household_id). Re-running a file updates rows by key.
+
+    python -m app.scripts.import_census households households.csv
+    python -m app.scripts.import_census people people.ndjson [--errors people.errors.ndjson]
+"""
+import argparse, json, sys, time
+from pathlib import Path
+from app.db import SessionLocal
+from app import census
+
+def run(kind: str, path: str, fmt: str | None = None, errors: str | None = None) -> int:
+    fmt = fmt or ("csv" if Path(path).suffix.lower() == ".csv" else "ndjson")
+    t0 = time.perf_counter()
+
+    def progress(r):
+        print(f"  {r.rows} rows, {r.inserted} inserted, {r.updated} updated, {r.failed} failed "
+              f"({r.rows / (time.perf_counter() - t0):,.0f} rows/s)", file=sys.stderr)
+
+    with open(path, encoding="utf-8-sig", newline="") as f, SessionLocal() as db:
+        report = census.import_rows(db, kind, census.read_rows(f, fmt), max_errors=None, on_chunk=progress)
+    if errors:
+        with open(errors, "w", encoding="utf-8") as out:
+            for e in report.errors:
+                out.write(json.dumps(e.model_dump()) + "\n")
+    else:
+        for e in report.errors[:20]:
+            print(f"  row {e.row}: {e.error}", file=sys.stderr)
+    print(f"{kind}: {report.rows} rows, {report.inserted} inserted, {report.updated} updated, "
+          f"{report.unchanged} unchanged, {report.failed} failed in {time.perf_counter() - t0:.1f}s")
+    return report.failed
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("kind", choices=sorted(census.KINDS))
+    ap.add_argument("file")
+    ap.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension")
+    ap.add_argument("--errors", help="write every failed row to this NDJSON file")
+    args = ap.parse_args()
+    sys.exit(1 if run(args.kind, args.file, args.format, args.errors) else 0)
@@ -0,0 +1,103 @@
+"""Concurrent slow-client load test, for comparing the sync and async database stacks.
+
+Run the API as a single worker process, once per stack, and point this at it:
+
+    DB_ASYNC=0 uvicorn app.main:app --workers 1     # threadpool + psycopg2
+    DB_ASYNC=1 uvicorn app.main:app --workers 1     # AsyncSession + asyncpg
+
+    python -m app.scripts.loadtest --username screener1 --password ... \\
+        --clients 500 --duration 60 --think 2 [--path /api/camps?village_id=1 ...] [--json out.json]
+
+Each client holds its own keep-alive connection and sleeps --think seconds (+/- 50%)
+between requests, like a phone on a slow link polling during camp start.
+"""
+import argparse, asyncio, json, random, statistics, time
+from collections import defaultdict
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/camps?village_id={village}",
+    "/api/people?village_id={village}&limit=100",
+    "/api/households?village_id={village}&limit=100",
+    "/api/me",
+]
+
+def _pct(xs, p):
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+async def _client(client: httpx.AsyncClient, paths, deadline, think, lat, errors):
+    await asyncio.sleep(random.uniform(0, think))  # don't start in lockstep
+    i = random.randrange(len(paths))
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        (lat[path] if ok else errors[path]).append(time.perf_counter() - t0)
+        await asyncio.sleep(think * random.uniform(0.5, 1.5))
+
+async def run(url, username, password, clients, duration, think, paths, village):
+    async with httpx.AsyncClient(base_url=url, timeout=30) as c:
+        r = await c.post("/api/login", json={"username": username, "password": password})
+        r.raise_for_status()
+        token = r.json()["access_token"]
+
+    paths = [p.format(village=village) for p in paths]
+    lat, errors = defaultdict(list), defaultdict(list)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as c:
+        deadline = time.monotonic() + duration
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_client(c, paths, deadline, think, lat, errors) for _ in range(clients)])
+        elapsed = time.perf_counter() - t0
+
+    report = {"url": url, "clients": clients, "duration_s": round(elapsed, 1), "think_s": think, "paths": {}}
+    everything = sorted(x for xs in lat.values() for x in xs)
+    for path in paths:
+        xs = sorted(lat[path])
+        report["paths"][path] = {
+            "ok": len(xs), "errors": len(errors[path]),
+            "p50_ms": round(_pct(xs, 0.50) * 1000, 1), "p95_ms": round(_pct(xs, 0.95) * 1000, 1),
+            "p99_ms": round(_pct(xs, 0.99) * 1000, 1),
+        }
+    report["total"] = {
+        "ok": len(everything), "errors": sum(len(v) for v in errors.values()),
+        "rps": round(len(everything) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(everything) * 1000, 1) if everything else 0.0,
+        "p50_ms": round(_pct(everything, 0.50) * 1000, 1), "p95_ms": round(_pct(everything, 0.95) * 1000, 1),
+        "p99_ms": round(_pct(everything, 0.99) * 1000, 1),
+    }
+    return report
+
+def _print(report):
+    print(f"{report['url']}  {report['clients']} clients  {report['duration_s']}s  think {report['think_s']}s")
+    print(f"{'path':<52} {'ok':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for path, s in report["paths"].items():
+        print(f"{path[:52]:<52} {s['ok']:>7} {s['errors']:>5} {s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+    t = report["total"]
+    print(f"total: {t['ok']} ok, {t['errors']} errors, {t['rps']} req/s, "
+          f"p50 {t['p50_ms']} ms, p95 {t['p95_ms']} ms, p99 {t['p99_ms']} ms")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--username", required=True)
+    ap.add_argument("--password", required=True)
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=30)
+    ap.add_argument("--think", type=float, default=1.0, help="mean seconds between a client's requests")
+    ap.add_argument("--village", type=int, default=1)
+    ap.add_argument("--path", action="append", help="GET path to include (repeatable); {village} is substituted")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args()
+    report = asyncio.run(run(args.url, args.username, args.password, args.clients, args.duration,
+                             args.think, args.path or DEFAULT_PATHS, args.village))
+    _print(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
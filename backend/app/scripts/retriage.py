@@ -0,0 +1,264 @@
+"""Re-score historical derived_results under the current rules.json.
+
+Rows are read in keyset chunks (derived_results.id), evaluated column-wise with NumPy
+using the same semantics as app.triage, COPY'd into a temp table and applied with one
+set-based UPDATE per chunk.
+
+    python -m app.scripts.retriage [--chunk 50000] [--all] [--dry-run]
+"""
+import argparse, csv, io, json, logging, time
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.jobs import enqueue
+from app.triage import current_rules
+
+log = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = ("sbp_avg", "dbp_avg", "hr", "spo2", "temp", "bmi", "weight", "height", "waist", "glucose_value", "hb")
+
+def _round(x):
+    return np.floor(x + 0.5)
+
+class VectorRules:
+    """rules.json compiled to array operations; evaluate() takes a dict of equal-length columns."""
+
+    def __init__(self, spec: dict):
+        self.version = spec["meta"]["version"]
+        triage, scoring, self.due = spec["triage"], spec["scoring"], spec["due_engine"]
+        self.critical, self.moderate, self.default = triage["critical"], triage["moderate"], triage["default"]
+        self.rules = self.critical + self.moderate  # column k of the match matrix == rules[k]
+        self.domains = scoring["domains"]
+        self.overall_weights = scoring["overall_weights"]
+        self.red_score_cap = scoring["red_score_cap"]
+
+    @staticmethod
+    def _col(cols, field, n):
+        c = cols.get(field)
+        return c if c is not None else np.full(n, np.nan)
+
+    def _condition(self, cols, c, n):
+        a, v = self._col(cols, c["field"], n), c["value"]
+        # NaN/None never satisfy a condition, same as the scalar engine
+        if c["op"] == "==":
+            return np.asarray(a == v, dtype=bool) & np.ones(n, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            return {"<=": np.less_equal, ">=": np.greater_equal, "<": np.less, ">": np.greater}[c["op"]](a, v)
+
+    def _rule(self, cols, conditions, n):
+        acc, pending = np.ones(n, dtype=bool), "AND"
+        for c in conditions:
+            ok = self._condition(cols, c, n)
+            acc = (acc & ok) if pending == "AND" else (acc | ok)
+            pending = c.get("logic", "AND")
+        return acc
+
+    @staticmethod
+    def _bands(bands, values):
+        out = np.full(values.shape, 100.0)
+        todo = ~np.isnan(values)  # not measured stays 100
+        for b in bands:
+            m = todo.copy()
+            if b.get("min") is not None:
+                m &= values >= b["min"]
+            if b.get("max") is not None:
+                m &= values <= b["max"]
+            out[m] = b["score"]
+            todo &= ~m
+        return out
+
+    def _component(self, cols, comp, n):
+        if comp.get("bands"):
+            field = comp.get("field") or comp["bands"][0].get("field")
+            return self._bands(comp["bands"], self._col(cols, field, n))
+        if comp.get("bands_by_type"):
+            out = np.full(n, 100.0)
+            gtype, gval = self._col(cols, "glucose_type", n), self._col(cols, "glucose_value", n)
+            for t, bands in comp["bands_by_type"].items():
+                m = gtype == t
+                out[m] = self._bands(bands, gval[m])
+            return out
+        if comp.get("symptom_scores"):
+            scores = comp["symptom_scores"]
+            sev = cols.get(comp.get("field"))
+            if sev is None:
+                return np.full(n, float(scores.get("none", 100)))
+            return np.array([scores.get(s or "none", 100) for s in sev], dtype=float)
+        return np.full(n, 100.0)
+
+    def evaluate(self, cols: dict, as_of: np.ndarray) -> dict:
+        n = len(as_of)
+        match = np.column_stack([self._rule(cols, r["conditions"], n) for r in self.rules]) if self.rules else np.zeros((n, 0), bool)
+        nc = len(self.critical)
+
+        # first critical rule wins; otherwise every matching moderate rule is flagged
+        crit = match[:, :nc]
+        has_crit = crit.any(axis=1)
+        first_crit = np.argmax(crit, axis=1) if nc else np.zeros(n, int)
+        flagged = match.copy()
+        flagged[:, :nc] = False
+        flagged[has_crit, first_crit[has_crit]] = True
+        flagged[has_crit, nc:] = False
+
+        # rag/next_step come from the deciding rule: the critical hit, else the last moderate hit
+        deciding = np.full(n, -1)
+        deciding[has_crit] = first_crit[has_crit]
+        mod = flagged[:, nc:]
+        last_mod = mod.shape[1] - 1 - np.argmax(mod[:, ::-1], axis=1) if mod.shape[1] else np.zeros(n, int)
+        has_mod = ~has_crit & mod.any(axis=1)
+        deciding[has_mod] = nc + last_mod[has_mod]
+        rag_of = np.array([r["rag"] for r in self.rules] + [self.default["rag"]], dtype=object)
+        step_of = np.array([r["next_step"] for r in self.rules] + [self.default["next_step"]], dtype=object)
+        rag = rag_of[deciding]  # -1 picks the default entry
+        next_step = step_of[deciding]
+
+        domain_scores = {}
+        for name, d in self.domains.items():
+            total = sum(self._component(cols, c, n) * c["weight"] for c in d["components"])
+            weight = sum(c["weight"] for c in d["components"])
+            domain_scores[name] = _round(total / weight) if weight else np.full(n, 100.0)
+
+        wsum = sum(self.overall_weights.values())
+        overall = sum(domain_scores.get(k, np.full(n, 100.0)) * w for k, w in self.overall_weights.items())
+        overall = _round(overall / wsum) if wsum else np.full(n, 100.0)
+        overall = np.where(rag == "RED", np.minimum(overall, self.red_score_cap), overall)
+
+        # due engine (age is not captured at screening, so the under-30 base applies, as on submit)
+        interval = np.full(n, float(self.due["base_intervals_days"]["under_30"]))
+        for r, days in self.due["rag_overrides_days"].items():
+            if days is not None:
+                interval = np.where(rag == r, np.minimum(interval, days), interval)
+        for k, r in enumerate(self.rules):
+            days = self.due["flag_overrides_days"].get(r["id"])
+            if days is not None:
+                interval = np.where(flagged[:, k], np.minimum(interval, days), interval)
+        interval = np.clip(interval, self.due["min_interval_days"], self.due["max_interval_days"])
+
+        return {
+            "rag": rag, "next_step": next_step, "flags": self._flag_lists(flagged),
+            "domain_scores": {k: v.astype(int) for k, v in domain_scores.items()},
+            "overall_score": overall.astype(int),
+            "next_due_date": as_of + interval.astype("timedelta64[D]"),
+        }
+
+    def _flag_lists(self, flagged):
+        # one list per distinct flag pattern, not per row
+        if not flagged.shape[1]:
+            return [[] for _ in range(len(flagged))]
+        codes = flagged @ (1 << np.arange(flagged.shape[1], dtype=np.int64))
+        uniq, inverse = np.unique(codes, return_inverse=True)
+        ids = [r["id"] for r in self.rules]
+        lists = [[ids[k] for k in range(len(ids)) if (int(u) >> k) & 1] for u in uniq]
+        return [lists[i] for i in inverse]
+
+SELECT_CHUNK = text("""
+    SELECT d.id,
+           (COALESCE(e.submitted_at, e.created_at) AT TIME ZONE 'UTC')::date AS as_of,
+           v.sbp_avg::float8, v.dbp_avg::float8, v.hr::float8, v.spo2::float8, v.temp::float8,
+           v.bmi::float8, v.weight::float8, v.height::float8, v.waist::float8,
+           t.glucose_value::float8, t.hb::float8, t.glucose_type
+    FROM derived_results d
+    JOIN encounters e ON e.id = d.encounter_id
+    LEFT JOIN vitals v ON v.encounter_id = d.encounter_id
+    LEFT JOIN tests t ON t.encounter_id = d.encounter_id
+    WHERE d.id > :after AND (:all OR d.rules_version IS DISTINCT FROM :version)
+    ORDER BY d.id
+    LIMIT :n
+""")
+
+COUNT_STALE = text("SELECT count(*) FROM derived_results d WHERE :all OR d.rules_version IS DISTINCT FROM :version")
+
+def _columns(rows):
+    ids, as_of, *nums, gtype = zip(*rows)
+    cols = {f: np.array(c, dtype=float) for f, c in zip(NUMERIC_FIELDS, nums)}  # None -> nan
+    cols["glucose_type"] = np.array(gtype, dtype=object)
+    cols["overdue_days"] = np.zeros(len(rows))
+    cols["missed_followups"] = np.zeros(len(rows))
+    return np.array(ids), np.array(as_of, dtype="datetime64[D]"), cols
+
+def _write(raw, ids, res, version):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    domains = list(res["domain_scores"])
+    scores = np.column_stack([res["domain_scores"][d] for d in domains]).tolist() if domains else [[]] * len(ids)
+    for i, rid in enumerate(ids.tolist()):
+        w.writerow((
+            rid, res["rag"][i], json.dumps(res["flags"][i]), res["next_step"][i],
+            str(res["next_due_date"][i]), json.dumps(dict(zip(domains, scores[i]))),
+            int(res["overall_score"][i]), version,
+        ))
+    buf.seek(0)
+    cur = raw.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS retriage_buf (
+            id int, rag varchar(8), flags_json json, next_step text, followup_date date,
+            domain_scores_json json, overall_score int, rules_version varchar(32)
+        ) ON COMMIT DELETE ROWS
+    """)
+    cur.copy_expert("COPY retriage_buf FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute("""
+        UPDATE derived_results d SET
+            rag = b.rag, flags_json = b.flags_json, next_step = b.next_step,
+            followup_date = b.followup_date, domain_scores_json = b.domain_scores_json,
+            overall_score = b.overall_score, rules_version = b.rules_version
+        FROM retriage_buf b WHERE d.id = b.id
+    """)
+    # worklist rows pointing at a re-scored encounter follow its new follow-up date
+    cur.execute("""
+        UPDATE followup_worklist w SET
+            followup_date = b.followup_date, rag = b.rag,
+            rag_rank = CASE b.rag WHEN 'RED' THEN 0 WHEN 'AMBER' THEN 1 ELSE 2 END
+        FROM retriage_buf b JOIN derived_results d ON d.id = b.id
+        WHERE w.encounter_id = d.encounter_id
+    """)
+    cur.close()
+
+def run(db: Session, chunk: int = 50_000, recompute_all: bool = False, dry_run: bool = False) -> dict:
+    """Re-score on `db`, committing once per chunk; the rules.retriage job passes its own session."""
+    rules = current_rules()
+    vec = VectorRules(rules.spec)
+    params = {"all": recompute_all, "version": vec.version}
+
+    total = db.execute(COUNT_STALE, params).scalar()
+    db.commit()
+    log.info("re-triage under rules %s: %d derived results to score%s", vec.version, total, " (dry run)" if dry_run else "")
+
+    done, after, t0 = 0, 0, time.perf_counter()
+    while True:
+        rows = db.execute(SELECT_CHUNK, {**params, "after": after, "n": chunk}).all()
+        if not rows:
+            db.commit()
+            break
+        ids, as_of, cols = _columns(rows)
+        res = vec.evaluate(cols, as_of)
+        if not dry_run:
+            _write(db.connection().connection, ids, res, vec.version)
+        db.commit()
+
+        done += len(rows)
+        after = int(ids[-1])
+        elapsed = time.perf_counter() - t0
+        rate = done / elapsed if elapsed else 0.0
+        eta = (total - done) / rate if rate else 0.0
+        log.info("%d/%d rows  %.0f rows/s  elapsed %.1fs  eta %.0fs", done, total, rate, elapsed, eta)
+
+    elapsed = time.perf_counter() - t0
+    log.info("done: %d rows in %.1fs (%.0f rows/s)", done, elapsed, done / elapsed if elapsed else 0)
+    if done and not dry_run:
+        # person_history keeps each screening's RAG and score: rebuild it in the background
+        from app import maintenance  # noqa: F401  (registers timeline.reconcile)
+        enqueue(db, "timeline.reconcile", {"all": True})
+        db.commit()
+        log.info("queued timeline.reconcile to rebuild person timelines")
+    return {"rules_version": vec.version, "rows": done, "seconds": round(elapsed, 1)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunk", type=int, default=50_000)
+    ap.add_argument("--all", action="store_true", help="re-score rows already on the current version too")
+    ap.add_argument("--dry-run", action="store_true", help="evaluate without writing")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    with SessionLocal() as db:
+        run(db, args.chunk, args.all, args.dry_run)
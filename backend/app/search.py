@@ -0,0 +1,38 @@
+# People search for the registration desk.
+# Names: word similarity (pg_trgm) between the query's phonetic key and people.name_key,
+# served by the GIN index on (village_id, name_key). Phones: suffix match on the number's
+# digits, reversed, through a text_pattern_ops expression index, so "...4321" finds
+# "+91 98765-04321" without a scan.
+import re
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+from .models import Person, PHONE_DIGITS_REV
+from .phonetic import name_key
+
+# pg_trgm word_similarity cutoff; lower finds more variants, at more candidate rows
+NAME_THRESHOLD = 0.5
+MIN_PHONE_DIGITS = 3
+
+def search_people(db: Session, q: str, village_id: int | None = None, limit: int = 20) -> list[tuple[Person, float]]:
+    """Ranked (person, score) matches for a name or phone-number fragment."""
+    digits = re.sub(r"\D", "", q)
+    if len(digits) >= MIN_PHONE_DIGITS and not re.search(r"[^\W\d_]", q):  # digits, no letters
+        stmt = (
+            select(Person, literal(1.0))
+            .where(PHONE_DIGITS_REV.like(digits[::-1] + "%"))
+            .order_by(Person.id)
+        )
+    else:
+        key = name_key(q)
+        if not key:
+            return []
+        score = func.word_similarity(key, Person.name_key)
+        db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(NAME_THRESHOLD), True)))
+        stmt = (
+            select(Person, score)
+            .where(Person.name_key.op("%>")(key))
+            .order_by(score.desc(), func.similarity(Person.full_name, q).desc(), Person.id)
+        )
+    if village_id:
+        stmt = stmt.where(Person.village_id == village_id)
+    return [(p, float(s)) for p, s in db.execute(stmt.limit(limit))]
@@ -1,11 +1,15 @@
+import threading
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from .config import settings
-from .db import get_db
+from .db import SessionLocal
+from .cache import TTLCache
+from .metrics import timed
 from .models import Worker, Person
 from .rbac import Role, has_perm
 
@@ -13,10 +17,12 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2 = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 def hash_password(p: str) -> str:
-    return pwd_context.hash(p)
+    with timed("bcrypt"):
+        return pwd_context.hash(p)
 
 def verify_password(p: str, hashed: str) -> bool:
-    return pwd_context.verify(p, hashed)
+    with timed("bcrypt"):
+        return pwd_context.verify(p, hashed)
 
 def create_access_token(subject: str, role: str, worker_id: int | None, person_id: int | None):
     now = datetime.now(timezone.utc)
@@ -30,24 +36,78 @@ def decode_token(token: str):
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+# Immutable snapshots of the rows a principal resolves to, safe to share across
+# requests (ORM instances are bound to the session that loaded them).
+@dataclass(frozen=True)
+class WorkerInfo:
+    id: int
+    username: str
+    role: str
+    display_name: str | None
+    assigned_villages_json: list | None
+    is_active: bool
+
+@dataclass(frozen=True)
+class PersonInfo:
+    id: int
+    full_name: str
+    village_id: int
+
 class Principal:
-    def __init__(self, role: Role, worker: Worker | None, person: Person | None):
+    def __init__(self, role: Role, worker: WorkerInfo | None, person: PersonInfo | None):
         self.role = role
         self.worker = worker
         self.person = person
 
-def get_principal(db: Session = Depends(get_db), token: str = Depends(oauth2)) -> Principal:
+_principals = TTLCache(settings.PRINCIPAL_CACHE_TTL)
+# key -> times invalidated; a load that started before the latest invalidation isn't cached
+_generations: dict[tuple, int] = {}
+_generations_lock = threading.Lock()
+
+def invalidate_worker(worker_id: int):
+    key = ("worker", worker_id)
+    with _generations_lock:
+        _generations[key] = _generations.get(key, 0) + 1
+        _principals.pop(key)
+
+def _load(kind: str, id_: int):
+    with SessionLocal() as db:
+        if kind == "worker":
+            w = db.get(Worker, id_)
+            return w and WorkerInfo(w.id, w.username, w.role, w.display_name, w.assigned_villages_json, w.is_active)
+        p = db.get(Person, id_)
+        return p and PersonInfo(p.id, p.full_name, p.village_id)
+
+async def _resolve(kind: str, id_: int):
+    key = (kind, id_)
+    info = _principals.get(key)
+    if info is None:
+        generation = _generations.get(key, 0)
+        info = await run_in_threadpool(_load, kind, id_)
+        if info is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown principal")
+        with _generations_lock:
+            if _generations.get(key, 0) == generation:
+                _principals.set(key, info)
+    return info
+
+async def get_principal(token: str = Depends(oauth2)) -> Principal:
+    # Cache hit: JWT decode only, no session and no query.
     payload = decode_token(token)
     role = Role(payload.get("role"))
     worker_id = payload.get("worker_id")
     person_id = payload.get("person_id")
 
-    worker = db.get(Worker, worker_id) if worker_id else None
-    person = db.get(Person, person_id) if person_id else None
+    worker = await _resolve("worker", worker_id) if worker_id else None
+    person = await _resolve("person", person_id) if person_id else None
+    if worker:
+        if not worker.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account disabled")
+        role = Role(worker.role)  # a role change applies to tokens already issued
     return Principal(role, worker, person)
 
 def require_perm(perm: str):
-    def dep(p: Principal = Depends(get_principal)):
+    async def dep(p: Principal = Depends(get_principal)):
         if not has_perm(p.role, perm):
             raise HTTPException(status_code=403, detail="Forbidden")
         return p
@@ -0,0 +1,194 @@
+# Encounter write path shared by the REST handlers and the batched sync endpoint.
+# Nothing here commits: callers own the transaction (or savepoint).
+from datetime import date, datetime, timezone
+from fastapi import HTTPException
+from sqlalchemy import select, insert, literal, cast, Date, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from .models import Person, Encounter, Vitals, Tests, DerivedResult, VerificationToken, FollowupWorklist
+from .schemas import EncounterStartIn, EncounterSubmitIn, EncounterCreateIn, EncounterCreateOut, VitalsIn
+from .triage import compute_bp_avg, compute_bmi, check_submission
+from .notify import queue_notify, QUEUE_RAGS
+from . import rollups, timeline, priority
+
+def _vitals_values(vitals: VitalsIn) -> dict:
+    v = vitals.model_dump()
+    v["sbp_avg"], v["dbp_avg"] = compute_bp_avg(v["sbp1"], v["dbp1"], v["sbp2"], v["dbp2"])
+    v["bmi"] = compute_bmi(v["weight"], v["height"])
+    return v
+
+def _derived_values(body: EncounterSubmitIn | EncounterCreateIn, vitals: dict, tests: dict) -> dict:
+    # Recompute the client's (offline) rules engine result; the client copy survives only as mismatch_json
+    ctx = {**vitals, **tests, "overdue_days": 0, "missed_followups": 0}
+    as_of = (body.client_submitted_at or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    derived, mismatch = check_submission(body.rules_version, ctx, body.derived or {}, as_of)
+    # under an unknown rules_version this is the client's dict as sent
+    rag, due, score = derived.get("rag", "GREEN"), derived.get("next_due_date"), derived.get("overall_score")
+    if rag not in RAG_RANK:
+        raise HTTPException(422, "derived.rag: must be one of RED, AMBER, GREEN")
+    if isinstance(due, str):
+        try:
+            due = date.fromisoformat(due)
+        except ValueError:
+            raise HTTPException(422, "derived.next_due_date: not an ISO date")
+    elif due is not None and not isinstance(due, date):
+        raise HTTPException(422, "derived.next_due_date: not an ISO date")
+    if score is not None and (isinstance(score, bool) or not isinstance(score, int)):
+        raise HTTPException(422, "derived.overall_score: must be an integer")
+    return dict(
+        rag=rag,
+        flags_json=derived.get("flags", []),
+        next_step=derived.get("next_step"),
+        followup_date=due,
+        domain_scores_json=derived.get("domain_scores"),
+        overall_score=score,
+        rules_version=body.rules_version,
+        mismatch_json=mismatch,
+    )
+
+def screened_at(body: EncounterSubmitIn | EncounterCreateIn, client_created_at, submitted_at: datetime) -> datetime:
+    # When the screening happened, for "which result is latest": the device's submit time, else
+    # when it opened the encounter, else now. Never after the upload (device clocks drift ahead).
+    t = body.client_submitted_at or client_created_at or submitted_at
+    return min(t if t.tzinfo else t.replace(tzinfo=timezone.utc), submitted_at)
+
+def start_encounter(db: Session, worker_id: int, body: EncounterStartIn) -> Encounter:
+    enc = Encounter(
+        person_id=body.person_id,
+        camp_id=body.camp_id,
+        started_by_worker_id=worker_id,
+        status="DRAFT",
+        client_created_at=body.client_created_at,
+    )
+    db.add(enc)
+    return enc
+
+def submit_encounter(db: Session, enc: Encounter, body: EncounterSubmitIn) -> DerivedResult:
+    if enc.status != "DRAFT":
+        raise HTTPException(409, "Encounter already submitted")
+
+    # Verify token if provided (online verified path)
+    status = "UNVERIFIED"
+    if body.verification_token:
+        vt = db.query(VerificationToken).filter(
+            VerificationToken.token == body.verification_token,
+            VerificationToken.encounter_id == enc.id,
+            VerificationToken.used == False
+        ).first()
+        if not vt:
+            raise HTTPException(400, "Invalid verification token")
+        now = datetime.now(timezone.utc)
+        if vt.expires_at < now:
+            raise HTTPException(400, "Verification token expired")
+        vt.used = True
+        status = "VERIFIED"
+        enc.verified_at = now
+
+    enc.status = status
+    enc.submitted_at = datetime.now(timezone.utc)
+    enc.screened_at = screened_at(body, enc.client_created_at, enc.submitted_at)
+
+    # Store vitals/tests (compute avg/bmi server-side)
+    vitals, tests = _vitals_values(body.vitals), body.tests.model_dump()
+    v = Vitals(encounter_id=enc.id, **vitals)
+    t = Tests(encounter_id=enc.id, **tests)
+    dr = DerivedResult(encounter_id=enc.id, **_derived_values(body, vitals, tests))
+
+    db.add(v); db.add(t); db.add(dr); db.add(enc)
+    db.execute(_worklist_upsert(literal(enc.id), enc.person_id, dr.rag, dr.followup_date, enc.screened_at))
+    for stmt in timeline.record(literal(enc.id), enc.person_id, enc.screened_at, vitals, tests, dr.rag, dr.overall_score):
+        db.execute(stmt)
+    db.execute(priority.refresh_household(enc.person_id))  # reads the rows just written
+    rollups.add(db, rollups.utc_day(enc.submitted_at), person_id=enc.person_id, **rollups.submitted(dr.rag, status == "VERIFIED"))
+    if dr.rag in QUEUE_RAGS:
+        db.execute(queue_notify(enc.id, enc.person_id, dr.rag, status, enc.submitted_at))
+    return dr
+
+RAG_RANK = {"RED": 0, "AMBER": 1, "GREEN": 2}
+
+def _worklist_upsert(encounter_id, person_id: int, rag: str, followup_date, screened_at):
+    # Keep the person's worklist row on their latest screening, by when it happened
+    # (screened_at), so an older screening synced late doesn't overwrite a newer one.
+    t = FollowupWorklist.__table__
+    src = select(
+        literal(person_id),
+        select(Person.village_id).where(Person.id == person_id).scalar_subquery(),
+        encounter_id,
+        cast(literal(followup_date), Date),
+        literal(rag, String),
+        literal(RAG_RANK.get(rag, 2), Integer),
+        cast(literal(screened_at), DateTime(timezone=True)),
+    )
+    cols = ["person_id", "village_id", "encounter_id", "followup_date", "rag", "rag_rank", "screened_at"]
+    stmt = pg_insert(t).from_select(cols, src)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.c.person_id],
+        set_={c: stmt.excluded[c] for c in cols[1:]},
+        where=t.c.screened_at <= stmt.excluded.screened_at,
+    )
+
+def _insert_child(model, parent, values: dict):
+    # INSERT INTO <child> (encounter_id, ...) SELECT new_encounter.id, <typed binds> FROM new_encounter
+    t = model.__table__
+    cols = [cast(literal(v, t.c[k].type), t.c[k].type) for k, v in values.items()]
+    return insert(t).from_select(["encounter_id", *values], select(parent.c.id, *cols)).cte(f"new_{t.name}")
+
+def create_and_submit(db: Session, worker_id: int, body: EncounterCreateIn) -> EncounterCreateOut:
+    """Create a submitted encounter with its vitals, tests and derived result in one statement.
+
+    Keyed by the device-generated client_uuid: when the uuid already exists nothing is
+    written and the stored encounter is returned, so replays are safe.
+    """
+    now = datetime.now(timezone.utc)
+    screened = screened_at(body, body.client_created_at, now)
+    vitals, tests = _vitals_values(body.vitals), body.tests.model_dump()
+    derived = _derived_values(body, vitals, tests)
+    enc = (
+        pg_insert(Encounter)
+        .values(
+            client_uuid=body.client_uuid,
+            person_id=body.person_id,
+            camp_id=body.camp_id,
+            started_by_worker_id=worker_id,
+            status="UNVERIFIED",  # offline path: presence is confirmed later by a clinician
+            submitted_at=now,
+            client_created_at=body.client_created_at,
+            screened_at=screened,
+        )
+        .on_conflict_do_nothing(index_elements=[Encounter.client_uuid])
+        .returning(Encounter.id)
+        .cte("new_encounter")
+    )
+    latest, history = timeline.record(enc.c.id, body.person_id, screened, vitals, tests, derived["rag"], derived["overall_score"])
+    # Data-modifying CTEs all run; with no row from new_encounter the child inserts are no-ops.
+    stmt = select(enc.c.id).add_cte(
+        _insert_child(Vitals, enc, vitals),
+        _insert_child(Tests, enc, tests),
+        _insert_child(DerivedResult, enc, derived),
+        _worklist_upsert(enc.c.id, body.person_id, derived["rag"], derived["followup_date"], screened).cte("new_worklist"),
+        latest.cte("new_person_latest"),
+        history.cte("new_person_history"),
+    )
+    new_id = db.execute(stmt).scalar()
+    if new_id is not None:
+        # after the statement: CTEs can't see each other's writes
+        db.execute(priority.refresh_household(body.person_id))
+        rollups.add(db, rollups.utc_day(now), person_id=body.person_id, **rollups.submitted(derived["rag"], False))
+        if derived["rag"] in QUEUE_RAGS:
+            db.execute(queue_notify(new_id, body.person_id, derived["rag"], "UNVERIFIED", now))
+        return EncounterCreateOut(
+            encounter_id=new_id, client_uuid=body.client_uuid, created=True,
+            status="UNVERIFIED", rag=derived["rag"], overall_score=derived["overall_score"],
+        )
+
+    row = db.execute(
+        select(Encounter.id, Encounter.person_id, Encounter.status, DerivedResult.rag, DerivedResult.overall_score)
+        .outerjoin(DerivedResult, DerivedResult.encounter_id == Encounter.id)
+        .where(Encounter.client_uuid == body.client_uuid)
+    ).one()
+    if row.person_id != body.person_id:
+        raise HTTPException(409, "client_uuid already used for another person")
+    return EncounterCreateOut(
+        encounter_id=row.id, client_uuid=body.client_uuid, created=False,
+        status=row.status, rag=row.rag or "GREEN", overall_score=row.overall_score,
+    )
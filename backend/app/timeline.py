@@ -0,0 +1,106 @@
+# Per-person screening history behind GET /api/people/{person_id}/timeline.
+# person_latest holds the values of a person's latest submitted screening; person_history
+# holds all of them, one index-aligned array per measure, so a full history is a single
+# primary-key read instead of a join over encounters, vitals, tests and derived_results.
+# Submissions update both (record()); rebuild() re-derives them from the raw tables for
+# people screened since a date: the timeline.reconcile job, bulk loads, and after retriage.
+# Points are placed and ordered by encounters.screened_at (when the screening happened, see
+# app.submissions.screened_at), so an offline screening synced late lands on its own date.
+from datetime import datetime
+from sqlalchemy import select, literal, cast, func, text, Integer, Float, String, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert, array
+from .models import PersonLatest, PersonHistory
+from .rollups import village_of
+
+SERIES = ("t", "encounter_id", "sbp_avg", "dbp_avg", "glucose_value", "bmi", "spo2", "rag", "overall_score")
+
+def _point(encounter_id, screened_at: datetime, vitals: dict, tests: dict, rag: str, overall_score) -> dict:
+    return {
+        "t": cast(literal(screened_at), DateTime(timezone=True)),
+        "encounter_id": encounter_id,
+        "sbp_avg": cast(literal(vitals.get("sbp_avg")), Integer),
+        "dbp_avg": cast(literal(vitals.get("dbp_avg")), Integer),
+        "glucose_value": cast(literal(tests.get("glucose_value")), Integer),
+        "bmi": cast(literal(None if vitals.get("bmi") is None else float(vitals["bmi"])), Float),
+        "spo2": cast(literal(vitals.get("spo2")), Integer),
+        "rag": cast(literal(rag), String),
+        "overall_score": cast(literal(overall_score), Integer),
+    }
+
+def record(encounter_id, person_id: int, screened_at: datetime, vitals: dict, tests: dict, rag: str, overall_score):
+    """[latest upsert, history append] for one submission; encounter_id may be a CTE column."""
+    p = _point(encounter_id, screened_at, vitals, tests, rag, overall_score)
+
+    lt = PersonLatest.__table__
+    cols = {
+        "person_id": literal(person_id), "village_id": village_of(person_id),
+        "encounter_id": p["encounter_id"], "screened_at": p["t"],
+        **{k: p[k] for k in ("rag", "overall_score", "sbp_avg", "dbp_avg", "glucose_value", "bmi", "spo2")},
+    }
+    latest = pg_insert(lt).from_select(list(cols), select(*cols.values()))
+    latest = latest.on_conflict_do_update(
+        index_elements=[lt.c.person_id],
+        set_={c: latest.excluded[c] for c in list(cols)[1:]},
+        where=lt.c.screened_at <= latest.excluded.screened_at,  # a late offline upload doesn't win
+    )
+
+    ht = PersonHistory.__table__
+    history = pg_insert(ht).from_select(["person_id", *SERIES], select(literal(person_id), *[array([p[k]]) for k in SERIES]))
+    history = history.on_conflict_do_update(
+        index_elements=[ht.c.person_id],
+        set_={k: func.array_cat(ht.c[k], history.excluded[k]) for k in SERIES},
+    )
+    return [latest, history]
+
+_T = "COALESCE(e.screened_at, e.submitted_at)"
+_ORDER = f"ORDER BY {_T}, e.id"
+
+REBUILD_HISTORY = text(f"""
+    INSERT INTO person_history (person_id, {', '.join(SERIES)})
+    SELECT e.person_id,
+           array_agg({_T} {_ORDER}), array_agg(e.id {_ORDER}),
+           array_agg(v.sbp_avg {_ORDER}), array_agg(v.dbp_avg {_ORDER}), array_agg(t.glucose_value {_ORDER}),
+           array_agg(v.bmi::float8 {_ORDER}), array_agg(v.spo2 {_ORDER}),
+           array_agg(d.rag {_ORDER}), array_agg(d.overall_score {_ORDER})
+    FROM encounters e
+    LEFT JOIN vitals v ON v.encounter_id = e.id
+    LEFT JOIN tests t ON t.encounter_id = e.id
+    LEFT JOIN derived_results d ON d.encounter_id = e.id
+    WHERE e.submitted_at IS NOT NULL
+      AND e.person_id IN (SELECT person_id FROM encounters WHERE submitted_at >= :since)
+    GROUP BY e.person_id
+    ON CONFLICT (person_id) DO UPDATE SET
+        {', '.join(f'{k} = excluded.{k}' for k in SERIES)}
+""")
+
+REBUILD_LATEST = text(f"""
+    INSERT INTO person_latest (person_id, village_id, encounter_id, screened_at, rag, overall_score,
+                               sbp_avg, dbp_avg, glucose_value, bmi, spo2)
+    SELECT DISTINCT ON (e.person_id)
+           e.person_id, p.village_id, e.id, {_T}, d.rag, d.overall_score,
+           v.sbp_avg, v.dbp_avg, t.glucose_value, v.bmi, v.spo2
+    FROM encounters e
+    JOIN people p ON p.id = e.person_id
+    JOIN derived_results d ON d.encounter_id = e.id
+    LEFT JOIN vitals v ON v.encounter_id = e.id
+    LEFT JOIN tests t ON t.encounter_id = e.id
+    WHERE e.submitted_at IS NOT NULL
+      AND e.person_id IN (SELECT person_id FROM encounters WHERE submitted_at >= :since)
+    ORDER BY e.person_id, {_T} DESC, e.id DESC
+    ON CONFLICT (person_id) DO UPDATE SET
+        village_id = excluded.village_id, encounter_id = excluded.encounter_id, screened_at = excluded.screened_at,
+        rag = excluded.rag, overall_score = excluded.overall_score, sbp_avg = excluded.sbp_avg,
+        dbp_avg = excluded.dbp_avg, glucose_value = excluded.glucose_value, bmi = excluded.bmi, spo2 = excluded.spo2
+""")
+
+def rebuild(db, since: datetime) -> int:
+    """Recompute both tables, whole history, for everyone with a screening submitted since `since`."""
+    db.execute(REBUILD_LATEST, {"since": since})
+    return db.execute(REBUILD_HISTORY, {"since": since}).rowcount
+
+def points(h: PersonHistory, since: datetime | None = None) -> dict[str, list]:
+    """The history as columns, oldest first, optionally from `since` on."""
+    order = sorted(range(len(h.t)), key=lambda i: (h.t[i], h.encounter_id[i]))
+    if since is not None:
+        order = [i for i in order if h.t[i] >= since]
+    return {k: [getattr(h, k)[i] for i in order] for k in SERIES}
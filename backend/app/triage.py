@@ -1,12 +1,174 @@
-# Server keeps this minimal: trust-but-verify (range checks), and store client's derived fields.
-# You can later port the same JS engine to Python if you want server-side recompute.
+# Server-side port of frontend/js/triage.js.
+# Every rules.json version is compiled once into closures/band tables; submissions are
+# re-evaluated against it and the server result is stored, with any client disagreement
+# kept alongside for review.
+import json, logging, math, operator, os
+from datetime import date, timedelta
+from functools import lru_cache
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+_OPS = {"==": operator.eq, "<=": operator.le, ">=": operator.ge, "<": operator.lt, ">": operator.gt}
+
+def _round(x):
+    # Math.round semantics (half up), not Python's banker's rounding
+    return math.floor(x + 0.5)
 
 def compute_bp_avg(sbp1, dbp1, sbp2, dbp2):
     if sbp1 is None or dbp1 is None or sbp2 is None or dbp2 is None:
         return None, None
-    return round((sbp1 + sbp2) / 2), round((dbp1 + dbp2) / 2)
+    return _round((sbp1 + sbp2) / 2), _round((dbp1 + dbp2) / 2)
 
 def compute_bmi(weight, height):
     if not weight or not height or height <= 0:
         return None
     return round(weight / (height * height), 2)
+
+def _condition(c):
+    field, op, value = c["field"], _OPS.get(c["op"]), c["value"]
+    if op is None:
+        return lambda ctx: False
+    def check(ctx):
+        a = ctx.get(field)
+        return a is not None and op(a, value)
+    return check
+
+def _rule(conditions):
+    # Left fold; each condition's "logic" joins it to the next one (default AND)
+    checks = [(_condition(c), c.get("logic", "AND")) for c in conditions]
+    def match(ctx):
+        acc, pending = True, "AND"
+        for check, logic in checks:
+            ok = check(ctx)
+            acc = (acc and ok) if pending == "AND" else (acc or ok)
+            pending = logic
+        return acc
+    return match
+
+def _bands(bands):
+    table = [(b.get("min"), b.get("max"), b["score"]) for b in bands]
+    def score(value):
+        if value is None:  # not measured: neutral, never a penalty
+            return 100
+        for lo, hi, s in table:
+            if (lo is None or value >= lo) and (hi is None or value <= hi):
+                return s
+        return 100
+    return score
+
+def _component(comp):
+    if comp.get("bands"):
+        field, score = comp.get("field") or comp["bands"][0].get("field"), _bands(comp["bands"])
+        return lambda ctx: score(ctx.get(field))
+    if comp.get("bands_by_type"):
+        by_type = {t: _bands(b) for t, b in comp["bands_by_type"].items()}
+        def glucose(ctx):
+            t, v = ctx.get("glucose_type"), ctx.get("glucose_value")
+            return by_type[t](v) if t in by_type else 100
+        return glucose
+    if comp.get("symptom_scores"):
+        scores, field = comp["symptom_scores"], comp.get("field")
+        return lambda ctx: scores.get(ctx.get(field) or "none", 100)
+    return lambda ctx: 100
+
+class CompiledRules:
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.version = spec["meta"]["version"]
+        triage, scoring, due = spec["triage"], spec["scoring"], spec["due_engine"]
+        self.critical = [(_rule(r["conditions"]), r) for r in triage["critical"]]
+        self.moderate = [(_rule(r["conditions"]), r) for r in triage["moderate"]]
+        self.default = triage["default"]
+        self.domains = {
+            name: [(_component(c), c["weight"]) for c in d["components"]]
+            for name, d in scoring["domains"].items()
+        }
+        self.overall_weights = scoring["overall_weights"]
+        self.red_score_cap = scoring["red_score_cap"]
+        self.due = due
+
+    def evaluate(self, ctx: dict, as_of: date, age_years: int | None = None) -> dict:
+        # triage: first critical then moderate else green
+        rag, next_step, flags = self.default["rag"], self.default["next_step"], []
+        for match, r in self.critical:
+            if match(ctx):
+                rag, next_step = r["rag"], r["next_step"]
+                flags.append(r["id"])
+                break
+        if rag == "GREEN":
+            for match, r in self.moderate:
+                if match(ctx):
+                    rag, next_step = r["rag"], r["next_step"]
+                    flags.append(r["id"])
+
+        domain_scores = {}
+        for name, comps in self.domains.items():
+            total = sum(score(ctx) * w for score, w in comps)
+            weight = sum(w for _, w in comps)
+            domain_scores[name] = _round(total / weight) if weight else 100
+
+        overall = sum(domain_scores.get(d, 100) * w for d, w in self.overall_weights.items())
+        wsum = sum(self.overall_weights.values())
+        overall = _round(overall / wsum) if wsum else 100
+        if rag == "RED":
+            overall = min(overall, self.red_score_cap)
+
+        # due engine
+        base = self.due["base_intervals_days"]
+        interval = base["age_30_plus"] if age_years is not None and age_years >= 30 else base["under_30"]
+        rag_override = self.due["rag_overrides_days"].get(rag)
+        if rag_override is not None:
+            interval = min(interval, rag_override)
+        for f in flags:
+            ov = self.due["flag_overrides_days"].get(f)
+            if ov is not None:
+                interval = min(interval, ov)
+        interval = max(self.due["min_interval_days"], min(self.due["max_interval_days"], interval))
+
+        return {
+            "rag": rag, "flags": flags, "next_step": next_step,
+            "domain_scores": domain_scores, "overall_score": overall,
+            "next_due_date": as_of + timedelta(days=interval),
+        }
+
+_by_version: dict[str, CompiledRules] = {}
+
+@lru_cache(maxsize=8)
+def _compile_file(path: str, mtime: float) -> CompiledRules:
+    with open(path, encoding="utf-8") as f:
+        rules = CompiledRules(json.load(f))
+    _by_version[rules.version] = rules
+    return rules
+
+def current_rules() -> CompiledRules:
+    # Recompiled only when rules.json changes on disk; older versions stay registered.
+    return _compile_file(settings.RULES_PATH, os.stat(settings.RULES_PATH).st_mtime)
+
+def rules_for(version: str) -> CompiledRules | None:
+    current = current_rules()
+    return current if current.version == version else _by_version.get(version)
+
+_COMPARED = ("rag", "flags", "next_step", "overall_score", "domain_scores", "next_due_date")
+
+def check_submission(rules_version: str, ctx: dict, client: dict, as_of: date) -> tuple[dict, dict | None]:
+    """Recompute a submission's derived result.
+
+    Returns (result, mismatch): the server result when the client's rules_version is known
+    (otherwise the client's values, unchecked) and a {field: {client, server}} dict of the
+    fields where the client disagreed, or None.
+    """
+    rules = rules_for(rules_version)
+    if rules is None:
+        log.info("Unknown rules_version %s; storing client-derived result unchecked", rules_version)
+        return client, None
+
+    server = rules.evaluate(ctx, as_of)
+    mismatch = {}
+    for k in _COMPARED:
+        s = server[k].isoformat() if isinstance(server[k], date) else server[k]
+        if client.get(k) != s:
+            mismatch[k] = {"client": client.get(k), "server": s}
+    if mismatch:
+        log.warning("Derived result mismatch under rules %s: %s", rules_version, sorted(mismatch))
+    return server, mismatch or None
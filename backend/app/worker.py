@@ -0,0 +1,64 @@
+"""Background job worker: claims due rows from `jobs` and runs their handlers.
+
+    python -m app.worker [--concurrency 4] [--poll 1.0]
+
+Start one per node, or several: claims use FOR UPDATE SKIP LOCKED and every worker's
+scheduler enqueues each periodic slot under the same dedupe key, so nothing runs twice.
+SIGTERM/SIGINT stop claiming and let running jobs finish.
+"""
+import argparse, json, logging, os, random, signal, socket, threading, time
+from .config import settings
+from . import jobs, maintenance  # noqa: F401  (maintenance registers the built-in handlers)
+
+TICK_S = 15        # schedules, lease heartbeat and reaper
+STATS_EVERY_S = 60
+
+log = logging.getLogger("app.worker")
+
+def run(concurrency: int, poll: float):
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    stats = jobs.Stats()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                busy = jobs.run_one(worker, stats)
+            except Exception:
+                log.exception("claim failed")
+                busy = False
+            if not busy:
+                stop.wait(poll * random.uniform(0.5, 1.5))  # jitter: idle workers don't poll in lockstep
+
+    threads = [threading.Thread(target=loop, name=f"job-{i}", daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    log.info("worker %s: %d threads, kinds %s", worker, concurrency, ", ".join(sorted(jobs.HANDLERS)))
+
+    last_stats = time.monotonic()
+    while not stop.is_set():
+        try:
+            jobs.schedule_due()
+            jobs.renew_leases(worker)
+            jobs.reap_expired()
+        except Exception:
+            log.exception("scheduler tick failed")
+        if time.monotonic() - last_stats >= STATS_EVERY_S:
+            last_stats = time.monotonic()
+            for kind, s in sorted(stats.drain().items()):
+                log.info("job stats %s", json.dumps({"kind": kind, **s, "mean_ms": s["total_ms"] // s["runs"]}))
+        stop.wait(TICK_S)
+
+    log.info("stopping: waiting for running jobs")
+    for t in threads:
+        t.join()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--concurrency", type=int, default=settings.JOB_CONCURRENCY)
+    ap.add_argument("--poll", type=float, default=settings.JOB_POLL_S, help="idle seconds between claim attempts")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    run(args.concurrency, args.poll)
@@ -0,0 +1,8 @@
+# The suite runs without Postgres: point the app at a scratch SQLite file and turn the
+# query profiler on before app.config is first imported.
+import os, tempfile
+
+_scratch = tempfile.mkdtemp(prefix="rr-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/test.db"
+os.environ["QUERY_PROFILE"] = "1"
+os.environ["AUDIT_SPOOL_DIR"] = os.path.join(_scratch, "audit_spool")
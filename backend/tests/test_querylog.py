@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import querylog
+from app.config import settings
+from app.db import SessionLocal, engine
+from app.main import app
+from app.models import Worker
+from app.security import create_access_token, invalidate_worker
+
+@pytest.fixture(scope="module")
+def worker():
+    Worker.__table__.create(engine, checkfirst=True)
+    with SessionLocal() as db:
+        w = Worker(username="ql_enum", password_hash="-", role="ENUMERATOR", display_name="QL", is_active=True)
+        db.add(w)
+        db.commit()
+        return w.id
+
+def test_me_runs_no_query_once_the_principal_is_cached(worker):
+    client = TestClient(app)
+    token = create_access_token(subject="ql_enum", role="ENUMERATOR", worker_id=worker, person_id=None)
+    headers = {"Authorization": f"Bearer {token}"}
+    invalidate_worker(worker)
+
+    assert client.get("/api/me", headers=headers).status_code == 200
+    assert querylog.recent[-1].endpoint == "GET /api/me"
+    querylog.recent[-1].check(1)  # the principal load
+
+    r = client.get("/api/me", headers=headers)
+    assert r.headers[querylog.QUERY_HEADER] == "0"
+    querylog.recent[-1].check(0)
+
+    invalidate_worker(worker)
+    client.get("/api/me", headers=headers)
+    with pytest.raises(querylog.QueryBudgetExceeded):
+        querylog.recent[-1].check(0)
+
+def test_listed_zero_budget_overrides_the_default(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGETS", "GET /api/me=0, POST /api/encounters=8")
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 5)
+    assert querylog.budget_for("GET /api/me") == 0
+    assert querylog.budget_for("POST /api/encounters") == 8
+    assert querylog.budget_for("GET /api/people") == 5
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 0)
+    assert querylog.budget_for("GET /api/people") is None
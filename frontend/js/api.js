@@ -25,3 +25,32 @@ export async function safeApi(path, opts) {
   try { return { ok:true, data: await api(path, opts) }; }
   catch (e) { return { ok:false, error: String(e.message || e) }; }
 }
+
+// Server-sent events over fetch, so the bearer token can be sent (EventSource can't).
+// Calls onEvent(type, data) per event; resolves when the server closes the stream.
+export async function stream(path, onEvent, { signal } = {}) {
+  const token = getToken();
+  const h = { "Accept": "text/event-stream" };
+  if (token) h["Authorization"] = `Bearer ${token}`;
+  const res = await fetch(API_BASE + path, { headers: h, signal });
+  if (res.status === 401) { clearToken(); throw new Error("Unauthorized"); }
+  if (!res.ok) throw new Error(`${res.status}`);
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buf += value;
+    let end;
+    while ((end = buf.indexOf("\n\n")) >= 0) {
+      const block = buf.slice(0, end); buf = buf.slice(end + 2);
+      let type = "message"; const data = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) type = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (data.length) onEvent(type, JSON.parse(data.join("\n")));
+    }
+  }
+}
@@ -1,5 +1,5 @@
 const DB_NAME = "rh_db";
-const DB_VER = 1;
+const DB_VER = 2;
 
 let _dbp = null;
 
@@ -14,6 +14,7 @@ export function openDB() {
       if (!db.objectStoreNames.contains("cache_camps")) db.createObjectStore("cache_camps", { keyPath: "id" });
       if (!db.objectStoreNames.contains("cache_meta")) db.createObjectStore("cache_meta", { keyPath: "key" });
       if (!db.objectStoreNames.contains("outbox")) db.createObjectStore("outbox", { keyPath: "id", autoIncrement: true });
+      if (!db.objectStoreNames.contains("otp_captures")) db.createObjectStore("otp_captures", { keyPath: "id", autoIncrement: true });
     };
     req.onsuccess = () => resolve(req.result);
     req.onerror = () => reject(req.error);
@@ -31,6 +32,17 @@ export async function put(store, value) {
   });
 }
 
+export async function putMany(store, values) {
+  const db = await openDB();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(store, "readwrite");
+    const os = tx.objectStore(store);
+    for (const v of values) os.put(v);
+    tx.oncomplete = () => resolve(true);
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
 export async function get(store, key) {
   const db = await openDB();
   return new Promise((resolve, reject) => {
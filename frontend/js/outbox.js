@@ -1,7 +1,11 @@
 import { put, getAll, del } from "./idb.js";
 
+// op_id doubles as the server-side idempotency key and as the target of "<name>_ref"
+// fields, so a later item can point at a row created by an earlier one.
 export async function enqueue(type, payload) {
+  const op_id = crypto.randomUUID();
   await put("outbox", {
+    op_id,
     type,
     payload_json: payload,
     created_at: new Date().toISOString(),
@@ -9,12 +13,22 @@ export async function enqueue(type, payload) {
     last_error: null,
     status: "PENDING"
   });
+  return op_id;
 }
 
 export async function listOutbox() {
   return await getAll("outbox");
 }
 
+export async function updateOutbox(item) {
+  return await put("outbox", item);
+}
+
 export async function removeOutbox(id) {
   return await del("outbox", id);
 }
+
+// Patient TOTP codes read while offline; verified in bulk after the encounters sync.
+export async function captureCode(capture) {
+  await put("otp_captures", { ...capture, attempts: 0 });
+}
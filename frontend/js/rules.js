@@ -1,4 +1,4 @@
-import { get, put } from "./idb.js";
+import { get, put, putMany } from "./idb.js";
 import { safeApi } from "./api.js";
 
 export async function loadRules() {
@@ -9,14 +9,37 @@ export async function loadRules() {
   return r;
 }
 
-// Pull deltas for assigned villages when online (small pages)
+// Delta endpoints per cache store. households/people need due:view_assigned;
+// for other roles those requests fail and are simply skipped.
+const DELTAS = [
+  ["cache_households", "/api/households"],
+  ["cache_people", "/api/people"],
+  ["cache_camps", "/api/camps"],
+];
+const MAX_PAGES = 20; // per village and store in one pass; the cursor resumes next time
+
+// Pull deltas for assigned villages when online, page by page with keyset cursors
 export async function refreshCaches() {
   if (!navigator.onLine) return;
+  const me = await safeApi("/api/me");
+  if (!me.ok) return;
 
   const meta = await get("cache_meta","sync") || { key:"sync", value:{} };
-  const last = meta.value || {};
+  const cursors = meta.value || {};
 
-  // In this minimal scaffold we fetch by village in UI.
-  // You can expand: for each assigned village -> fetch updated_since and cache.
-  await put("cache_meta", { key:"sync", value:last });
+  for (const village of me.data.assigned_villages || []) {
+    for (const [store, path] of DELTAS) {
+      const key = `${store}:${village}`;
+      for (let page = 0; page < MAX_PAGES; page++) {
+        const qs = new URLSearchParams({ village_id: village });
+        if (cursors[key]) qs.set("cursor", cursors[key]);
+        const res = await safeApi(`${path}?${qs}`);
+        if (!res.ok) break;
+        await putMany(store, res.data.items);
+        if (res.data.next_cursor) cursors[key] = res.data.next_cursor;
+        await put("cache_meta", { key:"sync", value:cursors });
+        if (!res.data.has_more) break;
+      }
+    }
+  }
 }
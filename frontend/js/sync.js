@@ -1,4 +1,5 @@
-import { listOutbox, removeOutbox } from "./outbox.js";
+import { listOutbox, removeOutbox, updateOutbox } from "./outbox.js";
+import { getAll, put, del } from "./idb.js";
 import { safeApi } from "./api.js";
 import { setSyncBadge } from "./ui.js";
 import { refreshCaches } from "./rules.js";
@@ -6,37 +7,64 @@ import { refreshCaches } from "./rules.js";
 let syncing = false;
 let lastTry = 0;
 
-const handlers = {
-  "household:create": (p) => safeApi("/api/households", { method:"POST", body:p }),
-  "person:create": (p) => safeApi("/api/people", { method:"POST", body:p }),
-  "camp:create": (p) => safeApi("/api/camps", { method:"POST", body:p }),
-  "encounter:start": (p) => safeApi("/api/encounters/start", { method:"POST", body:p }),
-  "encounter:submit": (p) => safeApi(`/api/encounters/${p.encounter_id}/submit`, { method:"POST", body:p.body }),
-  "reminder:create": (p) => safeApi("/api/reminders", { method:"POST", body:p }),
-  "task:create": (p) => safeApi("/api/tasks", { method:"POST", body:p })
-};
+const BATCH_SIZE = 200;
+const OTP_MAX_ATTEMPTS = 20; // "encounter not found" is retried until its create syncs
+
+async function verifyCaptures() {
+  const captures = await getAll("otp_captures");
+  for (let i = 0; i < captures.length; i += BATCH_SIZE) {
+    const chunk = captures.slice(i, i + BATCH_SIZE);
+    const items = chunk.map(({ person_id, encounter_id, client_uuid, code, client_time }) =>
+      ({ person_id, encounter_id, client_uuid, code, client_time }));
+    const res = await safeApi("/api/verify-totp/bulk", { method:"POST", body:{ items } });
+    if (!res.ok) { console.warn("otp verify error", res.error); return; }
+    for (const [k, r] of res.data.results.entries()) {
+      const c = chunk[k];
+      if (r.status === 404 && ++c.attempts < OTP_MAX_ATTEMPTS) await put("otp_captures", c);
+      else await del("otp_captures", c.id); // verified, or rejected for good
+    }
+  }
+}
+
+function toOp(item) {
+  return { op_id: item.op_id, type: item.type, payload: item.payload_json };
+}
 
 export async function syncOnce() {
   if (!navigator.onLine || syncing) return;
   syncing = true;
   setSyncBadge("⏳ Syncing…", "warn");
   try {
-    const outbox = await listOutbox();
-    for (const item of outbox.sort((a,b)=> (a.id-b.id))) {
-      const fn = handlers[item.type];
-      if (!fn) { await removeOutbox(item.id); continue; }
+    const outbox = (await listOutbox()).sort((a,b)=> (a.id-b.id));
+    // Items queued before idempotency keys existed get one now, persisted before upload
+    for (const item of outbox) {
+      if (!item.op_id) { item.op_id = crypto.randomUUID(); await updateOutbox(item); }
+    }
 
-      const res = await fn(item.payload_json);
-      if (res.ok) {
-        await removeOutbox(item.id);
-      } else {
-        // backoff: stop after first error to avoid battery drain
+    let failed = 0;
+    for (let i = 0; i < outbox.length; i += BATCH_SIZE) {
+      const chunk = outbox.slice(i, i + BATCH_SIZE);
+      const res = await safeApi("/api/sync/batch", { method:"POST", body:{ ops: chunk.map(toOp) } });
+      if (!res.ok) {
+        // backoff: stop after a failed upload to avoid battery drain
         console.warn("sync error", res.error);
+        failed += outbox.length - i;
         break;
       }
+      const byId = new Map(res.data.results.map(r => [r.op_id, r]));
+      for (const item of chunk) {
+        const r = byId.get(item.op_id);
+        if (r?.ok) { await removeOutbox(item.id); continue; }
+        failed++;
+        item.attempts = (item.attempts || 0) + 1;
+        item.last_error = r ? r.error : "missing result";
+        await updateOutbox(item);
+      }
     }
+    await verifyCaptures();
     await refreshCaches(); // pull deltas when possible
-    setSyncBadge("✅ Synced", "ok");
+    if (failed) setSyncBadge(`⚠️ ${failed} pending`, "warn");
+    else setSyncBadge("✅ Synced", "ok");
   } finally {
     syncing = false;
   }
@@ -26,6 +26,7 @@ function evalRule(conditions, ctx) {
 }
 
 function bandScore(bands, value) {
+  if (value == null) return 100; // not measured: neutral, never a penalty
   for (const b of bands) {
     const minOk = (b.min == null) ? true : value >= b.min;
     const maxOk = (b.max == null) ? true : value <= b.max;
@@ -75,7 +76,7 @@ export async function computeDerived(input) {
     let sumW = 0, sum = 0;
     for (const comp of dcfg.components) {
       let s = 100;
-      if (comp.bands) s = bandScore(comp.bands, ctx[comp.field]);
+      if (comp.bands) s = bandScore(comp.bands, ctx[comp.field ?? comp.bands[0]?.field]);
       else if (comp.bands_by_type) {
         const t = ctx.glucose_type;
         const v = ctx.glucose_value;